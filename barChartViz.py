@@ -1,11 +1,13 @@
 import os
+import numpy as np
 import plotly.express as px
+from vizCache import atomic_output
+from vizStatic import plotly_js
+from vizCommunityStats import stats_of
 
 def visualization(data, mapper, mln_User, endPath, mappingFile_present, G, input_file, final_output_cluster_name):
     try: 
         nodes_OR_edges = ""
-        ecom_vcom_FLAG = ""
-        unique_EdgesorNodes_InEachCommunity = {}
         
         if input_file.endswith('.ecom'):
             input_file_extension = 'ecom'
@@ -14,25 +16,12 @@ def visualization(data, mapper, mln_User, endPath, mappingFile_present, G, input
             input_file_extension = 'vcom'
             nodes_OR_edges = "vertices"
 
-        communityData = data.get('Communities') # stores data['Communities']\
-            
-        # calculating unique nodes in each community --------------------------------------------------------------------------------------
-        for communityID, edges in communityData.items():
-            if input_file.endswith('.ecom'):
-                unique_EdgesorNodes_InEachCommunity[communityID] = len(edges)
-            elif input_file.endswith('.vcom'):
-                nodes = set()
-                for edge in edges:
-                    nodes.add(edge[0])
-                    nodes.add(edge[1])
-                unique_EdgesorNodes_InEachCommunity[communityID] = len(nodes)
-                # print(unique_EdgesorNodes_InEachCommunity)   # prints {1: 27, 3: 41, 2: 45} 
-
-        # count the number of vertices in each community --------------------------------------------------------------------------------------
-        # verticesInEachCommunity = {'C'+str(key): len(value) if isinstance(value, list) else value for key, value in communityData.items()}
+        # size of every community (edges for '.ecom', vertices for '.vcom'), see vizCommunityStats
+        stats = stats_of(data, input_file_extension)
         
-        # sorting the data
-        sortedData = dict(sorted(unique_EdgesorNodes_InEachCommunity.items(), key=lambda item: item[1], reverse=True))
+        # sorting the data, largest communities first
+        order = np.argsort(-stats['size'], kind='stable')
+        sortedData = dict(zip(stats['community'][order].tolist(), stats['size'][order].tolist()))
         
         # Create a bar graph from the verticesInEachCommunity data using Plotly
         fig = px.bar(
@@ -54,7 +43,8 @@ def visualization(data, mapper, mln_User, endPath, mappingFile_present, G, input
         )
 
         html_file_generated = os.path.join(endPath,"visualization",f"bar_chart_{final_output_cluster_name}_{input_file_extension}.html")
-        fig.write_html(html_file_generated)
+        with atomic_output(html_file_generated) as tmp_path:
+            fig.write_html(tmp_path, include_plotlyjs=plotly_js(os.path.dirname(html_file_generated)))
         return os.path.join(mln_User, "visualization",f"bar_chart_{final_output_cluster_name}_{input_file_extension}.html")
     except Exception as e:
         print(e)
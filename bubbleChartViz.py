@@ -1,96 +1,117 @@
 import os
 from matplotlib import pyplot as plt
-import pandas as pd
+import numpy as np
 import circlify
 from io import BytesIO
 import base64
-from vizCaller import createViz
+from vizCache import atomic_output
+from vizCommunityStats import stats_of
 
-#def visualization(pathToInputFile, mln_user):
-def visualization(data, mapper, mln_user, endPath, mappingFile_present, G, pathToInputFile, final_output_cluster_name):
-    cluster = pathToInputFile
-    input_file = f'{cluster}' 
-    input_file_extension = input_file.split('.')[-1]
-    final_output_cluster_name = os.path.splitext(os.path.basename(input_file))[0].split('.')[0]
-    # create an empty dictionary to store the information ---------------------------------------------------------------------------------
-    data = {}
-    # read input file ---------------------------------------------------------------------------------------------------------------------
-    with open(os.path.relpath(input_file), 'r') as f:
-        lines = f.readlines()
-    for i, line in enumerate(lines):
-        if line.startswith('# Vertex Community File for Layer'):
-            data['Layer'] = lines[i+1].strip()
-        elif line.startswith('# Number of Vertices'):
-            data['NumVertices'] = int(lines[i+1].strip())
-        elif line.startswith('# Number of Total Communities'):
-            data['NumCommunities'] = int(lines[i+1].strip())
-        elif line.startswith('# Vertex Community Allocation'):
-            data['Communities'] = {}
-            for j in range(i+1, len(lines)):
-                if not lines[j].startswith('#'):
-                    vid, commID = map(int, lines[j].strip().split(','))
-                    if commID in data['Communities']:
-                        data['Communities'][commID].append(vid)
-                    else:
-                        data['Communities'][commID] = [vid]
-    # print(data) #{'Layer': 'L2', 'NumVertices': 6, 'NumCommunities': 4, 'Communities': {1: [1, 2, 3], 2: [4], 3: [5], 4: [6]}}
-    verticesInEachCommunity = {'c'+str(key).strip(): len(value) if isinstance(
-        value, list) else value for key, value in data['Communities'].items()}
-    # print(verticesInEachCommunity) #{'1': 3, '2': 1, '3': 1, '4': 1}
+"""
+    Bubble chart of the communities of a '.vcom' layer, one circle per community sized by its
+    number of vertices.
 
-    # matplotlib ----------------------------------------------------------------------------------------------------------------------------
-    comNames = []
-    comSizes = []
-    for key, value in verticesInEachCommunity.items():
-        comNames.append(key)
-        comSizes.append(value)
-    df = pd.DataFrame({'Name': comNames, 'Value': comSizes})
-    df = df.sort_values(by=['Value'])
+    Circle packing (circlify) is quadratic in the number of circles, so only the
+    BUBBLE_MAX_COMMUNITIES largest communities get their own circle and the remaining ones are
+    merged into a single "other" circle. The chart is embedded in the HTML file as a PNG or as
+    inline SVG (see IMAGE_FORMATS). The file is named like every other view (see
+    vizCaller.viz_file_name), so it is cached per layer with a manifest and only rendered again
+    when the layer or the code changes.
+"""
 
-    circles = circlify.circlify(
-        (df['Value']).tolist(),
-        show_enclosure=False,
-        target_enclosure=circlify.Circle(x=0, y=0, r=1)
-    )
+# Largest number of communities drawn as their own circle, the others share the "other" circle.
+BUBBLE_MAX_COMMUNITIES = 50
+# Names of the supported image formats.
+IMAGE_FORMATS = ('png', 'svg')
+# Image format of the bubble chart.
+IMAGE_FORMAT = 'png'
 
-    fig,ax = plt.subplots(figsize=(10,10), facecolor='#fff')
-    ax.set_title('Bubble chart of '+ str(data['Layer']) +' communities', fontsize=20, fontweight='bold')
-    ax.axis('off')
-    ax.set_aspect('equal') # sshow circles as circles and not as ellipses
-    lim = max(
-        max(
-            abs(circle.x) + circle.r,
-            abs(circle.y) + circle.r
-        )
-        for circle in circles
-    )
-    plt.xlim(-lim, lim)
-    plt.ylim(-lim, lim)
+def community_bubbles(stats, max_communities=BUBBLE_MAX_COMMUNITIES):
+    """
+    Returns the labels and sizes of the circles of the bubble chart.
+
+    Parameters:
+        stats (dict): The community statistics of the layer (see vizCommunityStats).
+        max_communities (int): The number of largest communities drawn as their own circle.
+
+    Returns:
+        tuple: (labels, sizes), the largest communities ('c<id>') in decreasing order of size,
+               followed by an 'other (<n> communities)' entry holding the total size of the rest.
+    """
+    ids, sizes = stats['community'], stats['size']
+    # largest first, ties in file order
+    order = np.argsort(-sizes, kind='stable')
+    top, rest = order[:max_communities], order[max_communities:]
+    labels = ['c' + str(community) for community in ids[top].tolist()]
+    values = sizes[top].tolist()
+    if len(rest):
+        labels.append(f"other ({len(rest)} communities)")
+        values.append(int(sizes[rest].sum()))
+    return labels, values
 
-    labels = list(df['Name'])
+def visualization(data, mapper, mln_user, endPath, mappingFile_present, G, pathToInputFile, final_output_cluster_name, image_format=None):
+    try:
+        image_format = IMAGE_FORMAT if image_format is None else image_format
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format '{image_format}', expected one of {IMAGE_FORMATS}")
+        input_file_extension = pathToInputFile.split('.')[-1]
+        # print(data) #{'Layer': 'L2', 'NumVertices': 6, 'NumCommunities': 4, 'Communities': {1: [1, 2, 3], 2: [4], 3: [5], 4: [6]}}
+        # community sizes from the already parsed layer (see vizCommunityStats)
+        labels, sizes = community_bubbles(stats_of(data, input_file_extension))
 
-    for circle,label in zip(circles,labels):
-        x, y, r = circle
-        ax.add_patch(plt.Circle((x, y), r, linewidth = 2, facecolor='#AE183D', edgecolor='yellow'))
-        font_size = r*150 # adjust font size based on circle size
-        plt.annotate(
-            label,
-            (x,y ) ,
-            va='center',
-            ha='center',
-            fontsize=font_size,
-            color = 'white',
+        circles = circlify.circlify(
+            [{'id': label, 'datum': size} for label, size in zip(labels, sizes)],
+            show_enclosure=False,
+            target_enclosure=circlify.Circle(x=0, y=0, r=1)
         )
-    # makes the extra white-space in the figure to be removed and largens the figure
-    plt.tight_layout()
 
-    # saving the word cloud as HTML file --------------------------------------------------------------------------------------------------
-    endPath = os.path.relpath(mln_user)
-    layerName = data['Layer']
-    tmpfile = BytesIO()
-    fig.savefig(tmpfile, format='png')
-    encoded = base64.b64encode(tmpfile.getvalue()).decode('utf-8')
-    htmlFile = f''+'<img src=\'data:image/png;base64,{}\'>'.format(encoded)+''
-    with open(os.path.join(endPath,"visualization",f"bubblechart_{final_output_cluster_name}_{input_file_extension}.html"), "w") as f:
-        f.write(htmlFile)
-    return os.path.join(mln_user,"visualization",f"bubblechart_{final_output_cluster_name}_{input_file_extension}.html")
\ No newline at end of file
+        # matplotlib ----------------------------------------------------------------------------------------------------------------------------
+        fig, ax = plt.subplots(figsize=(10,10), facecolor='#fff')
+        try:
+            ax.set_title('Bubble chart of '+ str(data['Layer']) +' communities', fontsize=20, fontweight='bold')
+            ax.axis('off')
+            ax.set_aspect('equal') # sshow circles as circles and not as ellipses
+            lim = max(
+                max(
+                    abs(circle.x) + circle.r,
+                    abs(circle.y) + circle.r
+                )
+                for circle in circles
+            ) if circles else 1
+            ax.set_xlim(-lim, lim)
+            ax.set_ylim(-lim, lim)
+
+            for circle in circles:
+                x, y, r = circle
+                ax.add_patch(plt.Circle((x, y), r, linewidth = 2, facecolor='#AE183D', edgecolor='yellow'))
+                font_size = r*150 # adjust font size based on circle size
+                ax.annotate(
+                    circle.ex['id'],
+                    (x,y ) ,
+                    va='center',
+                    ha='center',
+                    fontsize=font_size,
+                    color = 'white',
+                )
+            # makes the extra white-space in the figure to be removed and largens the figure
+            fig.tight_layout()
+
+            # saving the bubble chart as HTML file --------------------------------------------------------------------------------------------------
+            tmpfile = BytesIO()
+            fig.savefig(tmpfile, format=image_format)
+        finally:
+            # the figure is kept by pyplot until it is closed, which leaks memory in long-lived processes
+            plt.close(fig)
+        if image_format == 'svg':
+            svg = tmpfile.getvalue().decode('utf-8')
+            htmlFile = svg[svg.index('<svg'):]  # inline SVG, without the XML prolog
+        else:
+            encoded = base64.b64encode(tmpfile.getvalue()).decode('utf-8')
+            htmlFile = f''+'<img src=\'data:image/png;base64,{}\'>'.format(encoded)+''
+        html_path = os.path.join(endPath,"visualization",f"bubblechart_{final_output_cluster_name}_{input_file_extension}.html")
+        with atomic_output(html_path) as tmp_path, open(tmp_path, "w") as f:
+            f.write(htmlFile)
+        return os.path.join(mln_user,"visualization",f"bubblechart_{final_output_cluster_name}_{input_file_extension}.html")
+    except Exception as e:
+        print(f"ERROR occured for bubble chart visualization: {e}")
+        return False
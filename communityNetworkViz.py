@@ -1,69 +1,76 @@
 import os
-import networkx as nx
+import numpy as np
 from bokeh.io import show
-from bokeh.plotting import figure, from_networkx, save
-from bokeh.palettes import Viridis256, Spectral8, Oranges256, Purples256, Blues256, Greens256
-from bokeh.models import MultiLine, Circle, ColumnDataSource, LinearColorMapper, ColorBar, Legend, LegendItem, TapTool, OpenURL
-from networkx.algorithms import community as comm
-import itertools
+from bokeh.plotting import figure, save
+from bokeh.models import LinearColorMapper, ColorBar, Legend, LegendItem, TapTool, OpenURL
 # CUSTOM IMPORTS
-from vizUTILS import create_url
+from vizMapping import node_labels, node_urls
+from vizCommunity import choose_algorithm, detect_communities, communities_to_labels
+from vizLayout import choose_layout, compute_layout
+from vizContext import COMMUNITY_SEED, LAYOUT_SEED
+from vizCache import atomic_output
+from vizStatic import bokeh_resources
+from vizGraph import CSRGraph
+from vizBokeh import graph_renderer, community_colors
 
-def visualization(data, mapper, mln_User, endPath, dataset_type, G, input_file, final_output_cluster_name):
+def node_communities(G, recompute=False, community_algorithm="auto"):
+    """
+    Returns the community of every node of an '.ecom' graph.
+
+    By default this is the partition stored in the file: vizContext.CommunityLayer.graph sets the
+    'community' attribute of every node to the community of (the last of) its allocated edges. With
+    'recompute' the communities are detected again on the graph structure instead (see vizCommunity).
+
+    Parameters:
+        G (networkx.Graph): The graph of the '.ecom' layer, it is not modified.
+        recompute (bool): Detect the communities instead of reading them from the file.
+        community_algorithm (str): The detection algorithm used with 'recompute'.
+
+    Returns:
+        numpy.ndarray: The community id of each node, in the order of G.nodes().
+    """
+    nodes = np.fromiter(G.nodes(), dtype=np.int64, count=G.number_of_nodes())
+    if recompute:
+        algorithm = choose_algorithm(len(nodes), community_algorithm)
+        return communities_to_labels(detect_communities(G, algorithm, COMMUNITY_SEED), nodes)
+    return np.fromiter((community for _, community in G.nodes(data='community', default=-1)), dtype=np.int64, count=len(nodes))
+
+def visualization(data, mapper, mln_User, endPath, dataset_type, G, input_file, final_output_cluster_name, recompute=False, community_algorithm="auto"):
     try:
-        # calculate degree of each node
-        degrees = dict(nx.degree(G))
-        nx.set_node_attributes(G, name='degree', values=degrees)
+        # node ids in graph order and edge endpoints as positions among them, read from G once
+        nodes = np.fromiter(G.nodes(), dtype=np.int64, count=G.number_of_nodes())
+        node_position = {node: i for i, node in enumerate(nodes.tolist())}
+        endpoints = np.fromiter((node_position[node] for edge in G.edges() for node in edge), dtype=np.int64, count=2 * G.number_of_edges())
+        rows, cols = endpoints[0::2], endpoints[1::2]
+
+        # calculate degree of each node (G is shared with the other views of the layer, so no node attributes are set on it)
+        degrees = CSRGraph(nodes, rows, cols).degree()
 
         # Set node size based on degree ----------------------------------------------------
-        adjusted_node_size = dict([(node, degree + 5) for node, degree in nx.degree(G)])
-        nx.set_node_attributes(G, name='adjusted_node_size', values=adjusted_node_size)
+        adjusted_node_size = degrees + 5
 
-        # Detect communities using greedy modularity maximization.
-        communities = comm.greedy_modularity_communities(G)
-        
         # MODULARITY CLASS ------------------------------------------------------------------
-        # Assign each node to a modularity class based on the detected communities.
-        modularity_class = {node: i for i, community in enumerate(communities) for node in community}
-        nx.set_node_attributes(G, name='modularity_class', values=modularity_class)
+        # The community of each node: the file's partition unless recompute is requested
+        modularity_class = node_communities(G, recompute, community_algorithm)
+        community_ids, community_index = np.unique(modularity_class, return_inverse=True)
         
         # MODULARITY COLOR ------------------------------------------------------------------
-        # Assign colors to each community by cycling through an extended color palette.
-        extended_palette = Spectral8 + Oranges256 + Viridis256 + Purples256 + Blues256 + Greens256
-        color_iterator = itertools.cycle(extended_palette)
-        community_colors = {i: next(color_iterator) for i in range(len(communities))}
-        modularity_color = {node: community_colors[modularity_class[node]] for node in G.nodes()}
-        nx.set_node_attributes(G, name='modularity_color', values=modularity_color)
+        # One color per community by cycling through an extended color palette, nodes take the color of their community
+        palette = community_colors(len(community_ids))
+        modularity_color = palette[community_index]
         
         # Prepare color mapper
-        color_mapper = LinearColorMapper(palette=list(community_colors.values()), low=0, high=len(communities) - 1)
+        color_mapper = LinearColorMapper(palette=palette.tolist(),
+                                         low=community_ids[0] if len(community_ids) else 0,
+                                         high=community_ids[-1] if len(community_ids) else 0)
 
         # add labels to nodes ---------------------------------------------------------------
-        labels = {node: mapper.get(str(node), f"Node {node}") for node in G.nodes()}
-        nx.set_node_attributes(G, labels, "label")
-        urls = {node: create_url(labels[node], dataset_type) for node in G.nodes()}
-        nx.set_node_attributes(G, urls, "url")
+        labels = node_labels(mapper, nodes, "Node {}")
+        urls = node_urls(mapper, nodes, dataset_type, "Node {}")
 
-        # Set up the data source for Bokeh visual elements with node attributes.
-        node_data = {
-            'index': list(G.nodes()),
-            'degree': list(nx.get_node_attributes(G, 'degree').values()),
-            'adjusted_node_size': [adjusted_node_size[node] for node in G.nodes()],
-            'label': list(nx.get_node_attributes(G, 'label').values()),
-            'modularity_class': list(nx.get_node_attributes(G, 'modularity_class').values()),
-            'modularity_color': list(nx.get_node_attributes(G, 'modularity_color').values()),
-            'url': [urls[node] for node in G.nodes()],  # URLs added here to each node
-        }
-        source = ColumnDataSource(node_data)
+        # Layout chosen by graph size (spring layout for small graphs, see vizLayout)
+        positions = compute_layout(choose_layout(len(nodes)), len(nodes), rows, cols, np.ones(len(rows)), LAYOUT_SEED, graph_factory=lambda: G) * 10
         
-        from bokeh.models import EdgesAndLinkedNodes, NodesAndLinkedEdges
-        #Choose colors for node and edge highlighting
-        node_highlight_color = 'white'
-        edge_highlight_color = 'black'
-
-        size_by_this_attribute = 'adjusted_node_size'
-        color_by_this_attribute = 'modularity_color'
-
         # bokeh --------------------------------------------------------------------------------------------------------------------------------
         # Create a Bokeh figure with interactive tools and hover tooltips.
         title = f"{data['Layer']} Community Network Visualization"
@@ -87,24 +94,15 @@ def visualization(data, mapper, mln_User, endPath, dataset_type, G, input_file,
         tap_tool = TapTool(callback=OpenURL(url="@url"))
         fig.add_tools(tap_tool)
         
-        network_graph = from_networkx(G, nx.spring_layout, scale=10, center=(0, 0))
-        network_graph.node_renderer.data_source = source  # Use updated source with URL
-        
-        #Set node sizes and colors according to node degree (color as category from attribute)
-        network_graph.node_renderer.glyph = Circle(size=size_by_this_attribute, fill_color=color_by_this_attribute)
-        #Set node highlight colors
-        network_graph.node_renderer.hover_glyph = Circle(size=size_by_this_attribute, fill_color=node_highlight_color, line_width=2)
-        network_graph.node_renderer.selection_glyph = Circle(size=size_by_this_attribute, fill_color=node_highlight_color, line_width=2)
-
-        #Set edge opacity and width
-        network_graph.edge_renderer.glyph = MultiLine(line_alpha=0.5, line_width=1)
-        #Set edge highlight colors
-        network_graph.edge_renderer.selection_glyph = MultiLine(line_color=edge_highlight_color, line_width=2)
-        network_graph.edge_renderer.hover_glyph = MultiLine(line_color=edge_highlight_color, line_width=2)
-        
-        #Highlight nodes and edges
-        network_graph.selection_policy = NodesAndLinkedEdges()
-        network_graph.inspection_policy = NodesAndLinkedEdges()
+        # Network graph built from the arrays (see vizBokeh.graph_renderer), node sizes by degree and colors by community
+        network_graph = graph_renderer(nodes, positions, rows, cols, {
+            'degree': degrees,
+            'adjusted_node_size': adjusted_node_size,
+            'label': labels,
+            'modularity_class': modularity_class,
+            'modularity_color': modularity_color.tolist(),
+            'url': urls,  # URLs added here to each node
+        }, node_size='adjusted_node_size', node_color='modularity_color')
 
         # Legend --------------------------------------------------------------------------------------------------------------------------------
         legend = Legend(items=[
@@ -120,7 +118,8 @@ def visualization(data, mapper, mln_User, endPath, dataset_type, G, input_file,
 
         # save bokeh plot
         save_path = os.path.join(endPath,"visualization",f"bokeh_{final_output_cluster_name}_comNet.html")
-        save(fig, save_path, title=f"{data['Layer']} Community Network", resources='inline')
+        with atomic_output(save_path) as tmp_path:
+            save(fig, tmp_path, title=f"{data['Layer']} Community Network", resources=bokeh_resources(os.path.dirname(save_path)))
         return_path = os.path.join(mln_User,"visualization",f"bokeh_{final_output_cluster_name}_comNet.html")
         
         
@@ -1,52 +1,56 @@
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objs as go
-import networkx as nx
 # from geopy.geocoders import Nominatim
 # from geopy.extra.rate_limiter import RateLimiter
 import os
+from vizContext import LayerContext
+from vizCache import cache_dir_for, atomic_output
+from vizStatic import plotly_js
+from vizMapping import NodeMapping, MAPPING_TYPES
 
 
 #ASantra (06/13): Code updated for it to work with Airline map file format (nodeID, "lat,long,airportcode/labelInfo")
-def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, clusterName):
+def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, clusterName, context=None):
     if mappingFile_present:
-        # converting the mapper dict to data dict with seperate lists
-        data = {
-            "Node_id": [],
-            "latitude": [],
-            "longitude": [],
-            "atr_val": []            
-        }
-        
-        #print(mappingFile_present)
-        #print(noVerticesLayer1)
-        #print(mapper.items([1]))
-        numberOfAttr = 0
-        for node_id, details in mapper.items():
-             #print(details)
-             parts = details.split(',')
-             numberOfAttr = len(parts)
-             data["Node_id"].append(node_id)
-             data["latitude"].append(float(parts[0]))
-             data["longitude"].append(float(parts[1]))
-             if (numberOfAttr > 2):
-                 data["atr_val"].append((parts[2]))
-        df = pd.DataFrame(data)
-        df.set_index('Node_id', inplace=True)
+        # the typed coordinate columns of the mapping ("lat,long,label" per node id), nodes without coordinates are not drawn
+        mapping = mapper if isinstance(mapper, MAPPING_TYPES) else NodeMapping.from_dict(mapper)
+        located, latitude, longitude = mapping.located()
+        df = pd.DataFrame({
+            "latitude": latitude,
+            "longitude": longitude,
+        }, index=pd.Index(mapping.keys_at(located), name='Node_id', dtype=object))
+        numberOfAttr = 2
+        if mapping.kind == 'labels':
+            parts = pd.Series(mapping.values_at(located), index=df.index, dtype=object).str.split(',')
+            numberOfAttr = len(parts.iloc[-1]) if len(parts) else 0  # number of fields, as found on the last line
+            if (numberOfAttr > 2):
+                df["atr_val"] = parts.str[2]
         # # Initialize the geolocator with a user agent to avoid blocks
         # geolocator = Nominatim(user_agent='geoapiExercises')
         # geocode = RateLimiter(geolocator.reverse, min_delay_seconds=1)  # Adding delay to avoid hitting request limits
         # # Fetching city names using latitude and longitude
         # df['location'] = df.apply(lambda row: geocode((row['latitude'], row['longitude'])).address, axis=1)
         
-        # Initialize the graph to compute node degrees
-        G = nx.Graph()
-        G.add_nodes_from(df.index)  # Ensuring all nodes are added to the graph, even if they have no edges
-        G.add_edges_from((edge[0], edge[1]) for edge in allEdges if edge[0] in df.index and edge[1] in df.index)
-            
-        # Calculate degrees
-        degrees = dict(G.degree())
-        df['degree'] = df.index.map(degrees.get).fillna(0)
+        # Degrees and edges come from the shared layer state, built here when this view is rendered on its own
+        if context is None:
+            context = LayerContext(allEdges, noVerticesLayer1, mapper, cache_dir=cache_dir_for(mln_User))
+        nodes = context.node_index()[0]
+        degrees = context.degrees()
+        degrees = pd.Series(list(degrees.values()), index=[str(node) for node in degrees])
+        df['degree'] = degrees.reindex(df.index).fillna(0).astype(int)  # mapped nodes that are not part of the layer get degree 0
+
+        # Row of every layer node in df (-1 when the node has no coordinates), by a sorted search of the node's mapping row
+        mapping_rows = mapping.positions(nodes)
+        node_rows = np.minimum(np.searchsorted(located, mapping_rows), max(len(located) - 1, 0))
+        node_rows = np.where((mapping_rows >= 0) & (located[node_rows] == mapping_rows) if len(located) else False, node_rows, -1)
+
+        # Hover text built column-wise
+        hovertext = "ID: " + df.index.to_series()
+        if (numberOfAttr > 2):
+            hovertext = hovertext + "<br>Label: " + df['atr_val'].astype(str)
+        hovertext = hovertext + "<br>Lat: " + df['latitude'].astype(str) + "<br>Lon: " + df['longitude'].astype(str) + "<br>Degree: " + df['degree'].astype(str)
         
         # initialize a pltoly figure
         fig = go.Figure()
@@ -64,7 +68,7 @@ def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerti
                     text=df.index,  # Showing node index by default
                     # hover_name=df['location'],
                     hoverinfo='text',
-                    hovertext=df.apply(lambda row: f"ID: {row.name}<br>Label: {row.atr_val}<br>Lat: {row.latitude}<br>Lon: {row.longitude}<br>Degree: {row.degree}", axis=1)
+                    hovertext=hovertext
                 )
             )
         else:
@@ -79,23 +83,32 @@ def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerti
                     text=df.index,  # Showing node index by default
                     # hover_name=df['location'],
                     hoverinfo='text',
-                    hovertext=df.apply(lambda row: f"ID: {row.name}<br>Lat: {row.latitude}<br>Lon: {row.longitude}<br>Degree: {row.degree}", axis=1)
+                    hovertext=hovertext
                 )
             )
 
         
-        # Add traces for the edges
-        for edge in allEdges:
-            if edge[0] in df.index and edge[1] in df.index:
-                fig.add_trace(
-                    go.Scattermapbox(
-                        mode="lines",
-                        lon=[df.loc[edge[0], 'longitude'], df.loc[edge[1], 'longitude']],
-                        lat=[df.loc[edge[0], 'latitude'], df.loc[edge[1], 'latitude']],
-                        line=dict(color='red',width=0.05),
-                        hoverinfo='skip'
-                    )
+        # Add a single trace for the edges whose endpoints both have coordinates
+        edge_rows, edge_cols, _ = context.edge_index()
+        source, target = node_rows[edge_rows], node_rows[edge_cols]
+        located = (source >= 0) & (target >= 0)
+        source, target = source[located], target[located]
+        if len(source):
+            # lon0, lon1, gap for every edge, flattened into one array (same for lat)
+            lon = np.full((len(source), 3), np.nan)
+            lat = np.full_like(lon, np.nan)
+            longitude, latitude = df['longitude'].to_numpy(), df['latitude'].to_numpy()
+            lon[:, 0], lon[:, 1] = longitude[source], longitude[target]
+            lat[:, 0], lat[:, 1] = latitude[source], latitude[target]
+            fig.add_trace(
+                go.Scattermapbox(
+                    mode="lines",
+                    lon=lon.ravel(),
+                    lat=lat.ravel(),
+                    line=dict(color='red',width=0.05),
+                    hoverinfo='skip'
                 )
+            )
         
         # Update the layout for the map
         fig.update_layout(
@@ -116,5 +129,6 @@ def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerti
         # SAVE FIGURE ------------------------------------------------------------------------
         clusterName = clusterName.split('.')[0] # remove the .txt extension
         save_path = os.path.join(endPath, "visualization",f"map_{clusterName}_Network.html")
-        fig.write_html(save_path)
+        with atomic_output(save_path) as tmp_path:
+            fig.write_html(tmp_path, include_plotlyjs=plotly_js(os.path.dirname(save_path)))
         return os.path.join(mln_User, "visualization", f"map_{clusterName}_Network.html")
@@ -1,61 +1,102 @@
-import networkx as nx
 import os
+import numpy as np
 import plotly.graph_objects as go
+from vizContext import LayerContext
+from vizMapping import node_labels
+from vizCache import cache_dir_for, atomic_output
+from vizStatic import plotly_js
 
-def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name):
+# Maximum number of edge traces: edges are grouped by weight into this many line widths.
+EDGE_WIDTH_BUCKETS = 8
+# Number of edges from which the figure is drawn with WebGL (Scattergl) when 'webgl' is left to None.
+WEBGL_MIN_EDGES = 20000
+
+def edge_traces(positions, rows, cols, weights, webgl=False, buckets=EDGE_WIDTH_BUCKETS):
+    """
+    Builds the edge traces of a network figure from edge arrays.
+
+    Instead of one trace per edge, the edges are grouped by weight into at most 'buckets' traces.
+    Every trace holds the coordinates of all its edges in a single array, the segments being
+    separated by gaps (NaN, written as null like a None separator), so the figure size grows with
+    the number of edges but the number of traces does not. If there are no more distinct weights
+    than buckets every weight keeps its exact line width, otherwise the edges are split into
+    weight quantiles drawn with the mean weight of the bucket.
+
+    Parameters:
+        positions (numpy.ndarray): (n, 2) node positions.
+        rows, cols (numpy.ndarray): Indices into 'positions' of the edge endpoints.
+        weights (numpy.ndarray): The edge weights, used as line widths.
+        webgl (bool): Use go.Scattergl (WebGL) instead of go.Scatter (SVG).
+        buckets (int): The maximum number of traces.
+
+    Returns:
+        list: The edge traces.
+    """
+    if len(rows) == 0:
+        return []
+    scatter = go.Scattergl if webgl else go.Scatter
+    # 6 decimals are far below a pixel and keep the written coordinates short
+    positions = np.round(np.asarray(positions, dtype=float), 6)
+    weights = np.asarray(weights, dtype=float)
+    widths = np.unique(weights)
+    if len(widths) <= buckets:
+        bucket = np.searchsorted(widths, weights)
+    else:
+        bounds = np.quantile(weights, np.linspace(0, 1, buckets + 1)[1:-1])
+        bucket = np.searchsorted(bounds, weights, side='right')
+        counts = np.bincount(bucket, minlength=buckets)
+        widths = np.bincount(bucket, weights=weights, minlength=buckets) / np.maximum(counts, 1)
+    traces = []
+    for index in np.unique(bucket):
+        selected = bucket == index
+        # x0, x1, gap for every edge of the bucket, flattened into one array (same for y)
+        x = np.full((int(selected.sum()), 3), np.nan)
+        y = np.full_like(x, np.nan)
+        x[:, 0], x[:, 1] = positions[rows[selected], 0], positions[cols[selected], 0]
+        y[:, 0], y[:, 1] = positions[rows[selected], 1], positions[cols[selected], 1]
+        traces.append(scatter(
+            x=x.ravel(), y=y.ravel(),
+            mode='lines',
+            line=dict(width=float(widths[index]), color='#202213'),  # Line styling
+            hoverinfo='none',  # No additional info on hover
+            showlegend=False  # Hide legend for edges
+        ))
+    return traces
+
+def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=None, webgl=None):
+    """
+    Renders the Plotly network graph of a '.net' layer.
+
+    'webgl' selects go.Scattergl instead of go.Scatter for the edges and nodes. It defaults to
+    None, which uses WebGL for layers with at least WEBGL_MIN_EDGES edges.
+    """
     try:
+        # Shared layer state (graph, layouts, ...), built here when this view is rendered on its own
+        if context is None:
+            context = LayerContext(allEdges, noVerticesLayer1, mapper, cache_dir=cache_dir_for(mln_User))
         # CREATE GRAPH -----------------------------------------------------------------------
-        G = nx.Graph()
-        # Add edges 
-        if int(noEdges_fromFile) > 0:   # Check if there are any edges to add to the graph
-            # Add all edges to the graph with weights, each edge is a tuple (node1, node2, weight)
-            G.add_edges_from((edge[0], edge[1], {'weight': edge[2]}) for edge in allEdges)
-        else:
-            # If no edges, add all nodes as isolated nodes, numbered sequentially
-            G.add_nodes_from(range(int(noVerticesLayer1)))
-        
-        # Calculate the degree centrality for each node in the graph
-        dc = nx.degree_centrality(G)
+        # Only edge endpoints are drawn, or all nodes (numbered sequentially) if there are no edges
+        drawn = np.flatnonzero(context.endpoints())
+        drawn_nodes = context.node_index()[0][drawn]
+        # Edges as index arrays into context.node_index() (repeated pairs merged as in G)
+        edge_rows, edge_cols, edge_weights = context.edge_index()
+        if webgl is None:
+            webgl = len(edge_rows) >= WEBGL_MIN_EDGES
         # define position for nodes in the graph ---------------------------------------------
-        # Position nodes using Kamada-Kawai layout for aesthetic spacing
-        pos = nx.kamada_kawai_layout(G)
-        # Convert positions to a format suitable for Plotly (dictionary with nodes as keys)
-        pos = {node: (x, y) for node, (x, y) in pos.items()}
-        edge_pos = {(u, v): pos[u] for u, v in G.edges()}
-        nx.set_edge_attributes(G, edge_pos, 'pos')
+        # Position nodes using Kamada-Kawai layout for aesthetic spacing, large graphs fall back to the scalable layouts (see vizLayout)
+        # Row i holds the position of context.node_index()[0][i], the index space of the edge arrays
+        positions = context.positions(preferred='kamada_kawai')
         # CREATE BLANK PLOTLY FIGURE ---------------------------------------------------------
         fig = go.Figure()
         # CREATE EDGES EDGE_TRACE ------------------------------------------------------------
-        for edge in G.edges(data=True):
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-            # Ensure every edge has a weight attribute; default to 1.0 if missing
-            if 'weight' not in edge[2]:
-                edge[2]['weight'] = 1.0
-            # Create a Plotly scatter trace for each edge
-            edge_trace = go.Scatter(
-                x=[x0, x1, None], y=[y0, y1, None],
-                mode='lines',
-                line=dict(width=edge[2]['weight'],color='#202213'),# Line styling
-                hoverinfo='none',  # No additional info on hover
-                showlegend=False  # Hide legend for edges
-            )
-            fig.add_trace(edge_trace)   # Add the trace to the figure
+        # A few traces holding all edges, grouped by weight so the line widths are kept
+        fig.add_traces(edge_traces(positions, edge_rows, edge_cols, edge_weights, webgl=webgl))
 
         # CREATE NODES NODE_TRACE ------------------------------------------------------------
-        node_x = []
-        node_y = []
+        node_x = positions[drawn, 0]
+        node_y = positions[drawn, 1]
         node_text = []
-        for node in G.nodes():
-            if noEdges_fromFile == 0:
-                # should visualoze only the nodes here
-                pass
-            else:
-                # Populate node attributes for plotting
-                x, y = pos[node]
-                node_x.append(x)
-                node_y.append(y)
-        node_trace = go.Scatter(
+        node_trace = (go.Scattergl if webgl else go.Scatter)(
             x=node_x, y=node_y,
             mode='markers',
             marker=dict(
@@ -79,19 +120,21 @@ def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerti
                             )
         # COLOR NODE POINTS TEXT -------------------------------------------------------------
         # Add node colors and labels based on degree centrality and mapping information
-        node_adjacencies = []
-        for node, adjacencies in enumerate(G.adjacency()):
-            node_adjacencies.append(len(adjacencies[1]))    # Number of connected edges
-            if mappingFile_present:
-                # Convert node to string since mapper keys are strings
-                node_info = mapper.get(str(node), f'Unknown({node})')  # # Get label from mapper, Defaults to 'Unknown' if node not in mapper
-                node_text.append('Node ID: ' + node_info + '<br />Degree Centrality: '+ str(len(adjacencies[1])))
-            else:
-                node_text.append('Node ID: ' + str(node) + '<br />Degree Centrality: '+ str(len(adjacencies[1])))
+        # Number of neighbors of every drawn node in the whole layer, from the CSR adjacency
+        node_adjacencies = context.node_neighbor_counts()[drawn].tolist()
+        # Labels of all nodes in one vectorized lookup, defaults to 'Unknown' if node not in mapper
+        node_info = node_labels(mapper, drawn_nodes, 'Unknown({})') if mappingFile_present else drawn_nodes.tolist()
+        node_text.extend(['Node ID: ' + str(info) + '<br />Degree Centrality: '+ str(count) for info, count in zip(node_info, node_adjacencies)])
         node_trace.marker.color = node_adjacencies
         node_trace.text = node_text
         fig.add_trace(node_trace)
         
+        # The true size of the layer, even when only part of its edges is drawn (see vizSparsify)
+        total_nodes, total_edges = context.counts(include_isolates=False)
+        legend_title = f"Nodes: {total_nodes} | Edges: {total_edges}"
+        if context.sparsified():
+            legend_title += f" ({len(edge_rows)} shown)"
+
         # CREATE LAYOUT ----------------------------------------------------------------------
         # Define the layout for the visualization
         layout = go.Layout(
@@ -103,7 +146,7 @@ def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerti
                     'yanchor': 'top',
                     'font': dict(size=20, color='#343541', family='Arial')
                 },
-                legend_title_text=f"Nodes: {len(G.nodes)} | Edges: {len(G.edges)}",
+                legend_title_text=legend_title,
                 legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
                 hovermode='closest',
                 margin=dict(b=0,l=0,r=0,t=0),
@@ -117,7 +160,8 @@ def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerti
         #final_output_cluster_name = final_output_cluster_name.split('.')[0] # Remove file extension from cluster name for the output file
         resultant_file_name = f"plotly_{final_output_cluster_name}_Network.html"  
         save_path = os.path.join(endPath, "visualization",resultant_file_name)
-        fig.write_html(save_path)  # Save the figure as HTML
+        with atomic_output(save_path) as tmp_path:
+            fig.write_html(tmp_path, include_plotlyjs=plotly_js(os.path.dirname(save_path)))  # Save the figure as HTML, replacing the previous file only once it is complete
         
         # Save_path for MLN ------------------------------------------------------------------
         # save_path = os.path.join(mln_User, resultant_file_name)
@@ -0,0 +1,171 @@
+import os
+import sys
+import time
+import signal
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from vizCaller import createViz, readNCall, resolve_layer, vizTypesByExtension
+
+"""
+    Pre-renders every visualization of a user's MLN result directory in parallel.
+
+    Usage:
+    >>> python preRender.py <user directory> [--mapping DIR] [--workers N] [--timeout SECONDS] [--viz TYPE ...]
+
+    Every (layer, visualization type) pair whose output createViz considers stale is rendered on a
+    process pool, so the first click in the dashboard becomes a cache hit.
+"""
+
+# Extensions of the layer files that can be visualized.
+LAYER_EXTENSIONS = tuple(vizTypesByExtension)
+
+class JobTimeout(BaseException):
+    """
+    Raised inside a worker when a job exceeds its time limit.
+
+    It derives from BaseException so the 'except Exception' blocks of readNCall and of the
+    visualization functions do not swallow it.
+    """
+
+def find_layers(mln_User):
+    """
+    Walks a user's directory and returns every layer file found in it.
+
+    The 'visualization' output directory and hidden directories (such as the '.vizcache' cache
+    folder) are skipped.
+
+    Parameters:
+        mln_User (str): The base path for the user's data directory.
+
+    Returns:
+        list: The sorted paths of the '.net', '.ecom' and '.vcom' files.
+    """
+    layers = []
+    for root, dirs, files in os.walk(mln_User):
+        dirs[:] = [d for d in dirs if d != "visualization" and not d.startswith(".")]
+        layers.extend(os.path.join(root, name) for name in files if name.endswith(LAYER_EXTENSIONS))
+    return sorted(layers)
+
+def stale_jobs(mln_User, mappingInputFile=None, vizTypes=None):
+    """
+    Lists the (layer, visualization type) pairs that need to be rendered.
+
+    Parameters:
+        mln_User (str): The base path for the user's data directory.
+        mappingInputFile (str, optional): The path where the mapping files are stored. Defaults to
+                                          the directory of each layer file.
+        vizTypes (list, optional): Restricts the visualization types, by default every type that
+                                   applies to the layer's extension is considered. The map view
+                                   is only considered for layers that have a mapping file.
+
+    Returns:
+        list: (pathToInputFile, mappingInputFile, vizType) tuples whose output is missing or stale.
+    """
+    jobs = []
+    for pathToInputFile in find_layers(mln_User):
+        mapping_dir = mappingInputFile if mappingInputFile is not None else os.path.dirname(pathToInputFile)
+        layer = resolve_layer(pathToInputFile, mapping_dir, mln_User)
+        for vizType in vizTypesByExtension[layer['input_file_extension']]:
+            if vizTypes is not None and vizType not in vizTypes:
+                continue
+            if vizType == "map_visualization" and not layer['mappingFile_present']:
+                continue
+            if createViz(mln_User, layer['final_output_cluster_name'], vizType, layer['input_file_extension'], layer['input_file'], layer['mapping_file_path']):
+                jobs.append((pathToInputFile, mapping_dir, vizType))
+    return jobs
+
+def print_progress(done, total, outcome):
+    """Default progress reporter, prints one line per finished job."""
+    print(f"[{done}/{total}] {outcome['status']:>7} {outcome['seconds']:8.2f}s {outcome['vizType']} {outcome['input_file']}", flush=True)
+
+def prerender_directory(mln_User, mappingInputFile=None, vizTypes=None, workers=None, timeout=None, progress=print_progress):
+    """
+    Renders every stale visualization of a user's directory on a process pool.
+
+    Parameters:
+        mln_User (str): The base path for the user's data directory.
+        mappingInputFile (str, optional): The path where the mapping files are stored (see stale_jobs).
+        vizTypes (list, optional): Restricts the visualization types (see stale_jobs).
+        workers (int, optional): The number of worker processes, defaults to the number of CPUs.
+        timeout (float, optional): The time limit of a single job in seconds, unlimited if None.
+        progress (callable, optional): Called as progress(done, total, outcome) after each job.
+
+    Returns:
+        list: One outcome dict per job with 'input_file', 'vizType', 'status' ('ok', 'failed' or
+              'timeout'), 'path' (the result of readNCall) and 'seconds'.
+    """
+    jobs = stale_jobs(mln_User, mappingInputFile, vizTypes)
+    outcomes = []
+    if not jobs:
+        return outcomes
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [executor.submit(_render_job, pathToInputFile, mapping_dir, mln_User, vizType, timeout)
+                   for pathToInputFile, mapping_dir, vizType in jobs]
+        for future in as_completed(futures):
+            try:
+                outcome = future.result()
+            except (Exception, JobTimeout) as e:  # e.g. a worker process that died
+                index = futures.index(future)
+                status = 'timeout' if isinstance(e, JobTimeout) else 'failed'
+                outcome = {'input_file': jobs[index][0], 'vizType': jobs[index][2], 'status': status, 'path': str(e), 'seconds': 0.0}
+            outcomes.append(outcome)
+            if progress is not None:
+                progress(len(outcomes), len(jobs), outcome)
+    return outcomes
+
+def _init_worker():
+    """Prepares a worker process: renderers only write files, so matplotlib never needs a display."""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+def _raise_timeout(signum, frame):
+    raise JobTimeout()
+
+def run_with_timeout(function, args, timeout):
+    """
+    Calls function(*args) in a worker process, enforcing the time limit with SIGALRM.
+
+    Parameters:
+        function (callable): readNCall or a function with the same return values.
+        args (tuple): The arguments of the call.
+        timeout (float or None): The time limit in seconds, unlimited if None.
+
+    Returns:
+        tuple: (path, status, seconds) where 'status' is 'ok' if the returned path exists,
+               'failed' otherwise and 'timeout' if the time limit was hit (the path is then False).
+    """
+    start = time.perf_counter()
+    use_alarm = bool(timeout) and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        path = function(*args)
+        status = 'ok' if isinstance(path, str) and os.path.exists(path) else 'failed'
+    except JobTimeout:
+        path, status = False, 'timeout'
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return path, status, time.perf_counter() - start
+
+def _render_job(pathToInputFile, mappingInputFile, mln_User, vizType, timeout):
+    """Runs readNCall for one job inside a worker process (see run_with_timeout)."""
+    path, status, seconds = run_with_timeout(readNCall, (pathToInputFile, mappingInputFile, mln_User, vizType), timeout)
+    return {'input_file': pathToInputFile, 'vizType': vizType, 'status': status, 'path': path, 'seconds': seconds}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render all stale visualizations of an MLN user directory.")
+    parser.add_argument("mln_User", help="the user's data directory (its 'visualization' folder receives the output)")
+    parser.add_argument("--mapping", dest="mappingInputFile", default=None, help="directory of the '.map' files (default: next to each layer)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=None, help="time limit of a single job in seconds")
+    parser.add_argument("--viz", dest="vizTypes", nargs="+", default=None, help="only render these visualization types")
+    args = parser.parse_args(argv)
+
+    outcomes = prerender_directory(args.mln_User, args.mappingInputFile, args.vizTypes, args.workers, args.timeout)
+    failed = [outcome for outcome in outcomes if outcome['status'] != 'ok']
+    print(f"Rendered {len(outcomes) - len(failed)} of {len(outcomes)} stale visualizations, {len(failed)} failed or timed out.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,59 @@
 from pyvis.network import Network  # Imports the Network class from the pyvis module for network visualization.
+import numpy as np  # Imports numpy for the array based node selection.
 import os  # Imports the os module, which provides functions for interacting with the operating system.
-import networkx as nx  # Imports the networkx library, allowing for the creation, manipulation, and study of complex networks.
+from vizContext import LayerContext  # Imports the shared, lazily computed layer state.
+from vizCache import cache_dir_for, atomic_output  # Imports the helpers locating the user's cache folder (stored layouts) and writing files atomically.
+from vizMapping import node_labels  # Imports the vectorized node label lookup.
+from vizStatic import pyvis_html  # Imports the page generation with the shared vis-network bundle.
 
 """
-    WARNING: if this file creates an error when deployed on bangkok
-    refer to the following line:
-    >>> result_net.show(os.path.join(endPath, "visualization",f"pyvis_{clusterName}_Network.html"), notebook=False)
-    
-    and set the notebook parameter to True or remove it.
-    
-    ERROR details:
-    https://stackoverflow.com/questions/75565224/in-pyvis-i-always-get-this-error-attributeerror-nonetype-object-has-no-attr
+    Interactive pyvis (vis.js) view of a '.net' layer.
+
+    With LAYOUT_MODE 'precomputed' (the default) the nodes are placed at the layer's shared
+    layout (see LayerContext.layout) and the physics simulation is off, so the page opens
+    immediately even for large layers. With 'physics' the nodes start from the same positions
+    and the browser runs force_atlas_2based physics, stabilizing for at most
+    STABILIZATION_ITERATIONS iterations. Nodes and edges are loaded into the network in bulk
+    from the context's arrays instead of one add_node/add_edge call at a time (add_edge scans
+    all existing edges for duplicates, which is quadratic).
+
+    The page is generated by vizStatic.pyvis_html, which links the vis-network bundle shared by
+    all pyvis views in the 'static' folder (pyvis' own 'local' resources still load vis.js from
+    a CDN), and written by this module: show() opens a browser and, in its notebook default,
+    fails with "'NoneType' object has no attribute 'render'"
+    (https://stackoverflow.com/questions/75565224/in-pyvis-i-always-get-this-error-attributeerror-nonetype-object-has-no-attr).
 """
 
-def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name):
+# Names of the layout modes, see the module documentation.
+LAYOUT_MODES = ('precomputed', 'physics')
+# Layout mode of the pyvis view.
+LAYOUT_MODE = 'precomputed'
+# Scale of the layout positions, in vis.js canvas pixels.
+POSITION_SCALE = 1000
+# Largest number of stabilization iterations run by the browser in the 'physics' mode.
+STABILIZATION_ITERATIONS = 200
+# Largest number of neighbors listed in a node's tooltip, the others are only counted.
+TOOLTIP_MAX_NEIGHBORS = 20
+
+def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=None, layout_mode=None):
     try:
-        G = nx.Graph()  # Initializes a new graph instance using networkx.
-        # Adds edges to the graph from a list of tuples where each tuple contains node1, node2, and the weight of the edge.
-        G.add_edges_from(((node1, node2, {'weight': weight}) for node1, node2, weight in allEdges)) 
+        layout_mode = LAYOUT_MODE if layout_mode is None else layout_mode
+        if layout_mode not in LAYOUT_MODES:
+            raise ValueError(f"Unknown layout mode '{layout_mode}', expected one of {LAYOUT_MODES}")
+        # Shared layer state (graph arrays, layouts), built here when this view is rendered on its own.
+        if context is None:
+            context = LayerContext(allEdges, noVerticesLayer1, mapper, cache_dir=cache_dir_for(mln_User))
+        nodes = context.node_index()[0]
+        rows, cols, weights = context.edge_index()  # deduplicated edges, positions in 'nodes'
+        # neighbor counts and (truncated) neighbor lists from the sparse graph of the layer
+        graph = context.csr_graph()
+        # like the networkx graph without isolates, only nodes with drawn edges are drawn
+        drawn = np.flatnonzero(graph.neighbor_counts() > 0)
+        # the number of connections in the whole layer, even when only part of its edges is drawn
+        counts = context.node_neighbor_counts()
         
-        # static layout to imporve performance
-        layout = nx.spring_layout(G)
+        # static layout computed on the server (shared with the other views of the layer and stored on disk)
+        layout = context.layout(scale=POSITION_SCALE)
         
         # creating the network graph layout
         result_net = Network(
@@ -36,46 +69,54 @@ def visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerti
         )
         #setting physics layout of the network
         result_net.force_atlas_2based(spring_length=100)
+        if layout_mode == 'precomputed':
+            result_net.toggle_physics(False)  # nodes stay at the precomputed positions
+            result_net.set_edge_smooth("continuous")  # "dynamic" edges need the physics simulation
+        else:
+            result_net.options.physics.stabilization.iterations = STABILIZATION_ITERATIONS
+            result_net.set_edge_smooth("dynamic")  # Sets the edges to be dynamically smooth.
         
-        # Add nodes with labels from the mapper dictionary
-        for node in G.nodes():
-            node_id = str(node) # Converts the node identifier to a string.
-            # Retrieves the label for the node from the mapper dictionary or defaults to "Node {node_id}".
-            node_label = mapper.get(node_id, f"Node {node_id}")
-            result_net.add_node(
-                node_id,
-                label=node_label,  # Sets the label of the node in the visualization.
-                title=node_label,  # Sets the hover-over title of the node in the visualization.
-                border_width=5,  # Sets the border width of nodes.
-                borderWidthSelected=10,  # Sets the border width of nodes when selected.
-                color={'background': 'white', 'border': 'magenta'}, # Sets the background and border colors of nodes.
-                # x=layout[node][0]*1e3, 
-                # y=layout[node][1]*1e3,
-            )
+        # Labels of all nodes from the mapper in one lookup, defaulting to "Node {node_id}".
+        labels = node_labels(mapper, nodes, "Node {}")
+        node_ids = [str(node) for node in nodes.tolist()]
+        # Node dicts as built by Network.add_node, with the neighbors as hover-over title
+        # and the number of connections as value (size).
+        result_net.nodes = []
+        for index in drawn.tolist():
+            neighbors = graph.neighbors(index, TOOLTIP_MAX_NEIGHBORS).tolist()
+            title = "Adjacent Nodes:\n" + "\n".join([labels[neighbor] for neighbor in neighbors])
+            if counts[index] > len(neighbors):
+                title += f"\n... and {counts[index] - len(neighbors)} more"
+            x, y = layout[nodes[index]]
+            result_net.nodes.append({
+                'color': {'background': 'white', 'border': 'magenta'},  # Sets the background and border colors of nodes.
+                'title': title,
+                'border_width': 5,  # Sets the border width of nodes.
+                'borderWidthSelected': 10,  # Sets the border width of nodes when selected.
+                'id': node_ids[index],
+                'label': labels[index],  # Sets the label of the node in the visualization.
+                'shape': 'dot',
+                'font': {'color': result_net.font_color},
+                'value': int(counts[index]),
+                'x': float(x),
+                'y': float(y),
+            })
+        result_net.node_ids = [node['id'] for node in result_net.nodes]
+        result_net.node_map = dict(zip(result_net.node_ids, result_net.nodes))
         
-        # Adds edges to the network visualization with specific styles.
-        for node1,node2,weigth in allEdges:
-            result_net.add_edge(node1, node2, value = weigth, color = {'color': 'cyan', 'highlight': 'pink', 'hover': 'yellow'})
-            
-        # Update node titles with neighbor information
-        neighbor_map = result_net.get_adj_list()
-        for node in result_net.nodes:
-            node_id = node["id"]
-            # Sets the title of each node to list its neighbors.
-            node["title"] = "Adjacent Nodes:\n" + "\n".join([mapper.get(neighbor, f"Node {neighbor}") for neighbor in neighbor_map[node_id]])
-            # Sets the value (size) of the node in the network based on the number of connections.
-            node["value"] = len(neighbor_map[node_id])
-
+        # Edges with specific styles, as built by Network.add_edge.
+        edge_color = {'color': 'cyan', 'highlight': 'pink', 'hover': 'yellow'}
+        result_net.edges = [{'value': weight, 'color': edge_color, 'from': node_ids[row], 'to': node_ids[col]}
+                            for row, col, weight in zip(rows.tolist(), cols.tolist(), weights.tolist())]
 
         result_net.toggle_hide_edges_on_drag(False)  # Keeps edges visible when dragging nodes.
-        result_net.set_edge_smooth("dynamic")  # Sets the edges to be dynamically smooth.
-        # result_net.toggle_physics(False)
         result_net.show_buttons(filter_=['physics'])  # Displays buttons to control physics settings in the network.
-        # Saves and shows the network visualization as an HTML file.
-        # result_net.show(os.path.join(endPath, "visualization",f"pyvis_{clusterName}_Network.html"), notebook=False)
-        result_net.show(os.path.join(endPath, "visualization",f"pyvis_{final_output_cluster_name}_Network.html"))
+        # Saves the network visualization as an HTML file.
+        save_path = os.path.join(endPath, "visualization",f"pyvis_{final_output_cluster_name}_Network.html")
+        html = pyvis_html(result_net, os.path.dirname(save_path))
+        with atomic_output(save_path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(html)
 	# Returns the path to the created visualization.
         return os.path.join(mln_User, "visualization", f"pyvis_{final_output_cluster_name}_Network.html")
     except Exception as e:
             print(f"ERROR occured for pyvis (interactive) visualization: {e}")
-
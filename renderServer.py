@@ -0,0 +1,264 @@
+"""
+    Long-running local render service that keeps the visualization libraries warm.
+
+    Usage:
+    >>> python renderServer.py [--host HOST] [--port PORT] [--workers N] [--timeout SECONDS]
+
+    A dashboard request that calls readNCall directly first imports networkx, bokeh, plotly,
+    pyvis, matplotlib, wordcloud, pandas and circlify, which takes seconds before any work is
+    done. The server imports them once at startup, prints how long every import took (the
+    import-time profile, to track cold-start regressions) and renders on a pool of worker
+    processes that are started, and preloaded, before the first request arrives. This module
+    only imports the standard library (and the plain settings of vizConfig) at the top, so the
+    profile covers every library import.
+
+    Requests are plain HTTP GETs on localhost, answered with JSON:
+    - /render?input=FILE&mapping=DIR&user=DIR&viz=TYPE runs readNCall(FILE, DIR, DIR, TYPE);
+    - /community?input=...&mapping=...&user=...&viz=...&community=ID runs readNCallCommunity;
+    - /files/PATH returns a file of a 'visualization' folder (with its '.br'/'.gz' copy when the
+      client accepts that encoding);
+    - /profile returns the import-time profile of the server;
+    - /health returns the number of workers.
+    Render answers hold 'path' (the return value of readNCall), 'status' ('ok', 'failed' or
+    'timeout') and 'seconds'. With '&open=1' a successful render is instead answered with a
+    redirect to /files/PATH, which is how the super-nodes of a community overview in the 'server'
+    link mode open the page of their community (see vizOverview.community_page_url). Relative paths are resolved against
+    the server's working directory, so the server is started from the directory the dashboard
+    runs in.
+"""
+
+import os
+import sys
+import json
+import time
+import multiprocessing
+import argparse
+import importlib
+import mimetypes
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote, unquote
+from concurrent.futures import ProcessPoolExecutor
+from vizConfig import DEFAULT_HOST, DEFAULT_PORT
+
+# Prefix of the requests for visualization files.
+FILES_PREFIX = "/files/"
+# Content encodings of the precompressed copies (see vizStatic.precompress), in order of preference.
+CONTENT_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Largest time in seconds a worker waits at startup for the other workers to be preloaded.
+WARM_UP_TIMEOUT = 600
+
+# Third-party libraries imported by the renderers, preloaded before the renderer modules.
+PRELOAD_LIBRARIES = (
+    "numpy",
+    "scipy.sparse",
+    "pandas",
+    "networkx",
+    "bokeh.plotting",
+    "bokeh.models",
+    "plotly.graph_objects",
+    "plotly.express",
+    "pyvis.network",
+    "matplotlib.pyplot",
+    "wordcloud",
+    "circlify",
+)
+
+def preload_modules(module_names=None):
+    """
+    Imports modules one by one and measures the time each import takes.
+
+    A module's time only covers what was not imported before it, so the profile of the default
+    list shows the libraries' own import cost first and then what each renderer adds.
+
+    Parameters:
+        module_names (list, optional): The modules to import, defaults to PRELOAD_LIBRARIES
+                                       followed by vizCaller, preRender and every renderer and
+                                       shared helper module.
+
+    Returns:
+        list: One dict per module with 'module', 'seconds' and 'error' (None, or the message of
+              the ImportError of a missing optional library).
+    """
+    if module_names is None:
+        profile = preload_modules(list(PRELOAD_LIBRARIES) + ["vizCaller", "preRender"])
+        vizCaller = sys.modules["vizCaller"]
+        return profile + preload_modules(list(dict.fromkeys(vizCaller.vizModules.values())) + vizCaller.vizSharedModules)
+    # renderers only write files, matplotlib must not look for a display
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    profile = []
+    for name in module_names:
+        start = time.perf_counter()
+        error = None
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            error = str(e)
+        profile.append({'module': name, 'seconds': time.perf_counter() - start, 'error': error})
+    return profile
+
+def format_import_profile(profile):
+    """Formats an import-time profile (see preload_modules) as one line per module and a total."""
+    lines = [f"{entry['seconds']:8.3f}s  {entry['module']}" + (f"  (not available: {entry['error']})" if entry['error'] else "")
+             for entry in profile]
+    lines.append(f"{sum(entry['seconds'] for entry in profile):8.3f}s  total")
+    return "\n".join(lines)
+
+# Barrier of the warm-up jobs, set in every worker by _init_worker.
+_start_barrier = None
+
+def _init_worker(barrier):
+    """Prepares a worker process and imports everything a render needs (a no-op for modules inherited from the server)."""
+    global _start_barrier
+    preload_modules()
+    sys.modules["preRender"]._init_worker()
+    _start_barrier = barrier
+
+def _warm_up():
+    """
+    Runs once per worker at startup, so every worker exists and is preloaded before the first request.
+
+    Each warm-up job holds its worker at the barrier until all workers hold one, so no worker
+    can take a second job and every worker runs exactly one.
+    """
+    _start_barrier.wait(WARM_UP_TIMEOUT)
+    return os.getpid()
+
+def _render_request(function_name, args, timeout):
+    """Runs readNCall or readNCallCommunity in a worker process (see preRender.run_with_timeout)."""
+    import preRender
+    import vizCaller
+    function = vizCaller.readNCallCommunity if function_name == "community" else vizCaller.readNCall
+    path, status, seconds = preRender.run_with_timeout(function, args, timeout)
+    return {'path': path, 'status': status, 'seconds': seconds}
+
+class RenderServer(ThreadingHTTPServer):
+    """
+    HTTP server that hands render requests to a pool of warm worker processes.
+
+    Each request is served on its own thread, which waits for the worker rendering it, so up to
+    'workers' views render at the same time.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, timeout=None):
+        """
+        Parameters:
+            address (tuple): The (host, port) to listen on.
+            workers (int, optional): The number of worker processes, defaults to the number of CPUs.
+            timeout (float, optional): The time limit of a single render in seconds, unlimited if None.
+        """
+        super().__init__(address, RenderRequestHandler)
+        self.timeout_seconds = timeout
+        # the server imports everything first, so workers forked from it start warm
+        self.import_profile = preload_modules()
+        print("Import-time profile:")
+        print(format_import_profile(self.import_profile), flush=True)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(multiprocessing.Barrier(self.workers),))
+        for future in [self.executor.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+
+    def render(self, function_name, args):
+        """Renders a view on the worker pool and returns the JSON answer (see _render_request)."""
+        return self.executor.submit(_render_request, function_name, args, self.timeout_seconds).result()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(cancel_futures=True)
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """Answers the GET requests listed in the module documentation."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/render":
+                self._answer_render(self.server.render("render", self._view_args(params)), params)
+            elif url.path == "/community":
+                args = self._view_args(params) + (int(params['community']),)
+                self._answer_render(self.server.render("community", args), params)
+            elif url.path.startswith(FILES_PREFIX):
+                self._send_file(unquote(url.path[len(FILES_PREFIX):]))
+            elif url.path == "/profile":
+                self._reply(200, {'modules': self.server.import_profile,
+                                  'total_seconds': sum(entry['seconds'] for entry in self.server.import_profile)})
+            elif url.path == "/health":
+                self._reply(200, {'status': 'ok', 'workers': self.server.workers})
+            else:
+                self._reply(404, {'error': f"Unknown request: {url.path}"})
+        except (KeyError, ValueError) as e:
+            self._reply(400, {'error': f"Missing or invalid parameter: {e}"})
+        except Exception as e:  # e.g. a worker process that died
+            print(f"ERROR occured for request {self.path}: {e}")
+            self._reply(500, {'error': str(e)})
+
+    @staticmethod
+    def _view_args(params):
+        """Returns the readNCall arguments (input file, mapping directory, user directory, visualization type) of a request."""
+        return (params['input'], params['mapping'], params['user'], params['viz'])
+
+    def _answer_render(self, answer, params):
+        """Replies with the JSON answer of a render, or with '&open=1' redirects to the rendered file."""
+        if params.get('open') != "1":
+            self._reply(200, answer)
+        elif answer['status'] != 'ok':
+            self._reply(500, answer)
+        else:
+            self.send_response(303)
+            self.send_header("Location", FILES_PREFIX + quote(os.path.relpath(answer['path'])))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def _send_file(self, path):
+        """Sends a file below the working directory that lies in a 'visualization' folder."""
+        path = os.path.normpath(path)
+        parts = path.split(os.sep)
+        if os.path.isabs(path) or parts[0] == ".." or "visualization" not in parts[:-1] or not os.path.isfile(path):
+            self._reply(404, {'error': f"Unknown file: {path}"})
+            return
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        accepted = self.headers.get("Accept-Encoding", "")
+        encoding = next(((name, extension) for name, extension in CONTENT_ENCODINGS
+                         if name in accepted and os.path.isfile(path + extension)), None)
+        with open(path + encoding[1] if encoding else path, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding[0])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reply(self, status, answer):
+        body = json.dumps(answer).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve visualization renders from warm worker processes.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=None, help="time limit of a single render in seconds")
+    args = parser.parse_args(argv)
+
+    server = RenderServer((args.host, args.port), args.workers, args.timeout)
+    print(f"Render server listening on http://{args.host}:{args.port} with {server.workers} workers", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
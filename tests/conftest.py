@@ -0,0 +1,30 @@
+import os
+import sys
+import pytest
+
+# the modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def write_net_layer(user_dir, name="L1", cluster_name="L1.txt", num_vertices=12, edges=((0, 1), (1, 2), (2, 3), (3, 0), (4, 5), (5, 6), (6, 4), (7, 8))):
+    """Writes a small '.net' layer '<user>_<name>.net' into 'user_dir' and returns its path."""
+    os.makedirs(os.path.join(user_dir, "visualization"), exist_ok=True)
+    path = os.path.join(user_dir, f"{os.path.basename(user_dir)}_{name}.net")
+    with open(path, "w") as f:
+        f.write(f"{cluster_name}\n{num_vertices}\n{len(edges)}\n")
+        for vertex in range(num_vertices):
+            f.write(f"{vertex},v{vertex}\n")
+        for v1, v2 in edges:
+            f.write(f"{v1},{v2},1.0\n")
+    return path
+
+@pytest.fixture
+def user_dir(tmp_path, monkeypatch):
+    """A user directory 'user1' in a temporary working directory, as the dashboard passes it (relative)."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.join("user1", "visualization"))
+    return "user1"
+
+@pytest.fixture
+def net_layer(user_dir):
+    """The path of a small '.net' layer of 'user_dir' whose header names it 'L1.txt' (see write_net_layer)."""
+    return write_net_layer(user_dir)
@@ -0,0 +1,48 @@
+import numpy as np
+import circlify
+import bubbleChartViz
+from bubbleChartViz import community_bubbles, BUBBLE_MAX_COMMUNITIES
+
+def stats(sizes, ids=None):
+    ids = np.arange(1, len(sizes) + 1) if ids is None else np.asarray(ids)
+    return {'community': ids, 'size': np.asarray(sizes, dtype=np.int64)}
+
+def test_every_community_gets_a_circle_up_to_the_limit():
+    labels, sizes = community_bubbles(stats([2, 5, 1, 5], ids=[7, 3, 9, 4]))
+    # largest first, ties in file order
+    assert labels == ['c3', 'c4', 'c7', 'c9']
+    assert sizes == [5, 5, 2, 1]
+
+def test_smaller_communities_share_the_other_circle():
+    num_communities = BUBBLE_MAX_COMMUNITIES + 10
+    rng = np.random.default_rng(3)
+    sizes = rng.integers(1, 20, num_communities)
+    labels, values = community_bubbles(stats(sizes))
+    assert len(labels) == len(values) == BUBBLE_MAX_COMMUNITIES + 1
+    assert labels[-1] == "other (10 communities)"
+    order = np.argsort(-sizes, kind='stable')
+    assert labels[:-1] == [f"c{community + 1}" for community in order[:BUBBLE_MAX_COMMUNITIES].tolist()]
+    assert values[:-1] == sorted(sizes.tolist(), reverse=True)[:BUBBLE_MAX_COMMUNITIES]
+    assert values[-1] == sizes[order[BUBBLE_MAX_COMMUNITIES:]].sum()
+    assert sum(values) == sizes.sum()
+    assert community_bubbles(stats(sizes), max_communities=3)[0][-1] == f"other ({num_communities - 3} communities)"
+
+def test_circlify_inputs(tmp_path, monkeypatch):
+    calls = []
+    circlify_circles = circlify.circlify
+    def record(data, **kwargs):
+        calls.append(data)
+        return circlify_circles(data, **kwargs)
+    monkeypatch.setattr(circlify, "circlify", record)
+    (tmp_path / "visualization").mkdir()
+    communities = {community: list(range(community * 10, community * 10 + community % 7 + 1)) for community in range(1, 61)}
+    data = {'Layer': 'L3', 'Communities': communities}
+    result = bubbleChartViz.visualization(data, {}, "user1", str(tmp_path), False, None, "user1_L3.vcom", "L3")
+    assert result == "user1/visualization/bubblechart_L3_vcom.html"
+    assert (tmp_path / "visualization" / "bubblechart_L3_vcom.html").read_text().startswith("<img src='data:image/png;base64,")
+    data, = calls
+    assert len(data) == BUBBLE_MAX_COMMUNITIES + 1
+    assert data[0] == {'id': 'c6', 'datum': 7}
+    sizes = sorted((len(members) for members in communities.values()), reverse=True)
+    assert [entry['datum'] for entry in data] == sizes[:BUBBLE_MAX_COMMUNITIES] + [sum(sizes[BUBBLE_MAX_COMMUNITIES:])]
+    assert data[-1]['id'] == "other (10 communities)"
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import plotly.graph_objects as go
+import mapVisualization
+from vizParser import EdgeArrays
+from vizContext import LayerContext
+from vizMapping import NodeMapping
+
+# node 2 has no coordinates and node 5 is not mapped at all, both are left off the map
+MAPPER = {
+    "0": "10.0,20.0,AAA",
+    "1": "11.0,21.0,BBB",
+    "2": "Unknown airport",
+    "3": "13.0,23.0,DDD",
+    "4": "14.0,24.0,EEE",
+}
+
+@pytest.fixture
+def rendered(tmp_path, monkeypatch):
+    """Renders the map view of a small layer and returns the figure instead of writing it."""
+    figures = []
+    def write_html(figure, path, **kwargs):
+        figures.append(figure)
+        open(path, "w").close()
+    monkeypatch.setattr(go.Figure, "write_html", write_html)
+    (tmp_path / "visualization").mkdir()
+    def render(rows, cols, mapper=MAPPER):
+        edges = EdgeArrays(np.array(rows, dtype=np.int32), np.array(cols, dtype=np.int32), np.ones(len(rows), dtype=np.float32))
+        mapping = NodeMapping.from_dict(mapper)
+        context = LayerContext(edges, 6, mapping)
+        mapVisualization.visualization(edges, mapping, str(tmp_path), str(tmp_path), str(len(rows)), "6", True, "L1.txt", context=context)
+        return figures[-1]
+    return render
+
+def test_located_skips_nodes_without_coordinates():
+    rows, latitude, longitude = NodeMapping.from_dict(MAPPER).located()
+    assert rows.tolist() == [0, 1, 3, 4]
+    assert latitude.tolist() == [10.0, 11.0, 13.0, 14.0]
+    assert longitude.tolist() == [20.0, 21.0, 23.0, 24.0]
+
+def test_one_nan_separated_trace_for_the_located_edges(rendered):
+    # 1-2 and 4-5 have an endpoint off the map
+    figure = rendered([0, 1, 3, 4], [1, 2, 4, 5])
+    nodes, edges = figure.data
+    assert list(nodes.text) == ["0", "1", "3", "4"]
+    assert edges.mode == "lines"
+    lon = np.asarray(edges.lon, dtype=float).reshape(-1, 3)
+    lat = np.asarray(edges.lat, dtype=float).reshape(-1, 3)
+    assert len(edges.lon) == len(edges.lat) == 3 * 2
+    assert np.isnan(lon[:, 2]).all() and np.isnan(lat[:, 2]).all()
+    assert lon[:, :2].tolist() == [[20.0, 21.0], [23.0, 24.0]]
+    assert lat[:, :2].tolist() == [[10.0, 11.0], [13.0, 14.0]]
+
+def test_no_edge_trace_when_no_edge_is_located(rendered):
+    figure = rendered([1, 4], [2, 5])
+    assert len(figure.data) == 1
+
+def test_hover_text_per_node(rendered):
+    figure = rendered([0, 1, 3, 4], [1, 2, 4, 5])
+    assert list(figure.data[0].hovertext) == [
+        "ID: 0<br>Label: AAA<br>Lat: 10.0<br>Lon: 20.0<br>Degree: 1",
+        "ID: 1<br>Label: BBB<br>Lat: 11.0<br>Lon: 21.0<br>Degree: 2",
+        "ID: 3<br>Label: DDD<br>Lat: 13.0<br>Lon: 23.0<br>Degree: 1",
+        "ID: 4<br>Label: EEE<br>Lat: 14.0<br>Lon: 24.0<br>Degree: 2",
+    ]
+
+def test_hover_text_without_labels(rendered):
+    figure = rendered([0], [1], mapper={"0": "10.0,20.0", "1": "11.0,21.0"})
+    assert list(figure.data[0].hovertext) == [
+        "ID: 0<br>Lat: 10.0<br>Lon: 20.0<br>Degree: 1",
+        "ID: 1<br>Lat: 11.0<br>Lon: 21.0<br>Degree: 1",
+    ]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import plotly.graph_objects as go
+import plotlyVisualization
+from plotlyVisualization import edge_traces, EDGE_WIDTH_BUCKETS
+from vizParser import EdgeArrays
+from vizContext import LayerContext
+
+POSITIONS = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+
+def segments(trace):
+    """Returns the (x0, y0, x1, y1) segments of an edge trace, checking the NaN gaps between them."""
+    x, y = np.asarray(trace.x, dtype=float).reshape(-1, 3), np.asarray(trace.y, dtype=float).reshape(-1, 3)
+    assert np.isnan(x[:, 2]).all() and np.isnan(y[:, 2]).all()
+    return [tuple(values) for values in np.column_stack([x[:, 0], y[:, 0], x[:, 1], y[:, 1]]).tolist()]
+
+def test_one_trace_per_weight_when_they_fit_the_buckets():
+    rows, cols, weights = np.array([0, 1, 2, 3]), np.array([1, 2, 3, 0]), np.array([1.0, 2.0, 1.0, 3.0])
+    traces = edge_traces(POSITIONS, rows, cols, weights)
+    assert [trace.line.width for trace in traces] == [1.0, 2.0, 3.0]
+    assert all(isinstance(trace, go.Scatter) for trace in traces)
+    assert segments(traces[0]) == [(0.0, 0.0, 1.0, 0.0), (1.0, 1.0, 0.0, 1.0)]
+    assert segments(traces[2]) == [(0.0, 1.0, 0.0, 0.0)]
+
+def test_many_weights_are_bucketed_by_quantile():
+    rng = np.random.default_rng(1)
+    num_edges = 500
+    rows, cols = rng.integers(0, 4, num_edges), rng.integers(0, 4, num_edges)
+    weights = rng.random(num_edges) * 10
+    traces = edge_traces(POSITIONS, rows, cols, weights)
+    assert len(traces) == EDGE_WIDTH_BUCKETS
+    assert sum(len(segments(trace)) for trace in traces) == num_edges
+    # buckets of heavier edges are drawn wider, with the mean weight of the bucket
+    widths = [trace.line.width for trace in traces]
+    assert widths == sorted(widths)
+    assert weights.min() < widths[0] and widths[-1] < weights.max()
+    # quantile buckets hold about the same number of edges
+    assert all(len(segments(trace)) == pytest.approx(num_edges / EDGE_WIDTH_BUCKETS, abs=1) for trace in traces)
+    assert len(edge_traces(POSITIONS, rows, cols, weights, buckets=3)) == 3
+
+def test_webgl_and_no_edges():
+    traces = edge_traces(POSITIONS, np.array([0]), np.array([1]), np.array([1.0]), webgl=True)
+    assert isinstance(traces[0], go.Scattergl)
+    assert edge_traces(POSITIONS, np.zeros(0, int), np.zeros(0, int), np.zeros(0)) == []
+
+@pytest.fixture
+def rendered(tmp_path, monkeypatch):
+    """Renders the plotly view of a small layer and returns the figure instead of writing it."""
+    figures = []
+    def write_html(figure, path, **kwargs):
+        figures.append(figure)
+        open(path, "w").close()
+    monkeypatch.setattr(go.Figure, "write_html", write_html)
+    (tmp_path / "visualization").mkdir()
+    edges = EdgeArrays(np.array([0, 1, 2, 4], dtype=np.int32), np.array([1, 2, 0, 5], dtype=np.int32), np.ones(4, dtype=np.float32))
+    def render(**kwargs):
+        context = LayerContext(edges, 6)
+        plotlyVisualization.visualization(edges, {}, str(tmp_path), str(tmp_path), "4", "6", False, "L1", context=context, **kwargs)
+        return context, figures[-1]
+    return render
+
+def test_nodes_are_drawn_at_the_context_positions(rendered):
+    context, figure = rendered()
+    node_trace = figure.data[-1]
+    positions = context.positions(preferred='kamada_kawai')
+    drawn = np.flatnonzero(context.endpoints())
+    assert np.allclose(node_trace.x, positions[drawn, 0]) and np.allclose(node_trace.y, positions[drawn, 1])
+    assert len(node_trace.x) == 5  # node 3 has no edge
+
+def test_webgl_switch(rendered, monkeypatch):
+    assert all(isinstance(trace, go.Scatter) for trace in rendered()[1].data)
+    monkeypatch.setattr(plotlyVisualization, "WEBGL_MIN_EDGES", 4)
+    assert all(isinstance(trace, go.Scattergl) for trace in rendered()[1].data)
+    assert all(isinstance(trace, go.Scatter) for trace in rendered(webgl=False)[1].data)
@@ -0,0 +1,9 @@
+import preRender
+
+def test_second_run_schedules_no_jobs(user_dir, net_layer):
+    jobs = preRender.stale_jobs(user_dir)
+    assert sorted(vizType for _, _, vizType in jobs) == ["bokeh_dc_visualization", "bokeh_visualization", "plotly_visualization", "pyvis_visualization"]
+    outcomes = preRender.prerender_directory(user_dir, workers=1, progress=None)
+    assert [outcome['status'] for outcome in outcomes] == ['ok'] * len(jobs)
+    assert preRender.stale_jobs(user_dir) == []
+    assert preRender.prerender_directory(user_dir, workers=1, progress=None) == []
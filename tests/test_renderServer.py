@@ -0,0 +1,13 @@
+import os
+import renderServer
+
+def test_every_worker_is_started_and_preloaded():
+    server = renderServer.RenderServer(("127.0.0.1", 0), workers=3)
+    try:
+        processes = dict(server.executor._processes)
+        assert len(processes) == 3 and all(process.is_alive() for process in processes.values())
+        # each worker ran one warm-up job, none is still held at the barrier
+        pids = {server.executor.submit(os.getpid).result() for _ in range(12)}
+        assert pids <= set(processes)
+    finally:
+        server.server_close()
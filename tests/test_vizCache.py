@@ -0,0 +1,66 @@
+import os
+import threading
+import numpy as np
+from vizCache import _save_arrays, _load_arrays, write_manifest, read_manifest
+
+def test_threads_storing_the_same_key(tmp_path, capsys):
+    cache_dir = str(tmp_path)
+    values = np.arange(200000)
+    barrier = threading.Barrier(8)
+    errors = []
+    def store():
+        barrier.wait()
+        try:
+            for _ in range(5):
+                _save_arrays(cache_dir, "layouts", "key", nodes=values, positions=values * 2)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=store) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    # a failed store is only reported, see _save_arrays
+    assert "Could not store" not in capsys.readouterr().out
+    nodes, positions = _load_arrays(cache_dir, "layouts", "key", ("nodes", "positions"))
+    assert np.array_equal(nodes, values) and np.array_equal(positions, values * 2)
+    # no temporary files are left behind
+    assert os.listdir(os.path.join(cache_dir, "layouts")) == ["key.npz"]
+
+def test_manifest_round_trip(tmp_path):
+    viz_file_path = str(tmp_path / "bokeh_L1_Network.html")
+    write_manifest(viz_file_path, {'vizType': "bokeh_visualization", 'renderer': "abc"})
+    assert read_manifest(viz_file_path) == {'vizType': "bokeh_visualization", 'renderer': "abc"}
+    assert sorted(os.listdir(tmp_path)) == ["bokeh_L1_Network.html.manifest.json"]
+
+def test_replacing_a_file_drops_its_compressed_copies(tmp_path):
+    from vizCache import atomic_output
+    from vizStatic import precompress
+    path = str(tmp_path / "bokeh_L1_Network.html")
+    with atomic_output(path) as tmp, open(tmp, "w") as f:
+        f.write("old")
+    assert precompress(path, enabled=True)
+    with atomic_output(path) as tmp, open(tmp, "w") as f:
+        f.write("new")
+        # the previous copies are kept while the new file is written
+        assert os.path.exists(path + ".gz")
+    assert sorted(os.listdir(tmp_path)) == ["bokeh_L1_Network.html"]
+
+def test_layers_with_the_same_name_keep_their_own_entries(tmp_path):
+    from conftest import write_net_layer
+    from vizCache import load_layer
+    first = write_net_layer(str(tmp_path / "a" / "user1"), edges=((0, 1), (2, 3)))
+    second = write_net_layer(str(tmp_path / "b" / "user1"), edges=((4, 5), (6, 7)))
+    # same name, size and modification time
+    os.utime(second, ns=(os.stat(first).st_atime_ns, os.stat(first).st_mtime_ns))
+    cache_dir = str(tmp_path / "cache")
+    for _ in range(2):
+        assert load_layer(first, cache_dir)[1]['src'].tolist() == [0, 2]
+        assert load_layer(second, cache_dir)[1]['src'].tolist() == [4, 6]
+    assert len(os.listdir(os.path.join(cache_dir, "layers"))) == 2
+    # an edited file replaces its own entry only
+    with open(first, "a") as f:
+        f.write("8,9,1.0\n")
+    assert load_layer(first, cache_dir)[1]['src'].tolist() == [0, 2, 8]
+    assert len(os.listdir(os.path.join(cache_dir, "layers"))) == 2
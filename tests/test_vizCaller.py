@@ -0,0 +1,36 @@
+import os
+import vizCaller
+
+def test_net_view_is_written_under_the_checked_name(user_dir, net_layer):
+    # the header calls the layer 'L1.txt', the file is named after the input file
+    path = vizCaller.readNCall(net_layer, user_dir, user_dir, "bokeh_dc_visualization")
+    assert path == os.path.join(user_dir, "visualization", "bokeh_DC_L1_Network.html")
+    assert os.path.exists(path)
+    assert os.path.exists(path + ".manifest.json")
+    assert not vizCaller.createViz(user_dir, "L1", "bokeh_dc_visualization", ".net", net_layer, None)
+
+def test_fresh_view_is_reused(user_dir, net_layer):
+    path = vizCaller.readNCall(net_layer, user_dir, user_dir, "bokeh_dc_visualization")
+    mtime = os.stat(path).st_mtime_ns
+    assert vizCaller.readNCall(net_layer, user_dir, user_dir, "bokeh_dc_visualization") == path
+    assert os.stat(path).st_mtime_ns == mtime
+
+def test_changed_input_is_rendered_again(user_dir, net_layer):
+    vizCaller.readNCall(net_layer, user_dir, user_dir, "bokeh_dc_visualization")
+    with open(net_layer, "a") as f:
+        f.write("9,10,1.0\n")
+    assert vizCaller.createViz(user_dir, "L1", "bokeh_dc_visualization", ".net", net_layer, None)
+
+def test_concurrent_requests_render_a_net_view_once(user_dir, net_layer, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    renders = []
+    render_view = vizCaller.render_view
+    def counting_render_view(*args, **kwargs):
+        renders.append(args[3])
+        return render_view(*args, **kwargs)
+    monkeypatch.setattr(vizCaller, "render_view", counting_render_view)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        paths = list(executor.map(lambda _: vizCaller.readNCall(net_layer, user_dir, user_dir, "bokeh_visualization"), range(4)))
+    assert renders == ["bokeh_visualization"]
+    assert set(paths) == {os.path.join(user_dir, "visualization", "bokeh_L1_Network.html")}
+    assert os.path.exists(paths[0])
@@ -0,0 +1,46 @@
+import networkx as nx
+import pytest
+from vizCommunity import (choose_algorithm, detect_communities, communities_to_labels, labels_to_communities,
+                          GREEDY_MODULARITY_MAX_NODES, LOUVAIN_MAX_NODES)
+
+@pytest.mark.parametrize("num_nodes, expected", [
+    (0, 'greedy_modularity'),
+    (GREEDY_MODULARITY_MAX_NODES, 'greedy_modularity'),
+    (GREEDY_MODULARITY_MAX_NODES + 1, 'louvain'),
+    (LOUVAIN_MAX_NODES, 'louvain'),
+    (LOUVAIN_MAX_NODES + 1, 'label_propagation'),
+])
+def test_choose_algorithm_thresholds(num_nodes, expected):
+    assert choose_algorithm(num_nodes) == expected
+
+def test_explicit_algorithm():
+    assert choose_algorithm(10, 'label_propagation') == 'label_propagation'
+    assert choose_algorithm(10**6, 'greedy_modularity') == 'greedy_modularity'
+    with pytest.raises(ValueError):
+        choose_algorithm(10, 'girvan_newman')
+
+def test_greedy_modularity_keeps_the_networkx_order():
+    # three triangles of equal size, networkx does not list them by their smallest node
+    G = nx.Graph([(9, 10), (10, 11), (11, 9), (0, 1), (1, 2), (2, 0), (5, 6), (6, 7), (7, 5)])
+    expected = [set(community) for community in nx.community.greedy_modularity_communities(G)]
+    assert detect_communities(G, 'greedy_modularity', 42) == expected == [{9, 10, 11}, {0, 1, 2}, {5, 6, 7}]
+    G = nx.les_miserables_graph()
+    assert detect_communities(G, 'greedy_modularity', 42) == [set(community) for community in nx.community.greedy_modularity_communities(G)]
+
+@pytest.mark.parametrize("algorithm", ['louvain', 'label_propagation'])
+def test_seeded_algorithms_are_reproducible(algorithm):
+    G = nx.relabel_nodes(nx.les_miserables_graph(), {name: i for i, name in enumerate(nx.les_miserables_graph())})
+    first = detect_communities(G, algorithm, 42)
+    assert detect_communities(G, algorithm, 42) == first
+    assert set().union(*first) == set(G.nodes())
+    sizes = [len(community) for community in first]
+    assert sizes == sorted(sizes, reverse=True)
+
+def test_labels_round_trip():
+    import numpy as np
+    communities = [{9, 10, 11}, {0, 1, 2}, {5}]
+    nodes = np.array([0, 1, 2, 5, 9, 10, 11])
+    labels = communities_to_labels(communities, nodes)
+    assert labels.tolist() == [1, 1, 1, 2, 0, 0, 0]
+    assert labels_to_communities(labels, nodes) == communities
+    assert detect_communities(nx.Graph(), 'louvain', 42) == []
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from vizParser import parse_ecom_file, parse_vcom_file
+from vizContext import CommunityLayer
+from vizCommunityStats import stats_of
+
+ECOM = ("# Edge Community File for Layer\nL2\n# Number of Vertices\n8\n# Number of Non-Singleton Communities\n3\n"
+        "# Number of Community Edges\n7\n# Edge Community Allocation\n"
+        "5,6,9\n0,1,2\n1,2,2\n2,0,2\n6,7,9\n2,3,2\n3,4,4\n")
+VCOM = ("# Vertex Community File for Layer\nL3\n# Number of Vertices\n6\n# Number of Total Communities\n3\n"
+        "# Vertex Community Allocation\n4,2\n1,1\n2,1\n3,1\n5,3\n6,2\n")
+
+def direct_stats(communities, edge_communities):
+    """The statistics as the word cloud computed them from data['Communities'], in order of first appearance."""
+    rows = []
+    for community, members in communities.items():
+        nodes = len({vertex for edge in members for vertex in edge}) if edge_communities else len(set(members))
+        edges = len(members) if edge_communities else 0
+        rows.append((community, len(members), nodes, edges,
+                     2 * edges / (nodes if nodes > 0 else 1), 2 * edges / (nodes * (nodes - 1) if nodes > 1 else 1)))
+    return rows
+
+def as_rows(stats):
+    return list(zip(*(stats[name].tolist() for name in ('community', 'size', 'nodes', 'edges', 'average_degree', 'density'))))
+
+@pytest.mark.parametrize("extension, text", [(".ecom", ECOM), (".vcom", VCOM)])
+def test_stats_match_a_direct_count(tmp_path, extension, text):
+    path = tmp_path / f"user1_L{extension}"
+    path.write_text(text)
+    header, arrays = (parse_ecom_file if extension == ".ecom" else parse_vcom_file)(str(path))
+    # the CommunityLayer of load_inputs and a plain 'data' dict holding only the allocation
+    data = CommunityLayer(header, extension, arrays, str(path), cache_dir=str(tmp_path / "cache"))
+    communities = data['Communities']
+    expected = direct_stats(communities, extension == ".ecom")
+    assert [row[0] for row in expected] == ([9, 2, 4] if extension == ".ecom" else [2, 1, 3])
+    assert as_rows(stats_of(data, extension)) == pytest.approx(expected)
+    assert as_rows(stats_of({'Communities': communities}, extension.lstrip('.'))) == pytest.approx(expected)
+    # stored in the cache folder and read back by a new layer
+    assert as_rows(CommunityLayer(header, extension, arrays, str(path), cache_dir=str(tmp_path / "cache")).stats()) == pytest.approx(expected)
+
+def test_word_cloud_labels_aggregate_the_community_sizes(tmp_path):
+    path = tmp_path / "user1_L2.ecom"
+    path.write_text(ECOM)
+    header, arrays = parse_ecom_file(str(path))
+    data = CommunityLayer(header, ".ecom", arrays, str(path))
+    stats = stats_of(data, "ecom")
+    # the frequencies of the word cloud, as wordCloudViz builds them
+    frequencies = {'C' + str(key): value for key, value in zip(stats['community'].tolist(), stats['size'].tolist())}
+    assert frequencies == {'C' + str(key): len(value) for key, value in data['Communities'].items()} == {'C9': 2, 'C2': 4, 'C4': 1}
+    # the legend lists the communities with the most nodes first
+    order = np.argsort(-stats['nodes'], kind='stable')
+    assert stats['community'][order].tolist() == [2, 9, 4]
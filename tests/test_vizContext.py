@@ -0,0 +1,67 @@
+import networkx as nx
+import pytest
+from vizParser import parse_ecom_file, parse_vcom_file
+from vizContext import CommunityLayer
+
+# node 2 and 6 are allocated to two communities, 4-3 repeats 3-4 reversed and 8 has a self-loop
+ECOM = ("# Edge Community File for Layer\nL2\n# Number of Vertices\n9\n# Number of Non-Singleton Communities\n3\n"
+        "# Number of Community Edges\n9\n# Edge Community Allocation\n"
+        "5,6,9\n0,1,2\n1,2,2\n2,0,2\n6,7,9\n2,3,4\n3,4,4\n4,3,4\n8,8,5\n6,2,5\n")
+
+def baseline_graph(path):
+    """The graph readNCall built while reading the allocation of a '.ecom' file line by line."""
+    G = nx.Graph()
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    for i, line in enumerate(lines):
+        if line.startswith('# Edge Community Allocation'):
+            for j in range(i+1, len(lines)):
+                if not lines[j].startswith('#'):
+                    v1id, v2id, commID = map(int, lines[j].strip().split(','))
+                    G.add_node(v1id, community=commID)
+                    G.add_node(v2id, community=commID)
+                    G.add_edge(v1id, v2id)
+    return G
+
+@pytest.fixture
+def ecom_layer(tmp_path):
+    path = tmp_path / "user1_L2.ecom"
+    path.write_text(ECOM)
+    header, arrays = parse_ecom_file(str(path))
+    return str(path), CommunityLayer(header, ".ecom", arrays, str(path))
+
+def test_lazy_graph_matches_the_baseline_graph(ecom_layer):
+    path, layer = ecom_layer
+    G, expected = layer.graph(), baseline_graph(path)
+    assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(G.edges()) == list(expected.edges())
+    assert layer.num_nodes() == expected.number_of_nodes()
+    assert layer.graph() is G
+
+def test_subset_graph_is_the_induced_subgraph(ecom_layer):
+    path, layer = ecom_layer
+    subset = layer.subset([2, 3, 4, 6], Layer="L2 community 4")
+    expected = baseline_graph(path).subgraph([2, 3, 4, 6])
+    assert sorted(subset.graph().nodes(data=True)) == sorted(expected.nodes(data=True))
+    assert sorted(map(sorted, subset.graph().edges())) == sorted(map(sorted, expected.edges()))
+    assert subset['Layer'] == "L2 community 4" and layer['Layer'] == "L2"
+    assert subset.num_nodes() == 4
+
+def test_mapping_interface(ecom_layer):
+    _, layer = ecom_layer
+    assert not hasattr(layer, '__dict__')
+    assert list(layer) == ['Layer', 'NumVertices', 'NumCommunities', 'NumCommunitiesEdges', 'Communities', 'CommunityStats']
+    assert len(layer) == 6 and 'Communities' in layer and 'Missing' not in layer
+    assert layer['Communities'] == {9: [(5, 6), (6, 7)], 2: [(0, 1), (1, 2), (2, 0)], 4: [(2, 3), (3, 4), (4, 3)], 5: [(8, 8), (6, 2)]}
+    assert layer.get('Missing') is None
+    with pytest.raises(KeyError):
+        layer['Missing']
+
+def test_vcom_layer_has_an_empty_graph(tmp_path):
+    path = tmp_path / "user1_L3.vcom"
+    path.write_text("# Vertex Community File for Layer\nL3\n# Number of Vertices\n3\n# Number of Total Communities\n2\n"
+                    "# Vertex Community Allocation\n1,1\n2,1\n3,2\n")
+    header, arrays = parse_vcom_file(str(path))
+    layer = CommunityLayer(header, ".vcom", arrays, str(path))
+    assert layer.graph().number_of_nodes() == 0 and layer.num_nodes() == 0
+    assert layer['Communities'] == {1: [1, 2], 2: [3]}
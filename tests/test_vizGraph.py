@@ -0,0 +1,56 @@
+import networkx as nx
+import numpy as np
+import pytest
+from vizParser import EdgeArrays
+from vizContext import LayerContext
+from vizGraph import CSRGraph
+
+def random_layer(num_vertices=40, num_edges=120, seed=3):
+    """Random edges with self-loops, repeated pairs (in both directions) and isolated vertices."""
+    rng = np.random.default_rng(seed)
+    src = rng.integers(0, num_vertices - 5, num_edges)
+    dst = rng.integers(0, num_vertices - 5, num_edges)
+    src[:5] = dst[:5]                                   # self-loops
+    src[5:10], dst[5:10] = dst[10:15], src[10:15]       # repeated pairs, reversed
+    weight = rng.integers(1, 5, num_edges).astype(float)
+    return EdgeArrays(src, dst, weight)
+
+def networkx_graph(allEdges, num_vertices):
+    # the graph the renderers built before: the last weight of a repeated pair wins
+    G = nx.Graph()
+    G.add_nodes_from(range(num_vertices))
+    G.add_weighted_edges_from(zip(allEdges.src.tolist(), allEdges.dst.tolist(), allEdges.weight.tolist()))
+    return G
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_csr_graph_matches_networkx(seed):
+    allEdges = random_layer(seed=seed)
+    context = LayerContext(allEdges, 40)
+    G = networkx_graph(allEdges, 40)
+    graph = context.csr_graph()
+    nodes = graph.nodes.tolist()
+    assert nodes == list(G.nodes())
+    assert graph.degree().tolist() == [G.degree(node) for node in nodes]
+    assert graph.weighted_degree().tolist() == pytest.approx([G.degree(node, weight='weight') for node in nodes])
+    centrality = nx.degree_centrality(G)
+    assert graph.degree_centrality().tolist() == pytest.approx([centrality[node] for node in nodes])
+    position = {node: i for i, node in enumerate(nodes)}
+    for node in nodes:
+        assert graph.neighbors(position[node]).tolist() == sorted(position[neighbor] for neighbor in G.neighbors(node))
+    assert graph.neighbor_counts().tolist() == [len(G[node]) for node in nodes]
+    assert context.degrees() == dict(G.degree())
+    assert context.degrees(include_isolates=False) == {node: degree for node, degree in G.degree() if degree > 0}
+
+def test_self_loop_counts_twice_but_lists_its_node_once():
+    graph = CSRGraph(np.array([7, 8]), [0, 0], [0, 1], [2.0, 1.0])
+    assert graph.degree().tolist() == [3, 1]
+    assert graph.weighted_degree().tolist() == [5.0, 1.0]
+    assert graph.neighbors(0).tolist() == [0, 1]
+    assert graph.neighbors(0, limit=1).tolist() == [0]
+
+def test_graph_without_edges():
+    graph = CSRGraph(np.arange(3), [], [])
+    assert graph.degree().tolist() == [0, 0, 0]
+    assert graph.neighbor_lists() and all(len(neighbors) == 0 for neighbors in graph.neighbor_lists())
+    context = LayerContext(EdgeArrays(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)), 3)
+    assert context.degrees() == {0: 0, 1: 0, 2: 0}
@@ -0,0 +1,50 @@
+import networkx as nx
+import numpy as np
+import pytest
+from vizLayout import (choose_layout, compute_layout, KAMADA_KAWAI_MAX_NODES, SPRING_MAX_NODES, GRID_FORCE_MAX_NODES,
+                       DEFAULT_ITERATIONS)
+
+@pytest.mark.parametrize("num_nodes, preferred, expected", [
+    (0, "kamada_kawai", "kamada_kawai"),
+    (KAMADA_KAWAI_MAX_NODES, "kamada_kawai", "kamada_kawai"),
+    (KAMADA_KAWAI_MAX_NODES + 1, "kamada_kawai", "spring"),
+    (KAMADA_KAWAI_MAX_NODES, "spring", "spring"),
+    (SPRING_MAX_NODES, "spring", "spring"),
+    (SPRING_MAX_NODES, "kamada_kawai", "spring"),
+    (SPRING_MAX_NODES + 1, "spring", "grid_force"),
+    (GRID_FORCE_MAX_NODES, "spring", "grid_force"),
+    (GRID_FORCE_MAX_NODES + 1, "spring", "spectral"),
+    (GRID_FORCE_MAX_NODES + 1, "kamada_kawai", "spectral"),
+])
+def test_choose_layout_thresholds(num_nodes, preferred, expected):
+    assert choose_layout(num_nodes, preferred) == expected
+
+def test_thresholds():
+    assert (KAMADA_KAWAI_MAX_NODES, SPRING_MAX_NODES, GRID_FORCE_MAX_NODES) == (1000, 3000, 200000)
+
+def random_graph(num_nodes=300, num_edges=900, seed=5):
+    rng = np.random.default_rng(seed)
+    rows, cols = rng.integers(0, num_nodes, num_edges), rng.integers(0, num_nodes, num_edges)
+    return rows, cols, rng.random(num_edges) + 0.5
+
+@pytest.mark.parametrize("algorithm", sorted(DEFAULT_ITERATIONS))
+def test_same_seed_same_positions(algorithm):
+    num_nodes = 300
+    rows, cols, weights = random_graph(num_nodes)
+    def graph_factory():
+        G = nx.Graph()
+        G.add_nodes_from(range(num_nodes))
+        G.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), weights.tolist()))
+        return G
+    first = compute_layout(algorithm, num_nodes, rows, cols, weights, 42, graph_factory=graph_factory)
+    second = compute_layout(algorithm, num_nodes, rows, cols, weights, 42, graph_factory=graph_factory)
+    assert first.shape == (num_nodes, 2)
+    assert np.array_equal(first, second)
+    assert np.all(np.isfinite(first))
+    if algorithm != 'kamada_kawai':  # the only deterministic algorithm without a seed
+        assert not np.array_equal(first, compute_layout(algorithm, num_nodes, rows, cols, weights, 7, graph_factory=graph_factory))
+
+def test_empty_graph_and_unknown_algorithm():
+    assert compute_layout('spectral', 0, np.zeros(0, int), np.zeros(0, int), np.zeros(0), 42).shape == (0, 2)
+    with pytest.raises(ValueError):
+        compute_layout('circular', 3, np.array([0]), np.array([1]), np.array([1.0]), 42)
@@ -0,0 +1,82 @@
+import csv
+import os
+import pickle
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+import vizMapping
+from vizCache import load_mapping_database
+
+def sqlite_mapping(tmp_path):
+    mapping_file_path = tmp_path / "user1_L1.map"
+    mapping_file_path.write_text("id,label\n" + "".join(f"{node},label {node}\n" for node in range(100)))
+    return vizMapping.SqliteNodeMapping(load_mapping_database(str(mapping_file_path), str(tmp_path / "cache")))
+
+def open_files(path):
+    """Returns the number of open file descriptors of this process on 'path'."""
+    folder = "/proc/self/fd"
+    return sum(1 for fd in os.listdir(folder) if os.path.realpath(os.path.join(folder, fd)) == os.path.realpath(path))
+
+def test_sqlite_mapping_is_shared_by_threads(tmp_path):
+    mapping = sqlite_mapping(tmp_path)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda start: mapping.labels(range(start, start + 10), "Node {}"), range(0, 100, 10)))
+    assert [label for labels in results for label in labels] == [f"label {node}" for node in range(100)]
+    assert mapping.labels([100], "Node {}") == ["Node 100"]
+
+def test_sqlite_mapping_keeps_no_file_open(tmp_path):
+    mapping = sqlite_mapping(tmp_path)
+    assert len(mapping) == 100 and mapping["7"] == "label 7" and list(mapping)[:2] == ["0", "1"]
+    assert open_files(mapping.database_path) == 0
+    assert pickle.loads(pickle.dumps(mapping)).labels([3]) == ["label 3"]
+
+def baseline_create_mapper(mapping_file_path):
+    """The dict parser the mapping classes replace (create_mapper before the arrays), kept to compare against."""
+    mapper = {}
+    with open(mapping_file_path, "r", newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)  # Skip the header
+        for row in reader:
+            node_id = row[0].strip()
+            if len(row) == 2:
+                mapper[node_id] = row[1].strip()
+            elif len(row) == 3:
+                lon, lat = row[1].strip(), row[2].strip()
+                mapper[node_id] = (float(lon), float(lat))
+            elif len(row) > 3 and ',' in row[1]:
+                _, lon, lat = row[1].split(',')
+                mapper[node_id] = (float(lon), float(lat))
+    return mapper
+
+MAPPING_FILES = {
+    # airline layers: "lat,long,code" labels, node 1 listed twice, node 4 with an empty label, node 3 with none, a free text label
+    "labels": 'id,label\n0,"34.7701,-98.9987,AP0"\n1,"36.5205,-99.6038,AP1"\n2,"30.1051,-90.1742,AP2"\n3\n'
+              '1,"36.0000,-99.0000,AP1b"\n4,\n 5 , Smith J.; Doe A. \n007,"31.0,-91.0,AP7"\n',
+    "coordinates": "id,longitude,latitude\n0,-98.9987,34.7701\n1,-99.6038,36.5205\n0, -97.5 , 33.25 \n2\n3,-90.1742,30.1051\n",
+    "packed": 'id,position,name,code\n0,"x,-98.9987,34.7701",Alpha,A\n1,"x,-99.6038,36.5205",Beta,B\n'
+              '2,no position,Gamma,C\n1,"x,-97.0,35.0",Beta,B\n',
+}
+
+@pytest.mark.parametrize("kind", sorted(MAPPING_FILES))
+def test_mapping_matches_the_dict_parser(tmp_path, kind):
+    mapping_file_path = tmp_path / "user1_L1.map"
+    mapping_file_path.write_text(MAPPING_FILES[kind])
+    expected = baseline_create_mapper(mapping_file_path)
+    mapping = vizMapping.NodeMapping(*vizMapping.parse_mapping_file(str(mapping_file_path)))
+    assert dict(mapping.items()) == expected
+    assert len(mapping) == len(expected)
+    assert all(mapping[key] == value for key, value in expected.items())
+    assert "9" not in mapping and mapping.get("9") is None
+
+def test_missing_labels_and_duplicate_ids(tmp_path):
+    mapping_file_path = tmp_path / "user1_L1.map"
+    mapping_file_path.write_text(MAPPING_FILES["labels"])
+    mapping = vizMapping.NodeMapping(*vizMapping.parse_mapping_file(str(mapping_file_path)))
+    # the last line of a duplicate id wins, for the label and the coordinates
+    assert mapping["1"] == "36.0000,-99.0000,AP1b"
+    assert mapping.labels([0, 1, 2, 3, 4, 5], "Node {}") == ["34.7701,-98.9987,AP0", "36.0000,-99.0000,AP1b",
+                                                             "30.1051,-90.1742,AP2", "Node 3", "", "Smith J.; Doe A."]
+    rows, latitude, longitude = mapping.located()
+    assert sorted(zip(mapping.keys_at(rows), latitude.tolist(), longitude.tolist())) == [
+        ("0", 34.7701, -98.9987), ("007", 31.0, -91.0), ("1", 36.0, -99.0), ("2", 30.1051, -90.1742)]
+    # '007' is only found by its string, not as the integer node 7
+    assert mapping.positions([7]).tolist() == [-1] and mapping["007"] == "31.0,-91.0,AP7"
@@ -0,0 +1,47 @@
+import os
+from urllib.parse import urlparse, parse_qs
+import vizCaller
+import vizConfig
+import vizOverview
+
+def test_overview_links_open_the_prerendered_community_pages(user_dir, net_layer, monkeypatch):
+    monkeypatch.setattr(vizOverview, "OVERVIEW_MIN_NODES", 5)
+    overview = vizCaller.readNCall(net_layer, user_dir, user_dir, "bokeh_dc_visualization")
+    with open(overview) as f:
+        html = f.read()
+    assert "community overview" in html
+    assert vizConfig.RENDER_SERVER_URL not in html
+    # every link is the file of a page rendered with the overview, next to it
+    for community in range(3):
+        page = os.path.join(user_dir, "visualization", f"bokeh_DC_L1_c{community}_Network.html")
+        assert os.path.basename(page) in html
+        assert os.path.exists(page)
+        assert not vizCaller.createViz(user_dir, f"L1_c{community}", "bokeh_dc_visualization", ".net", net_layer, None)
+    assert vizCaller.readNCallCommunity(net_layer, user_dir, user_dir, "bokeh_dc_visualization", 0) == os.path.join(user_dir, "visualization", "bokeh_DC_L1_c0_Network.html")
+
+def test_server_links_render_the_pages_on_demand(user_dir, net_layer, monkeypatch):
+    monkeypatch.setattr(vizOverview, "OVERVIEW_MIN_NODES", 5)
+    monkeypatch.setattr(vizOverview, "COMMUNITY_LINK_MODE", "server")
+    overview = vizCaller.readNCall(net_layer, user_dir, user_dir, "bokeh_dc_visualization")
+    with open(overview) as f:
+        assert f"{vizConfig.RENDER_SERVER_URL}/community?" in f.read()
+    page = os.path.join(user_dir, "visualization", "bokeh_DC_L1_c0_Network.html")
+    assert not os.path.exists(page)
+    assert vizCaller.readNCallCommunity(net_layer, user_dir, user_dir, "bokeh_dc_visualization", 0) == page
+    assert os.path.exists(page)
+
+def test_community_pages_are_never_overviews(user_dir, net_layer, monkeypatch):
+    monkeypatch.setattr(vizOverview, "OVERVIEW_MIN_NODES", 1)
+    page = vizCaller.readNCallCommunity(net_layer, user_dir, user_dir, "bokeh_dc_visualization", 0)
+    with open(page) as f:
+        html = f.read()
+    assert "community overview" not in html
+    assert "_c0_c0_" not in html
+
+def test_community_page_urls():
+    url = urlparse(vizOverview.community_page_url("bokeh_L1_c3_Network.html", "user1/user1_L1.net", "user1", "user1", "bokeh_visualization", 3, mode="server"))
+    assert f"{url.scheme}://{url.netloc}" == vizConfig.RENDER_SERVER_URL
+    assert url.path == "/community"
+    assert parse_qs(url.query) == {'input': ["user1/user1_L1.net"], 'mapping': ["user1"], 'user': ["user1"],
+                                   'viz': ["bokeh_visualization"], 'community': ["3"], 'open': ["1"]}
+    assert vizOverview.community_page_url("bokeh_L1_c3_Network.html", "user1/user1_L1.net", "user1", "user1", "bokeh_visualization", 3) == "bokeh_L1_c3_Network.html"
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from vizParser import EdgeArrays, parse_net_file, parse_ecom_file, parse_vcom_file, parse_layer_file, iter_edges
+
+# The line-by-line parsers that readNCall used before vizParser, the reference of the structured arrays.
+
+def baseline_net(path):
+    allEdges = []
+    with open(path, "r") as f:
+        allLines = f.readlines()
+        clusterName = allLines[0].strip()
+        noVerticesLayer1 = allLines[1].strip()
+        noEdges_fromFile = allLines[2].strip()
+        x = int(noVerticesLayer1) + int(3)
+        f.seek(0)
+        for line in f.readlines()[x:]:
+            node1, node2, weigth = line.strip().split(',')
+            allEdges.append((node1, node2, float(weigth)))
+    return clusterName, noVerticesLayer1, noEdges_fromFile, allEdges
+
+def baseline_ecom(path):
+    data = {}
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    for i, line in enumerate(lines):
+        if line.startswith('# Edge Community File for Layer'):
+            data['Layer'] = lines[i+1].strip()
+        elif line.startswith('# Number of Vertices'):
+            data['NumVertices'] = int(lines[i+1].strip())
+        elif line.startswith('# Number of Non-Singleton Communities'):
+            data['NumCommunities'] = int(lines[i+1].strip())
+        elif line.startswith('# Number of Community Edges'):
+            data['NumCommunitiesEdges'] = int(lines[i+1].strip())
+        elif line.startswith('# Edge Community Allocation'):
+            data['Communities'] = {}
+            for j in range(i+1, len(lines)):
+                if not lines[j].startswith('#'):
+                    v1id, v2id, commID = map(int, lines[j].strip().split(','))
+                    data['Communities'].setdefault(commID, []).append((v1id, v2id))
+    return data
+
+def baseline_vcom(path):
+    data = {}
+    with open(path, 'r') as f:
+        lines = f.readlines()
+        for i, line in enumerate(lines):
+            if line.startswith('# Vertex Community File for Layer'):
+                data['Layer'] = lines[i+1].strip()
+            elif line.startswith('# Number of Vertices'):
+                data['NumVertices'] = int(lines[i+1].strip())
+            elif line.startswith('# Number of Total Communities'):
+                data['NumCommunities'] = int(lines[i+1].strip())
+            elif line.startswith('# Vertex Community Allocation'):
+                data['Communities'] = {}
+                for j in range(i+1, len(lines)):
+                    if not lines[j].startswith('#'):
+                        vid, commID = map(int, lines[j].strip().split(','))
+                        data['Communities'].setdefault(commID, []).append(vid)
+    return data
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+NET_FILES = {
+    'edges': "L1.txt\n4\n5\n0,a\n1,b\n2,c\n3,d\n0,1,1.0\n1,2,0.5\n2,3,2.25\n3,0,1\n1,1,3.0\n",
+    'zero_edges': "L1\n3\n0\n0,a\n1,b\n2,c\n",
+    'header_only': "L1\n0\n0\n",
+}
+
+@pytest.mark.parametrize("name", NET_FILES)
+def test_net_arrays_match_the_line_parser(tmp_path, name):
+    path = write(tmp_path, f"user1_{name}.net", NET_FILES[name])
+    clusterName, noVerticesLayer1, noEdges_fromFile, allEdges = parse_net_file(path)
+    expected = baseline_net(path)
+    assert (clusterName, noVerticesLayer1, noEdges_fromFile) == expected[:3]
+    assert isinstance(allEdges, EdgeArrays)
+    assert [array.dtype for array in allEdges] == [np.int32, np.int32, np.float32]
+    assert list(iter_edges(allEdges)) == [(int(node1), int(node2), pytest.approx(weight)) for node1, node2, weight in expected[3]]
+    header, arrays = parse_layer_file(path)
+    assert header == {'clusterName': clusterName, 'noVerticesLayer1': noVerticesLayer1, 'noEdges_fromFile': noEdges_fromFile}
+    assert all(np.array_equal(arrays[field], values) for field, values in allEdges._asdict().items())
+
+ECOM_FILES = {
+    'allocation': ("# Edge Community File for Layer\nL2\n# Number of Vertices\n5\n# Number of Non-Singleton Communities\n2\n"
+                   "# Number of Community Edges\n4\n# Edge Community Allocation\n0,1,7\n1,2,7\n# comment\n3,4,2\n2,0,7\n"),
+    'zero_edges': ("# Edge Community File for Layer\nL2\n# Number of Vertices\n5\n# Number of Non-Singleton Communities\n0\n"
+                   "# Number of Community Edges\n0\n# Edge Community Allocation\n"),
+    'header_only': "# Edge Community File for Layer\nL2\n# Number of Vertices\n5\n",
+}
+
+def grouped(communities, *columns):
+    """Groups allocation rows by community in order of first appearance, like the line parsers' dicts."""
+    result = {}
+    for row in zip(*(column.tolist() for column in columns), communities.tolist()):
+        result.setdefault(row[-1], []).append(row[0] if len(row) == 2 else row[:-1])
+    return result
+
+@pytest.mark.parametrize("name", ECOM_FILES)
+def test_ecom_arrays_match_the_line_parser(tmp_path, name):
+    path = write(tmp_path, f"user1_{name}.ecom", ECOM_FILES[name])
+    header, arrays = parse_ecom_file(path)
+    expected = baseline_ecom(path)
+    communities = expected.pop('Communities', {})
+    assert header == expected
+    assert [arrays[field].dtype for field in ('src', 'dst', 'community')] == [np.int32] * 3
+    assert grouped(arrays['community'], arrays['src'], arrays['dst']) == communities
+    assert list(grouped(arrays['community'], arrays['src'], arrays['dst'])) == list(communities)
+
+VCOM_FILES = {
+    'allocation': ("# Vertex Community File for Layer\nL3\n# Number of Vertices\n6\n# Number of Total Communities\n3\n"
+                   "# Vertex Community Allocation\n1,1\n2,1\n3,1\n4,2\n5,3\n6,2\n"),
+    'zero_vertices': "# Vertex Community File for Layer\nL3\n# Number of Vertices\n0\n# Number of Total Communities\n0\n# Vertex Community Allocation\n",
+    'header_only': "# Vertex Community File for Layer\nL3\n",
+}
+
+@pytest.mark.parametrize("name", VCOM_FILES)
+def test_vcom_arrays_match_the_line_parser(tmp_path, name):
+    path = write(tmp_path, f"user1_{name}.vcom", VCOM_FILES[name])
+    header, arrays = parse_vcom_file(path)
+    expected = baseline_vcom(path)
+    communities = expected.pop('Communities', {})
+    assert header == expected
+    assert grouped(arrays['community'], arrays['vertex']) == communities
+    assert list(grouped(arrays['community'], arrays['vertex'])) == list(communities)
+
+def test_unsupported_layer_file():
+    with pytest.raises(ValueError):
+        parse_layer_file("user1_L1.txt")
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from vizParser import EdgeArrays
+from vizSparsify import sparsify_edges, endpoint_rank, disparity_significance
+
+def edges(pairs, weights):
+    pairs = np.array(pairs, dtype=np.int32).reshape(-1, 2)
+    return EdgeArrays(pairs[:, 0], pairs[:, 1], np.array(weights, dtype=np.float32))
+
+# a hub 0 with three leaves of decreasing weight and a light edge between two leaves
+STAR = edges([(0, 1), (0, 2), (0, 3), (1, 2)], [3.0, 2.0, 1.0, 0.5])
+
+def test_endpoint_rank_keeps_the_best_rank_of_both_endpoints():
+    # every hub edge is the heaviest edge of its leaf, the light edge is second at both ends
+    assert endpoint_rank(STAR.src, STAR.dst, STAR.weight).tolist() == [0, 0, 0, 1]
+
+def test_top_k_keeps_the_k_heaviest_edges_of_every_node():
+    kept = sparsify_edges(STAR, 'top_k', budget=None, k=1)
+    assert list(zip(kept.src.tolist(), kept.dst.tolist())) == [(0, 1), (0, 2), (0, 3)]
+
+def test_budget_ties_keep_heavier_edges_then_file_order():
+    # the three hub edges tie on rank 0, the heavier ones win
+    kept = sparsify_edges(STAR, 'top_k', budget=2)
+    assert list(zip(kept.src.tolist(), kept.dst.tolist())) == [(0, 1), (0, 2)]
+    # equal weights too: the earlier edges of the file win
+    uniform = edges([(0, 1), (2, 3), (4, 5), (6, 7)], [1.0] * 4)
+    kept = sparsify_edges(uniform, 'cutoff', budget=3)
+    assert kept.src.tolist() == [0, 2, 4]
+
+def test_disparity_significance():
+    significance = disparity_significance(STAR.src, STAR.dst, STAR.weight)
+    # node 3 is a leaf, its only edge is always kept
+    assert significance[2] == 0.0
+    # edge (1, 2): node 1 has strength 3.5 over two edges, node 2 has strength 2.5 over two edges
+    assert significance[3] == pytest.approx(min(1 - 0.5 / 3.5, 1 - 0.5 / 2.5))
+    kept = sparsify_edges(STAR, 'disparity', budget=3)
+    assert (kept.src.tolist(), kept.dst.tolist()) == ([0, 0, 0], [1, 2, 3])
+
+def test_cutoff_and_sample():
+    assert sparsify_edges(STAR, 'cutoff', budget=None, cutoff=1.5).weight.tolist() == [3.0, 2.0]
+    first, second = sparsify_edges(STAR, 'sample', budget=2), sparsify_edges(STAR, 'sample', budget=2)
+    assert len(first.src) == 2 and first.src.tolist() == second.src.tolist() and first.dst.tolist() == second.dst.tolist()
+
+def test_nothing_dropped_returns_the_same_edges():
+    assert sparsify_edges(STAR, None) is STAR
+    assert sparsify_edges(STAR, 'disparity', budget=10) is STAR
+    with pytest.raises(ValueError):
+        sparsify_edges(STAR, 'unknown')
+
+def test_drawing_context_keeps_the_values_of_the_whole_layer():
+    from vizContext import LayerContext
+    context = LayerContext(edges([(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3), (2, 3)], [5, 4, 3, 5, 4, 3, 1]), 6)
+    drawn = context.sparsify('cutoff', 4)
+    assert drawn.sparsified() and drawn.full is context
+    assert len(drawn.allEdges.src) == 4 and len(context.allEdges.src) == 7
+    assert drawn.communities() is context.communities()
+    assert drawn.degrees() == context.degrees()
+    assert drawn.counts() == context.counts() == (6, 7)
+    full_degree = dict(zip(context.node_index()[0].tolist(), context.node_degrees().tolist()))
+    assert drawn.node_degrees().tolist() == [full_degree[node] for node in drawn.node_index()[0].tolist()]
+    assert drawn.node_neighbor_counts().tolist() == drawn.node_degrees().tolist()
+    assert context.sparsify('cutoff', 4) is drawn
+    assert context.sparsify(None, None) is context and context.sparsify('cutoff', 100) is context
+
+def test_only_the_drawing_views_are_sparsified(user_dir, monkeypatch):
+    import vizCaller
+    import vizOverview
+    from conftest import write_net_layer
+    net_layer = write_net_layer(user_dir, edges=((0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3), (2, 3)))
+    layer = vizCaller.resolve_layer(net_layer, user_dir, user_dir)
+    inputs = vizCaller.load_inputs(layer, user_dir, ('top_k', 3))
+    # the shared inputs and the community pages keep every edge
+    assert len(inputs['allEdges'].src) == 7
+    subset = vizOverview.community_subset('.net', inputs, 0)
+    assert len(subset['allEdges'].src) == 3 and subset['sparsify'] == ('top_k', 3)
+    # the views draw the sparsified edges
+    drawn = []
+    monkeypatch.setitem(vizCaller.vizDictionary, "bokeh_visualization", lambda allEdges, *args, context: drawn.append(context))
+    vizCaller.render_view(layer, inputs, user_dir, "bokeh_visualization", {})
+    assert len(drawn[0].allEdges.src) == 3 and drawn[0].full is inputs['context']
+
+def test_sparsification_is_part_of_the_manifest(user_dir, net_layer):
+    import vizCaller
+    path = vizCaller.readNCall(net_layer, user_dir, user_dir, "bokeh_dc_visualization")
+    assert not vizCaller.createViz(user_dir, "L1", "bokeh_dc_visualization", ".net", net_layer, None)
+    assert vizCaller.createViz(user_dir, "L1", "bokeh_dc_visualization", ".net", net_layer, None, sparsify=None)
+    assert vizCaller.readNCall(net_layer, user_dir, user_dir, "bokeh_dc_visualization", sparsify=None) == path
+    assert not vizCaller.createViz(user_dir, "L1", "bokeh_dc_visualization", ".net", net_layer, None, sparsify=None)
@@ -0,0 +1,17 @@
+import os
+import re
+from pyvis.network import Network
+from vizStatic import pyvis_html
+
+def test_pyvis_pages_link_the_shared_vis_network_bundle(tmp_path):
+    html = pyvis_html(Network(), str(tmp_path), 'shared')
+    urls = re.findall(r'(?:href|src)="(static/vis-network-[^"]+)"', html)
+    assert len(urls) == 2
+    assert all(os.path.isfile(tmp_path / url) for url in urls)
+    assert "cdnjs.cloudflare.com" not in html
+
+def test_pyvis_pages_embed_the_bundle_inline(tmp_path):
+    html = pyvis_html(Network(), str(tmp_path), 'inline')
+    assert "static/vis-network" not in html
+    assert "vis-network.min.js.map" in html
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,16 @@
+import pytest
+from vizUTILS import create_url, create_urls
+
+@pytest.mark.parametrize("dataset_type, label, url", [
+    ('airport', "33.64,-84.42,ATL", "https://www.google.com/maps/search/?api=1&query=ATL+airport"),
+    ('movies', "12,The Matrix", "https://www.google.com/search?q=The+Matrix+IMDb"),
+    ('USCounty', "Tarrant County, TX", "https://www.google.com/search?q=Tarrant+County%2C+TX+county"),
+    ('DBLP', "7,Alice,Bob", "https://www.google.com/search?q=Alice,Bob"),
+    ('Accident', "32.7,-97.1,night", "https://www.google.com/maps/search/?api=1&query=32.7,-97.1"),
+    ('unknown', "anything", None),
+    ('movies', "0", None),
+    ('movies', "no title field", None),
+])
+def test_create_url(dataset_type, label, url):
+    assert create_url(label, dataset_type) == url
+    assert create_urls([label, label], dataset_type) == [url, url]
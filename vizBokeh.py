@@ -0,0 +1,67 @@
+import numpy as np
+from bokeh.models import GraphRenderer, StaticLayoutProvider, ColumnDataSource, Circle, MultiLine, NodesAndLinkedEdges
+from bokeh.palettes import Viridis256, Spectral8, Oranges256, Purples256, Blues256, Greens256
+
+"""
+    Graph renderer shared by the Bokeh network views (bokeh, bokeh_dc and community network).
+
+    bokeh.plotting.from_networkx walks a networkx graph node by node and edge by edge and fills
+    the data sources with Python lists. graph_renderer builds the same GraphRenderer directly
+    from the arrays of the layer: the node source holds one column per node attribute and the
+    edge source the flat 'start' and 'end' arrays of the edges. NumPy columns are written to the
+    HTML file as binary buffers instead of JSON lists, and building the figure is a handful of
+    array operations whatever the size of the graph.
+
+    The edges stay a MultiLine glyph, the only kind of edge glyph BokehJS accepts in a
+    GraphRenderer (which gives the NodesAndLinkedEdges highlighting). Its per-edge lines are not
+    stored in the file, the browser builds them from 'start', 'end' and the node positions.
+"""
+
+# Palette cycled through by the community colors, one color per community.
+COMMUNITY_PALETTE = np.array(Spectral8 + Oranges256 + Viridis256 + Purples256 + Blues256 + Greens256)
+# Colors of the hovered or selected nodes and edges.
+NODE_HIGHLIGHT_COLOR = 'white'
+EDGE_HIGHLIGHT_COLOR = 'black'
+
+def community_colors(count):
+    """Returns the colors of 'count' communities, cycling through COMMUNITY_PALETTE."""
+    return COMMUNITY_PALETTE[np.arange(count) % len(COMMUNITY_PALETTE)]
+
+def graph_renderer(nodes, positions, rows, cols, node_columns, node_size, node_color, edge_color='black', edge_alpha=0.5, highlight_size=None):
+    """
+    Returns a GraphRenderer drawing the nodes at 'positions' with the edges between them.
+
+    Parameters:
+        nodes (numpy.ndarray): The node ids, the 'index' column of the node source.
+        positions (numpy.ndarray): An (n, 2) array, row i holds the position of nodes[i].
+        rows (numpy.ndarray): The position in 'nodes' of each edge's first endpoint.
+        cols (numpy.ndarray): The position in 'nodes' of each edge's second endpoint.
+        node_columns (dict): The other columns of the node source (e.g. 'label', 'degree', 'url'),
+                             one value per node. Pass NumPy arrays for numeric columns.
+        node_size (str or float): The column holding the node sizes, or a fixed size.
+        node_color (str): The column holding the node colors, or a fixed color.
+        edge_color (str): The color of the edges.
+        edge_alpha (float): The opacity of the edges.
+        highlight_size (str or float, optional): The size of the hovered or selected nodes, defaults to 'node_size'.
+
+    Returns:
+        bokeh.models.GraphRenderer: The renderer, with NodesAndLinkedEdges selection and inspection.
+    """
+    nodes = np.asarray(nodes)
+    network_graph = GraphRenderer()
+    network_graph.node_renderer.data_source = ColumnDataSource(dict(node_columns, index=nodes))
+    network_graph.edge_renderer.data_source = ColumnDataSource({'start': nodes[rows], 'end': nodes[cols]})
+    network_graph.layout_provider = StaticLayoutProvider(graph_layout=dict(zip(nodes.tolist(), np.asarray(positions).tolist())))
+
+    highlight_size = node_size if highlight_size is None else highlight_size
+    network_graph.node_renderer.glyph = Circle(size=node_size, fill_color=node_color)
+    network_graph.node_renderer.hover_glyph = Circle(size=highlight_size, fill_color=NODE_HIGHLIGHT_COLOR, line_width=2)
+    network_graph.node_renderer.selection_glyph = Circle(size=highlight_size, fill_color=NODE_HIGHLIGHT_COLOR, line_width=2)
+
+    network_graph.edge_renderer.glyph = MultiLine(line_color=edge_color, line_alpha=edge_alpha, line_width=1)
+    network_graph.edge_renderer.hover_glyph = MultiLine(line_color=EDGE_HIGHLIGHT_COLOR, line_width=2)
+    network_graph.edge_renderer.selection_glyph = MultiLine(line_color=EDGE_HIGHLIGHT_COLOR, line_width=2)
+
+    network_graph.selection_policy = NodesAndLinkedEdges()
+    network_graph.inspection_policy = NodesAndLinkedEdges()
+    return network_graph
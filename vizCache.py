@@ -0,0 +1,507 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+import numpy as np
+from vizParser import PARSER_VERSION, parse_layer_file
+from vizMapping import MAPPING_VERSION, MAPPING_DATABASE_VERSION, parse_mapping_file, build_mapping_database
+
+# Name of the cache folder created in the user's directory, next to the 'visualization' folder.
+CACHE_DIR_NAME = ".vizcache"
+
+def cache_dir_for(mln_User):
+    """
+    Returns the cache folder that belongs to a user's directory.
+
+    Parameters:
+        mln_User (str): The base path for the user's data directory.
+
+    Returns:
+        str: The path of the cache folder (it is created lazily when something is stored).
+    """
+    return os.path.join(mln_User, CACHE_DIR_NAME)
+
+def entry_prefix(path):
+    """
+    Returns the name prefix of the cache entries of a file: its name and a digest of its absolute path.
+
+    Files with the same name in different folders (e.g. the layers of two users) get different
+    prefixes, so their entries neither collide nor replace each other.
+    """
+    return f"{os.path.basename(path)}-{hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]}-"
+
+def layer_cache_key(input_file):
+    """
+    Computes the cache key of a parsed layer from the identity of the input file.
+
+    The key combines the absolute path of the file, its size, its modification time (in
+    nanoseconds) and the parser version, so an edited file or a new parser both produce a new
+    key without having to read the file contents.
+
+    Parameters:
+        input_file (str): The path to the layer file.
+
+    Returns:
+        str: A short hexadecimal key.
+    """
+    stat = os.stat(input_file)
+    identity = f"{os.path.abspath(input_file)}|{stat.st_size}|{stat.st_mtime_ns}|{PARSER_VERSION}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+
+def load_layer(input_file, cache_dir):
+    """
+    Loads a parsed layer from the binary cache, parsing the text file only on a cache miss.
+
+    Every parsed layer is stored as a folder holding a 'header.json' file and one '.npy' file per
+    array. Cached arrays are opened with a read-only memory map, so loading them costs neither
+    parsing nor copying, and all visualization types of the same layer share one parse.
+
+    Parameters:
+        input_file (str): The path to the '.net', '.ecom' or '.vcom' file.
+        cache_dir (str): The cache folder (see cache_dir_for).
+
+    Returns:
+        tuple: (header, arrays) in the form returned by vizParser.parse_layer_file.
+    """
+    prefix = entry_prefix(input_file)
+    layers_dir = os.path.join(cache_dir, "layers")
+    entry_dir = os.path.join(layers_dir, f"{prefix}{layer_cache_key(input_file)}")
+
+    if os.path.isdir(entry_dir):
+        try:
+            return _read_entry(entry_dir)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable layer cache {entry_dir}: {e}")
+
+    header, arrays = parse_layer_file(input_file)
+    try:
+        _write_entry(layers_dir, entry_dir, prefix, header, arrays)
+    except OSError as e:
+        # caching is an optimization only, the parsed layer is still returned
+        print(f"Could not write layer cache {entry_dir}: {e}")
+    return header, arrays
+
+def load_mapping(mapping_file_path, cache_dir):
+    """
+    Loads a parsed '.map' file from the binary cache, parsing the text file only on a cache miss.
+
+    Entries are stored like parsed layers (see load_layer) in the 'mappings' folder and keyed by
+    the content digest of the file (see file_digest) and the mapping version.
+
+    Parameters:
+        mapping_file_path (str): The path to the '.map' file.
+        cache_dir (str): The cache folder (see cache_dir_for).
+
+    Returns:
+        tuple: (header, arrays) in the form returned by vizMapping.parse_mapping_file.
+    """
+    prefix = entry_prefix(mapping_file_path)
+    mappings_dir = os.path.join(cache_dir, "mappings")
+    key = hashlib.sha1(f"{file_digest(mapping_file_path)}|{MAPPING_VERSION}".encode('utf-8')).hexdigest()[:16]
+    entry_dir = os.path.join(mappings_dir, f"{prefix}{key}")
+
+    if os.path.isdir(entry_dir):
+        try:
+            return _read_entry(entry_dir)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable mapping cache {entry_dir}: {e}")
+
+    header, arrays = parse_mapping_file(mapping_file_path)
+    try:
+        _write_entry(mappings_dir, entry_dir, prefix, header, arrays)
+    except OSError as e:
+        # caching is an optimization only, the parsed mapping is still returned
+        print(f"Could not write mapping cache {entry_dir}: {e}")
+    return header, arrays
+
+def load_mapping_database(mapping_file_path, cache_dir):
+    """
+    Returns the SQLite database of a '.map' file, importing the file only when it has none yet.
+
+    The database is stored in the 'mappings' folder, keyed like the mapping cache entries (see
+    load_mapping) by the content digest of the file and the database version. It is built in a
+    temporary file and renamed into place, so a database that exists is always complete.
+
+    Parameters:
+        mapping_file_path (str): The path to the '.map' file.
+        cache_dir (str): The cache folder (see cache_dir_for).
+
+    Returns:
+        str: The path of the database (see vizMapping.SqliteNodeMapping).
+    """
+    prefix = entry_prefix(f"{mapping_file_path}.sqlite")  # apart from the names of the mapping entries
+    mappings_dir = os.path.join(cache_dir, "mappings")
+    key = hashlib.sha1(f"{file_digest(mapping_file_path)}|{MAPPING_DATABASE_VERSION}".encode('utf-8')).hexdigest()[:16]
+    database_path = os.path.join(mappings_dir, f"{prefix}{key}")
+    if os.path.isfile(database_path):
+        return database_path
+
+    os.makedirs(mappings_dir, exist_ok=True)
+    with atomic_output(database_path) as tmp_path:
+        build_mapping_database(mapping_file_path, tmp_path)
+    # drop databases of older versions of the same file
+    for name in os.listdir(mappings_dir):
+        path = os.path.join(mappings_dir, name)
+        if name.startswith(prefix) and path != database_path:
+            os.remove(path)
+    return database_path
+
+def _read_entry(entry_dir):
+    """Reads a cache entry written by _write_entry, memory mapping its arrays."""
+    with open(os.path.join(entry_dir, "header.json"), "r") as f:
+        stored = json.load(f)
+    arrays = {name: np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode='r') for name in stored['arrays']}
+    return stored['header'], arrays
+
+def _write_entry(layers_dir, entry_dir, prefix, header, arrays):
+    """Writes a cache entry into a temporary folder and renames it into place, dropping the other entries of the same file (see entry_prefix)."""
+    os.makedirs(layers_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{prefix}", dir=layers_dir)
+    try:
+        os.chmod(tmp_dir, 0o755)  # mkdtemp only grants access to the owner
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+        # header.json is written last and lists the arrays, an entry without it is never read
+        with open(os.path.join(tmp_dir, "header.json"), "w") as f:
+            json.dump({'header': header, 'arrays': list(arrays)}, f)
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(entry_dir):  # another process may have stored the same entry first
+            raise
+        return
+    # drop entries of older versions of the same file
+    for name in os.listdir(layers_dir):
+        path = os.path.join(layers_dir, name)
+        if name.startswith(prefix) and path != entry_dir:
+            shutil.rmtree(path, ignore_errors=True)
+
+# Version of the manifest layout written next to every generated visualization.
+MANIFEST_VERSION = 1
+
+# Content digests computed by this process, keyed by (path, size, mtime_ns).
+_digest_memo = {}
+# Source digests of renderer modules, keyed by module name.
+_module_digest_memo = {}
+
+def manifest_path_for(viz_file_path):
+    """Returns the path of the sidecar manifest that describes a generated visualization."""
+    return f"{viz_file_path}.manifest.json"
+
+def file_digest(path, recorded=None):
+    """
+    Computes the SHA-256 digest of a file's contents.
+
+    Hashing a multi-GB layer on every request would defeat the purpose of caching, so the digest
+    is reused when the file still has the size and modification time recorded alongside it,
+    either in 'recorded' (a previous fingerprint, see file_fingerprint) or in this process' memo.
+    A file that is replaced or copied over with another modification time is always re-hashed,
+    so only a real content change produces a different digest.
+
+    Parameters:
+        path (str): The path to the file.
+        recorded (dict, optional): A fingerprint previously returned by file_fingerprint.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest.
+    """
+    stat = os.stat(path)
+    if recorded and recorded.get('size') == stat.st_size and recorded.get('mtime_ns') == stat.st_mtime_ns:
+        return recorded['digest']
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digest_memo:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _digest_memo[memo_key] = digest.hexdigest()
+    return _digest_memo[memo_key]
+
+def file_fingerprint(path, recorded=None):
+    """
+    Describes a file by its content digest together with the size and modification time it had.
+
+    Parameters:
+        path (str or None): The path to the file, None or a missing file yields None.
+        recorded (dict, optional): A previous fingerprint of the same file (see file_digest).
+
+    Returns:
+        dict or None: {'digest', 'size', 'mtime_ns'} or None when there is no file.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {'digest': file_digest(path, recorded), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def renderer_version(module_names):
+    """
+    Computes a version string for the code that renders a visualization.
+
+    The version is the digest of the source files of the given modules, so editing a renderer
+    (or a helper it depends on) invalidates exactly the outputs produced by it.
+
+    Parameters:
+        module_names (list): Names of the importable modules involved in rendering.
+
+    Returns:
+        str: A short hexadecimal version string.
+    """
+    import importlib.util
+    digest = hashlib.sha256()
+    for name in module_names:
+        if name not in _module_digest_memo:
+            spec = importlib.util.find_spec(name)
+            origin = spec.origin if spec is not None else None
+            _module_digest_memo[name] = file_digest(origin) if origin and os.path.exists(origin) else "missing"
+        digest.update(f"{name}:{_module_digest_memo[name]};".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def build_manifest(vizType, renderer, input_file, mapping_file_path=None, previous=None):
+    """
+    Builds the cache key of a visualization: what was rendered, from which inputs, by which code.
+
+    Parameters:
+        vizType (str): The visualization type (key of vizCaller.vizDictionary).
+        renderer (str): The renderer version (see renderer_version).
+        input_file (str): The path to the layer file.
+        mapping_file_path (str, optional): The path to the '.map' file, if one is used.
+        previous (dict, optional): The stored manifest, used to skip re-hashing unchanged files.
+
+    Returns:
+        dict: The manifest.
+    """
+    previous = previous or {}
+    return {
+        'version': MANIFEST_VERSION,
+        'vizType': vizType,
+        'renderer': renderer,
+        'input': file_fingerprint(input_file, previous.get('input')),
+        'mapping': file_fingerprint(mapping_file_path, previous.get('mapping')),
+    }
+
+def manifest_matches(stored, current):
+    """
+    Checks whether a stored manifest still describes the current inputs and renderer.
+
+    Modification times are deliberately ignored, only the digests are compared.
+
+    Returns:
+        bool: True if the visualization described by 'stored' is up to date.
+    """
+    def digest_of(fingerprint):
+        return fingerprint['digest'] if fingerprint else None
+    return (
+        stored.get('version') == current['version']
+        and stored.get('vizType') == current['vizType']
+        and stored.get('renderer') == current['renderer']
+        and digest_of(stored.get('input')) == digest_of(current['input'])
+        and digest_of(stored.get('mapping')) == digest_of(current['mapping'])
+    )
+
+def read_manifest(viz_file_path):
+    """Reads the sidecar manifest of a visualization, returning None if it is missing or unreadable."""
+    try:
+        with open(manifest_path_for(viz_file_path), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(viz_file_path, manifest):
+    """Writes the sidecar manifest of a visualization, replacing any previous one atomically."""
+    with atomic_output(manifest_path_for(viz_file_path)) as tmp_path, open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+
+# fcntl only exists on POSIX systems, elsewhere render locks only serialize the threads of one process.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Per-process locks of the visualization files being rendered, keyed by the path of their lock file.
+_render_locks = {}
+_render_locks_guard = threading.Lock()
+
+@contextmanager
+def render_lock(viz_file_path, cache_dir):
+    """
+    Holds the exclusive render lock of a visualization file.
+
+    Requests that find the same visualization missing or stale would otherwise all render it
+    at the same time. The lock is a file in the 'locks' folder of the cache folder, locked
+    with flock so it also serializes the worker processes of preRender and renderServer, plus
+    a thread lock for requests served by threads of the same process. The lock is released
+    when the process dies, so a crashed render never blocks the next one.
+    A request that had to wait should check the visualization again (see vizCaller.createViz):
+    it was most likely rendered by the request holding the lock.
+
+    Parameters:
+        viz_file_path (str): The path of the visualization file.
+        cache_dir (str): The cache folder (see cache_dir_for).
+    """
+    locks_dir = os.path.join(cache_dir, "locks")
+    os.makedirs(locks_dir, exist_ok=True)
+    lock_path = os.path.join(locks_dir, f"{os.path.basename(viz_file_path)}.lock")
+    with _render_locks_guard:
+        thread_lock = _render_locks.setdefault(lock_path, threading.Lock())
+    with thread_lock, open(lock_path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Extensions of the compressed copies of a file (see vizStatic.precompress), removed when the file is replaced.
+COMPRESSED_EXTENSIONS = ('.gz', '.br')
+
+@contextmanager
+def atomic_output(path):
+    """
+    Yields a temporary path to write a file to, which then replaces 'path' in one step.
+
+    The temporary file lives in the same folder (so os.replace is atomic) and is hidden, so a
+    reader of 'path' sees either the previous file or the complete new one, never a partially
+    written one. If the block raises, or writes nothing, the temporary file is removed and
+    'path' is left untouched. The compressed copies of the previous file are removed before it
+    is replaced, so a web server never sends them for the new file (vizStatic.precompress
+    writes new ones afterwards).
+
+    Parameters:
+        path (str): The final path of the file.
+
+    Yields:
+        str: The temporary path the caller writes to.
+    """
+    folder, name = os.path.split(path)
+    stem, extension = os.path.splitext(name)
+    # the extension is kept, some writers (pyvis) check it
+    tmp_path = os.path.join(folder, f".{stem}.{os.getpid()}.{threading.get_ident()}.tmp{extension}")
+    try:
+        yield tmp_path
+        if os.path.exists(tmp_path):
+            for compressed in COMPRESSED_EXTENSIONS:
+                if os.path.exists(path + compressed):
+                    os.remove(path + compressed)
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+# Version of the stored layouts, bump it when the way layouts are computed changes.
+LAYOUT_VERSION = 2
+# Version of the stored community partitions, bump it when the way communities are detected changes.
+COMMUNITY_VERSION = 2
+# Version of the stored community statistics, bump it when the way they are computed changes.
+COMMUNITY_STATS_VERSION = 1
+
+def array_digest(arrays, extra=""):
+    """
+    Computes a digest of the contents of NumPy arrays (and an optional string).
+
+    Parameters:
+        arrays (list): The arrays to hash, their dtype and shape are part of the digest.
+        extra (str): Additional text to include, e.g. the number of vertices.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest.
+    """
+    digest = hashlib.sha256(extra.encode('utf-8'))
+    for values in arrays:
+        values = np.ascontiguousarray(values)
+        digest.update(f"|{values.dtype.str}{values.shape}|".encode('utf-8'))
+        digest.update(values.data)
+    return digest.hexdigest()
+
+def layout_key(graph_digest, algorithm, params, seed):
+    """
+    Computes the key of a stored layout.
+
+    Parameters:
+        graph_digest (str): A digest of the graph contents (nodes, edges and weights).
+        algorithm (str): The layout algorithm name.
+        params (dict): The parameters passed to the layout algorithm.
+        seed (int or None): The random seed of the layout algorithm.
+
+    Returns:
+        str: A short hexadecimal key.
+    """
+    return _result_key(LAYOUT_VERSION, graph_digest, algorithm, params, seed)
+
+def community_key(graph_digest, algorithm, params, seed):
+    """Computes the key of a stored community partition, see layout_key for the parameters."""
+    return _result_key(COMMUNITY_VERSION, graph_digest, algorithm, params, seed)
+
+def _result_key(version, graph_digest, algorithm, params, seed):
+    identity = f"{version}|{graph_digest}|{algorithm}|{sorted(params.items())}|{seed}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:24]
+
+def load_layout(cache_dir, key):
+    """
+    Loads a stored layout.
+
+    Returns:
+        tuple or None: (nodes, positions) with an int64 array of node ids and a (n, 2) float array
+                       of their positions, or None if the layout is not stored.
+    """
+    return _load_arrays(cache_dir, "layouts", key, ('nodes', 'positions'))
+
+def save_layout(cache_dir, key, nodes, positions):
+    """Stores a layout (see load_layout)."""
+    _save_arrays(cache_dir, "layouts", key, nodes=nodes, positions=positions)
+
+def load_communities(cache_dir, key):
+    """
+    Loads a stored community partition.
+
+    Returns:
+        tuple or None: (nodes, labels) with an array of node ids and an int32 array holding the
+                       community index of each node, or None if the partition is not stored.
+    """
+    return _load_arrays(cache_dir, "communities", key, ('nodes', 'labels'))
+
+def save_communities(cache_dir, key, nodes, labels):
+    """Stores a community partition (see load_communities)."""
+    _save_arrays(cache_dir, "communities", key, nodes=nodes, labels=labels)
+
+def community_stats_key(input_file):
+    """Computes the key of the stored community statistics of a '.ecom' or '.vcom' layer, from the key of its parsed layer."""
+    identity = f"{COMMUNITY_STATS_VERSION}|{layer_cache_key(input_file)}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:24]
+
+def load_community_stats(cache_dir, key, names):
+    """
+    Loads stored community statistics (see vizCommunityStats.community_stats).
+
+    Returns:
+        tuple or None: The arrays called 'names', or None if the statistics are not stored.
+    """
+    return _load_arrays(cache_dir, "community_stats", key, names)
+
+def save_community_stats(cache_dir, key, stats):
+    """Stores community statistics, a dict of arrays (see load_community_stats)."""
+    _save_arrays(cache_dir, "community_stats", key, **stats)
+
+def _load_arrays(cache_dir, folder, key, names):
+    """Loads the named arrays of a '.npz' file written by _save_arrays, returning None if it is missing or unreadable."""
+    path = os.path.join(cache_dir, folder, f"{key}.npz")
+    try:
+        with np.load(path) as stored:
+            return tuple(stored[name] for name in names)
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _save_arrays(cache_dir, folder, key, **arrays):
+    """Stores arrays as an uncompressed '.npz' file, written to a temporary file and renamed into place."""
+    target_dir = os.path.join(cache_dir, folder)
+    try:
+        os.makedirs(target_dir, exist_ok=True)
+        # the temporary name is unique per thread, so threads storing the same key do not clash
+        with atomic_output(os.path.join(target_dir, f"{key}.npz")) as tmp_path:
+            np.savez(tmp_path, **arrays)
+    except OSError as e:
+        # caching is an optimization only
+        print(f"Could not store {folder} {key}: {e}")
@@ -1,130 +1,174 @@
 import os  # Imports the 'os' module which provides a way of using operating system dependent functionality.
 import re  # Imports the 're' module which provides support for regular expressions.
-import csv  # Imports the 'csv' module which provides functionality to read and write data to and from CSV files.
+import sqlite3  # Imports the 'sqlite3' module, whose errors the SQLite mapping backend may raise.
 from vizUTILS import determine_dataset_type  # Imports the 'determine_dataset_type' function from the 'vizUTILS' module.
+from vizParser import EdgeArrays  # Imports the compact edge list type from the 'vizParser' module.
+from vizCache import cache_dir_for, load_layer, load_mapping, load_mapping_database  # Imports the binary layer and mapping caches from the 'vizCache' module.
+import vizMapping  # Imports the node mappings and their backends from the 'vizMapping' module.
+from vizCache import build_manifest, manifest_matches, read_manifest, renderer_version, write_manifest  # Imports the manifest helpers used to invalidate visualizations.
+from vizCache import render_lock  # Imports the lock that lets only one request at a time render a visualization file.
+from vizSparsify import DEFAULT_SPARSIFY  # Imports the default edge sparsification of the drawing '.net' views.
 
 # Declares a global variable 'dataset_type' and initializes it with the string "Unknown".
 dataset_type = "Unknown"
 input_file_extension = "Unknown"
 
-def createViz(endPath_para, clusterName_para, vizGraphType, input_file_extension, input_file):
+def createViz(endPath_para, clusterName_para, vizType, input_file_extension, input_file, mapping_file_path=None, sparsify=DEFAULT_SPARSIFY):
     """
-    Determines whether a new visualization file needs to be created based on the 
-    absence of an existing file at the specified path.
+    Determines whether a visualization file needs to be (re)created.
 
-    This function constructs a filename for a visualization based on the visualization 
-    type and input file extension. It checks if a file with that name already exists 
-    in a designated visualization directory within the given end path. The function 
-    supports creating filenames for wordcloud visualizations specifically if the 
-    file type is '.ecom' or '.vcom', otherwise it defaults to a general naming scheme.
+    The visualization file name is derived from the visualization type, the cluster name and the
+    input file extension (see viz_file_name). Next to every generated file a sidecar manifest is
+    stored (see vizCache.build_manifest) that records the content digest of the input file, the
+    content digest of the mapping file, the visualization type and the version of the renderer
+    code. The visualization is recreated when the file is missing or when any of these differ,
+    independent of file modification times. A file generated before manifests existed is adopted
+    (a manifest is written for it) if it is newer than its input and mapping files.
 
     Parameters:
         endPath_para (str): The base directory path where the visualization directory exists.
         clusterName_para (str): The name of the cluster which is used in the naming of the visualization file.
-        vizGraphType (str): The type of visualization (e.g., 'wordcloud', 'network', etc.).
+        vizType (str): The type of visualization (a key of vizDictionary, e.g. 'plotly_visualization').
         input_file_extension (str): The file extension that helps in determining the specific 
                                     visualization file naming convention (e.g., '.ecom', '.vcom').
+        input_file (str): The path to the input layer file.
+        mapping_file_path (str, optional): The path to the '.map' file used for the labels, if any.
+        sparsify (tuple or None): The (method, budget) of the drawn edges of '.net' layers, see load_inputs.
 
     Returns:
-        bool: True if the visualization file does not exist and needs to be created, False otherwise.
+        bool: True if the visualization file needs to be created, False if the existing one is up to date.
     """
-    
-    # if vizGraphType.lower() == 'wordcloud' and input_file_extension in ['.ecom', '.vcom']:
-    #     file_name = f"wordcloud_{clusterName_para}_{input_file_extension.strip('.')}.html"
-    # else:
-    #     file_name = f"{vizGraphType}_{clusterName_para}_{'comNet' if input_file_extension in ['.ecom', '.vcom'] else 'Network'}.html"
-        
-    if input_file_extension == '.ecom':
-        suffix = 'ecom'
-    elif input_file_extension == '.vcom':
-        suffix = 'vcom'
-    else:
-        suffix = 'Network'
-    
-    file_name = f"{vizGraphType}_{clusterName_para}_{suffix}.html"
-    
-    viz_file_path = os.path.join(endPath_para, "visualization", file_name)
+    viz_file_path = os.path.join(endPath_para, "visualization", viz_file_name(vizType, clusterName_para, input_file_extension))
     
     print(f"Checking path: {viz_file_path}")
     if not os.path.exists(viz_file_path):
         print(f"viz file path does not exist: creating new visualization")
         return True  # File does not exist, so return True to create a new visualization
     
-    # Check the timestamps of the input file and the visualization file
-    input_file_mtime = os.path.getmtime(input_file)  # Modification time of the input file
-    print(f"{input_file} modification date: {input_file_mtime}")
-    
-    viz_file_mtime = os.path.getmtime(viz_file_path)    # Modification time of the existing visualization file
-    print(f"{viz_file_path} modification date: {viz_file_mtime}")
+    stored_manifest = read_manifest(viz_file_path)
+    current_manifest = viz_manifest(vizType, input_file, mapping_file_path, stored_manifest, sparsify)
+    if stored_manifest is None:
+        # Visualization generated before manifests existed: fall back to the timestamps once.
+        viz_file_mtime = os.path.getmtime(viz_file_path)    # Modification time of the existing visualization file
+        source_files = [path for path in (input_file, mapping_file_path) if path and os.path.exists(path)]
+        if any(os.path.getmtime(path) > viz_file_mtime for path in source_files):
+            print(f"{viz_file_path} is older than its inputs: creating new visualization")
+            return True
+        write_manifest(viz_file_path, current_manifest)
+        return False
     
-    #Check if input file is newer than the visualization file. If true, then return true to create a new visualization.
-    return input_file_mtime > viz_file_mtime  # Return True if the input file is newer, otherwise False
+    if not manifest_matches(stored_manifest, current_manifest):
+        print(f"{viz_file_path} manifest is stale: creating new visualization")
+        return True
+    return False
+
+
+def viz_file_name(vizType, clusterName_para, input_file_extension):
+    """
+    Returns the name of the HTML file a visualization type writes for a layer.
+
+    Parameters:
+        vizType (str): The type of visualization (a key of vizDictionary).
+        clusterName_para (str): The name of the cluster used in the file name.
+        input_file_extension (str): The extension of the input file ('.net', '.ecom' or '.vcom').
+
+    Returns:
+        str: The file name inside the 'visualization' directory.
+    """
+    if input_file_extension == '.ecom':
+        suffix = 'comNet' if vizType == 'community_network_visualization' else 'ecom'
+    elif input_file_extension == '.vcom':
+        suffix = 'vcom'
+    else:
+        suffix = 'Network'
+    return f"{vizFilePrefixes.get(vizType, 'unknown')}_{clusterName_para}_{suffix}.html"
+
 
+def viz_manifest(vizType, input_file, mapping_file_path=None, previous=None, sparsify=DEFAULT_SPARSIFY):
+    """
+    Builds the manifest describing the visualization 'vizType' of 'input_file' with the current code.
+
+    Parameters:
+        vizType (str): The type of visualization (a key of vizDictionary).
+        input_file (str): The path to the input layer file.
+        mapping_file_path (str, optional): The path to the '.map' file, if any.
+        previous (dict, optional): The stored manifest, used to avoid re-hashing unchanged files.
+        sparsify (tuple or None): The (method, budget) of the drawn edges of '.net' layers, see load_inputs.
+
+    Returns:
+        dict: The manifest (see vizCache.build_manifest).
+    """
+    renderer = renderer_version([vizModules.get(vizType, vizType)] + vizSharedModules)
+    if input_file.endswith('.net'):
+        # a '.net' view drawn with other edges is another visualization
+        renderer += f"|sparsify={sparsify}"
+    return build_manifest(vizType, renderer, input_file, mapping_file_path, previous)
 
-def create_mapper(mapping_file_path, mapping_file_present):
+
+def create_mapper(mapping_file_path, mapping_file_present, cache_dir=None, backend=None):
     """
     Creates a mapping from node IDs to corresponding labels or geographical coordinates.
 
-    This function reads from a CSV file specified by `mapping_file_path` to construct
-    a dictionary mapping node IDs to either labels or tuples of geographical coordinates
-    (longitude, latitude). The structure of the mapping depends on the number of columns
-    in the CSV file. The function handles three scenarios:
+    This function reads the CSV file specified by `mapping_file_path` into a NodeMapping, a
+    read-only mapping of node IDs to either labels or tuples of geographical coordinates
+    (longitude, latitude) backed by columnar arrays (see vizMapping). The structure of the
+    mapping depends on the number of columns in the CSV file. The function handles three scenarios:
     1. Two columns: Maps node IDs to labels.
     2. Three columns: Maps node IDs to a tuple of (longitude, latitude).
     3. More than three columns with comma-separated values in the second column: 
        Maps node IDs to a tuple of (longitude, latitude) parsed from the second column.
+    The file is parsed with pandas and, given a cache folder, stored in binary form keyed by its
+    content digest, so later renders memory-map it instead of parsing it again. Very large files
+    (see vizMapping.choose_backend) are instead imported once into an indexed SQLite database in
+    the cache folder, from which the renderers fetch the labels of the nodes they draw.
 
     Parameters:
         mapping_file_path (str): The file path to the CSV file containing the mapping data.
         mapping_file_present (bool): A boolean indicating whether the mapping file is 
                                     present and should be read. If `False`, the function 
-                                    will return an empty dictionary.
+                                    will return an empty mapping.
+        cache_dir (str, optional): The cache folder (see vizCache.cache_dir_for).
+        backend (str, optional): 'auto' or one of vizMapping.MAPPING_BACKENDS, defaults to
+                                 vizMapping.DEFAULT_BACKEND. The 'sqlite' backend needs a cache folder.
 
     Returns:
-        dict: A dictionary where the keys are node IDs (str) and the values are either 
-              labels (str) or tuples of geographical coordinates (float, float), depending 
-              on the CSV file structure.
+        NodeMapping or SqliteNodeMapping: A mapping where the keys are node IDs (str) and the values are either 
+                     labels (str) or tuples of geographical coordinates (float, float), depending 
+                     on the CSV file structure. It also offers vectorized lookups by integer node id.
     """
-    mapper = {}
     # If a mapping file is present, read it and cretate the mapping.
-    if mapping_file_present:
-        with open(mapping_file_path, "r", newline='') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)  # Skip the header
-            for row in reader:
-                node_id = row[0].strip()  # Retrieves and strips whitespace from the node ID.
-                # Handle different types of mapping files with varying numbers of columns.
-                if len(row) == 2:  # Handles the case where the row has two columns (node ID and label).
-                    mapper[node_id] = row[1].strip()
-                elif len(row) == 3:  # Handles the case where the row has three columns (node ID, longitude, latitude).
-                    lon, lat = row[1].strip(), row[2].strip()
-                    mapper[node_id] = (float(lon), float(lat))
-                elif len(row) > 3 and ',' in row[1]:  # Handles a complex case where the second column contains multiple values separated by commas.
-                    _, lon, lat = row[1].split(',')
-                    mapper[node_id] = (float(lon), float(lat))
-    return mapper
+    if not mapping_file_present:
+        return vizMapping.NodeMapping()
+    if cache_dir is None:
+        return vizMapping.NodeMapping(*vizMapping.parse_mapping_file(mapping_file_path))
+    if vizMapping.choose_backend(mapping_file_path, backend or vizMapping.DEFAULT_BACKEND) == 'sqlite':
+        try:
+            return vizMapping.SqliteNodeMapping(load_mapping_database(mapping_file_path, cache_dir))
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not use the mapping database of {mapping_file_path}, loading it into memory: {e}")
+    return vizMapping.NodeMapping(*load_mapping(mapping_file_path, cache_dir))
 
 # Each 'vizFunction' defined below imports a specific visualization module and calls a function within that module to generate a visualization.
 
-def plotlyViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name):
+def plotlyViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=None):
     import plotlyVisualization as pv
-    return(pv.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name))
+    return(pv.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=context))
 
-def bokehViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name):
+def bokehViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=None):
     import bokehVisualization as bv
-    return(bv.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, dataset_type, final_output_cluster_name))
+    return(bv.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, dataset_type, final_output_cluster_name, context=context))
 
-def bokehDcViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name):
+def bokehDcViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=None):
     import bokehVisualization_dc as bv_dc
-    return(bv_dc.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, dataset_type, final_output_cluster_name))
+    return(bv_dc.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, dataset_type, final_output_cluster_name, context=context))
     
-def pyvisViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name):
+def pyvisViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=None):
     import pyvisVisualization as pyv
-    return(pyv.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name))
+    return(pyv.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=context))
     
-def mapViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name):
+def mapViz(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=None):
     import mapVisualization as mpv
-    return(mpv.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name))
+    return(mpv.visualization(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, final_output_cluster_name, context=context))
 
 def wordCloudViz(data, mapper, mln_User, endPath, mappingFile_present, G, input_file, final_output_cluster_name):
     import wordCloudViz as wc
@@ -155,7 +199,278 @@ vizDictionary = {
     'bar_chart_visualization': barChartViz,
 }
 
-def readNCall(pathToInputFile, mappingInputFile , mln_User, vizType):
+# The visualization types that apply to each kind of layer file.
+vizTypesByExtension = {
+    ".net": ["plotly_visualization", "bokeh_visualization", "bokeh_dc_visualization", "pyvis_visualization", "map_visualization"],
+    ".ecom": ["word_cloud_visualization", "community_network_visualization", "bar_chart_visualization"],
+    ".vcom": ["word_cloud_visualization", "bubble_chart_visualization", "bar_chart_visualization"],
+}
+
+# The '.ecom'/'.vcom' visualization types that draw the networkx graph of the layer, the others get None as 'G'.
+vizGraphTypes = {"community_network_visualization"}
+
+# The module that renders each visualization type, its source is part of the renderer version.
+vizModules = {
+    "plotly_visualization": "plotlyVisualization",
+    "bokeh_visualization": "bokehVisualization",
+    "bokeh_dc_visualization": "bokehVisualization_dc",
+    "pyvis_visualization": "pyvisVisualization",
+    "map_visualization": "mapVisualization",
+    "word_cloud_visualization": "wordCloudViz",
+    "bubble_chart_visualization": "bubbleChartViz",
+    "community_network_visualization": "communityNetworkViz",
+    "bar_chart_visualization": "barChartViz",
+}
+# Helper modules whose source affects the output of every visualization type.
+vizSharedModules = ["vizUTILS", "vizConfig", "vizParser", "vizContext", "vizLayout", "vizCommunity", "vizOverview", "vizSparsify", "vizMapping", "vizStatic", "vizCommunityStats", "vizGraph", "vizBokeh"]
+
+# The prefix of the HTML file written by each visualization type (see viz_file_name).
+vizFilePrefixes = {
+    "plotly_visualization": "plotly",
+    "bokeh_visualization": "bokeh",
+    "bokeh_dc_visualization": "bokeh_DC",
+    "pyvis_visualization": "pyvis",
+    "map_visualization": "map",
+    "word_cloud_visualization": "wordcloud",
+    "bubble_chart_visualization": "bubblechart",
+    "community_network_visualization": "bokeh",
+    "bar_chart_visualization": "bar_chart",
+}
+
+def resolve_layer(pathToInputFile, mappingInputFile, mln_User):
+    """
+    Works out the names and paths involved in visualizing one layer file.
+
+    It determines the dataset type, extracts the username from the user's path to derive the
+    output cluster name and checks for the presence of a mapping file. The module level
+    'dataset_type' and 'input_file_extension' globals are set for the visualization wrappers.
+
+    Parameters:
+        pathToInputFile (str): The path to the input file containing the data.
+        mappingInputFile (str): The path where the mapping files are stored.
+        mln_User (str): The base path for the user's data directory.
+
+    Returns:
+        dict: The layer description with the keys 'input_file', 'endPath', 'input_file_extension',
+              'final_output_cluster_name', 'mapping_file_path' and 'mappingFile_present'.
+    """
+    cluster = pathToInputFile
+    input_file = f'{cluster}'
+    print(input_file)
+    
+    global dataset_type
+    dataset_type = determine_dataset_type(input_file)   # Determine and set the dataset type based on the input file.
+    
+    inputFile_base_name = os.path.basename(input_file).split('.')[0]
+    endPath = os.path.relpath(mln_User)
+
+    # Code to identify a username within a given path.
+    # Identify the index where "itlab" or username might reside (considering different path structures)
+    potential_username_indices = [-1, -2]  # Check both the last and second-last element
+    path_components = mln_User.split('/')
+    for index in potential_username_indices:
+        # Check if the element at the index is not empty and doesn't start with "." (hidden folder)
+        if path_components[index] and not path_components[index].startswith("."):
+            username = path_components[index]
+            print("USERNAME: %s" % username)
+            break  # Exit the loop after finding the first valid username
+    
+    global input_file_extension
+    input_file_extension = os.path.splitext(input_file)[-1] if any(input_file.endswith(ext) for ext in [".ecom", ".net", ".vcom"]) else ""
+    
+    if username:
+        final_output_cluster_name = inputFile_base_name.replace(f"{username}_", '')
+        final_output_cluster_name = final_output_cluster_name.replace(f"{username}_", '')
+        
+    # checking if mapping file exists
+    # TODO: check for this mapping input file for com_net     
+    mapping_file_path = os.path.join(mappingInputFile, f"{inputFile_base_name}.map")
+    print("Mapping file PATH: ", mapping_file_path)
+    mappingFile_present = os.path.exists(mapping_file_path)
+    print("Mapping file PRESENT: ", mappingFile_present)
+
+    return {
+        'input_file': input_file,
+        'endPath': endPath,
+        'input_file_extension': input_file_extension,
+        'final_output_cluster_name': final_output_cluster_name,
+        'mapping_file_path': mapping_file_path,
+        'mappingFile_present': mappingFile_present,
+    }
+
+def load_inputs(layer, mln_User, sparsify=DEFAULT_SPARSIFY):
+    """
+    Parses a layer and loads everything the visualization functions share.
+
+    For '.net' layers this is the edge arrays, the header values, the mapper and a LayerContext
+    that lazily builds (and memoizes) the graph, degrees, communities and layouts. For '.ecom'
+    and '.vcom' layers it is the mapper and a CommunityLayer, the 'data' dictionary of the
+    renderers, that builds the networkx graph only when a view draws it.
+
+    The drawing '.net' views only draw the edges kept by vizSparsify.sparsify_edges(allEdges,
+    *sparsify) (see render_view). 'allEdges' and the context keep every edge, so the community
+    detection, the degrees, the community overviews and the community pages use the whole layer.
+
+    Parameters:
+        layer (dict): The layer description returned by resolve_layer.
+        mln_User (str): The base path for the user's data directory.
+        sparsify (tuple or None): The (method, budget) of the drawn edges of '.net' layers, None
+                                  draws every edge. Defaults to vizSparsify.DEFAULT_SPARSIFY.
+
+    Returns:
+        dict: The shared inputs, passed on to render_view.
+    """
+    input_file = layer['input_file']
+    # parse the layer once, later calls for any vizType reuse the memory-mapped binary cache
+    header, arrays = load_layer(os.path.relpath(input_file), cache_dir_for(mln_User))
+    # create mapper
+    mapper = create_mapper(layer['mapping_file_path'], layer['mappingFile_present'], cache_dir_for(mln_User))
+    inputs = {'mapper': mapper, 'sparsify': sparsify}
+    if input_file.endswith('.net'):
+        from vizContext import LayerContext
+        # edges are int32/int32/float32 arrays
+        inputs['clusterName'] = header['clusterName']
+        inputs['noVerticesLayer1'] = header['noVerticesLayer1']
+        inputs['noEdges_fromFile'] = header['noEdges_fromFile']
+        inputs['allEdges'] = EdgeArrays(arrays['src'], arrays['dst'], arrays['weight'])
+        # print(allEdges.src[0], allEdges.dst[0], allEdges.weight[0]) # prints node1, node2, weight(1.0)
+        inputs['context'] = LayerContext(inputs['allEdges'], inputs['noVerticesLayer1'], mapper, dataset_type, cache_dir_for(mln_User))
+    elif input_file.endswith('.ecom') or input_file.endswith('.vcom'):
+        from vizContext import CommunityLayer
+        # the community allocation as CSR arrays, the 'data' dictionary of the renderers;
+        # the networkx graph (with the 'community' node attribute drawn by communityNetworkViz)
+        # and the per-community statistics of the charts are only built when a view uses them
+        inputs['data'] = CommunityLayer(header, layer['input_file_extension'], arrays, input_file, cache_dir_for(mln_User))
+    return inputs
+
+def render_view(layer, inputs, mln_User, vizType, manifest, overview=True):
+    """
+    Calls the visualization function of 'vizType' on already loaded inputs.
+
+    Parameters:
+        layer (dict): The layer description returned by resolve_layer.
+        inputs (dict): The shared inputs returned by load_inputs.
+        mln_User (str): The base path for the user's data directory.
+        vizType (str): The type of visualization to generate.
+        manifest (dict): The manifest of the inputs (see viz_manifest), taken before they were loaded.
+                         It is stored next to the visualization when rendering succeeds.
+        overview (bool): Whether a huge layer is rendered as a community overview (see vizOverview),
+                         False for the pages of the communities.
+
+    Returns:
+        str or bool or None: The result of the visualization function, normally the output path.
+    """
+    vizFunctionToCall = vizDictionary[vizType.lower()]
+    input_file = layer['input_file']
+    result = None
+    
+    import vizOverview
+    if overview and vizOverview.use_overview(vizType, layer_size(layer, inputs)):
+        # huge layer: render the community overview into the view's file (see vizOverview)
+        print(f"Calling {vizOverview.visualization}")
+        result = render_overview(layer, inputs, mln_User, vizType, manifest)
+    elif input_file.endswith('.net'):
+        print(f"Calling {vizFunctionToCall}")
+        # dense layers only draw part of their edges, the drawn context takes communities and degrees from the whole layer
+        context = inputs['context'] if inputs['sparsify'] is None else inputs['context'].sparsify(*inputs['sparsify'])
+        # the file is named after the input file (see viz_file_name), not the header's cluster name, so createViz finds it
+        result = vizFunctionToCall(context.allEdges, inputs['mapper'], mln_User, layer['endPath'], inputs['noEdges_fromFile'], inputs['noVerticesLayer1'],
+                                   layer['mappingFile_present'], layer['final_output_cluster_name'], context=context)
+    elif input_file.endswith('.ecom') or input_file.endswith('.vcom'):
+        print(f"Calling {vizFunctionToCall}")
+        # only the views drawing the network get the (lazily built) graph
+        G = inputs['data'].graph() if vizType.lower() in vizGraphTypes else None
+        result = vizFunctionToCall(inputs['data'], inputs['mapper'], mln_User, layer['endPath'], layer['mappingFile_present'], G,
+                                   input_file, layer['final_output_cluster_name'])
+    # record what the visualization was built from, renderers return an error message or None on failure
+    if isinstance(result, str) and result.endswith('.html') and os.path.exists(result):
+        import vizStatic
+        vizStatic.precompress(result)   # '.gz'/'.br' copies for the web server
+        write_manifest(result, manifest)
+    return result
+
+def layer_size(layer, inputs):
+    """Returns the number of nodes of a loaded '.net' or '.ecom' layer (0 for '.vcom' layers, which have no network view)."""
+    if layer['input_file'].endswith('.net'):
+        return len(inputs['context'].node_index()[0])
+    if layer['input_file'].endswith('.ecom'):
+        return inputs['data'].num_nodes()
+    return 0
+
+def community_cluster_name(clusterName_para, community):
+    """Returns the cluster name used in the file names of a community's page (see readNCallCommunity)."""
+    return f"{clusterName_para}_c{community}"
+
+def render_overview(layer, inputs, mln_User, vizType, manifest):
+    """
+    Renders the community overview of a huge layer into the file of 'vizType' (see vizOverview).
+
+    Every super-node links to the page of its community, named like the view of a cluster
+    called community_cluster_name(...), the links are built by vizOverview.community_page_url.
+    With file links (the default) the pages are rendered here as well, from the already loaded
+    inputs, so every link of the overview opens an existing file. With server links they are
+    rendered on demand by readNCallCommunity.
+
+    Returns:
+        str: The path to the overview file.
+    """
+    import vizOverview
+    extension = layer['input_file_extension']
+    cluster = layer['final_output_cluster_name']
+    partition = vizOverview.layer_partition(extension, inputs)
+    nodes, rows, cols, labels, community_ids = partition
+    mapping_dir = os.path.dirname(layer['mapping_file_path'])
+    page_urls = [vizOverview.community_page_url(viz_file_name(vizType, community_cluster_name(cluster, community), extension),
+                                                layer['input_file'], mapping_dir, mln_User, vizType, community)
+                 for community in community_ids.tolist()]
+    if vizOverview.COMMUNITY_LINK_MODE == 'file':
+        for community in community_ids.tolist():
+            render_community_page(layer, lambda: inputs, mln_User, vizType, community, manifest, partition, inputs['sparsify'])
+    title = f"{cluster} community overview"
+    return vizOverview.visualization(nodes, rows, cols, labels, community_ids, layer['endPath'], mln_User,
+                                     viz_file_name(vizType, cluster, extension), page_urls, title)
+
+def render_community_page(layer, get_inputs, mln_User, vizType, community, manifest=None, partition=None, sparsify=DEFAULT_SPARSIFY):
+    """
+    Renders the page of one community of a layer, unless it is up to date (see readNCallCommunity).
+
+    Parameters:
+        layer (dict): The layer description returned by resolve_layer.
+        get_inputs (callable): Returns the shared inputs of the whole layer (see load_inputs), only
+                               called if the page has to be rendered.
+        mln_User (str): The base path for the user's data directory.
+        vizType (str): The network visualization type of the overview.
+        community (int): The community id shown in the overview.
+        manifest (dict, optional): The manifest of the layer's inputs, taken with layer_manifest if not given.
+        partition (tuple, optional): The layer partition (see vizOverview.layer_partition).
+        sparsify (tuple or None): The sparsification of the inputs (see load_inputs).
+
+    Returns:
+        str or bool: The path to the community's page, False if the community does not exist or
+                     rendering failed.
+    """
+    import vizOverview
+    page_layer = dict(layer, final_output_cluster_name=community_cluster_name(layer['final_output_cluster_name'], community))
+    page_path = os.path.join(mln_User, "visualization", viz_file_name(vizType, page_layer['final_output_cluster_name'], layer['input_file_extension']))
+    if not createViz(mln_User, page_layer['final_output_cluster_name'], vizType, layer['input_file_extension'], layer['input_file'], layer['mapping_file_path'], sparsify):
+        return page_path
+    # clicks on the same super-node by several users render the page once (see readNCall)
+    with render_lock(page_path, cache_dir_for(mln_User)):
+        if not createViz(mln_User, page_layer['final_output_cluster_name'], vizType, layer['input_file_extension'], layer['input_file'], layer['mapping_file_path'], sparsify):
+            return page_path
+        manifest = layer_manifest(layer, vizType, sparsify) if manifest is None else manifest
+        inputs = vizOverview.community_subset(layer['input_file_extension'], get_inputs(), community, partition)
+        if inputs is None:
+            print(f"Community {community} does not exist in {layer['input_file']}")
+            return False
+        return render_view(page_layer, inputs, mln_User, vizType, manifest, overview=False)
+
+def layer_manifest(layer, vizType, sparsify=DEFAULT_SPARSIFY):
+    """Fingerprints the inputs of 'vizType' for a layer, see viz_manifest."""
+    mapping_file_path = layer['mapping_file_path'] if layer['mappingFile_present'] else None
+    return viz_manifest(vizType, layer['input_file'], mapping_file_path, sparsify=sparsify)
+
+def readNCall(pathToInputFile, mappingInputFile , mln_User, vizType, sparsify=DEFAULT_SPARSIFY):
     """
     Processes the input file to determine the dataset type and decide whether a new visualization
     needs to be created or an existing one should be reused. It also handles mapping file operations
@@ -164,13 +479,17 @@ def readNCall(pathToInputFile, mappingInputFile , mln_User, vizType):
     The function attempts to identify the dataset type, extracts the username from the path, checks 
     for the presence of a mapping file, and determines the need for creating a new visualization. 
     It supports various file types and handles them accordingly, creating the necessary visualization 
-    if it doesn't already exist.
+    if it doesn't already exist. Concurrent requests for the same visualization render it once:
+    the first one holds the file's render lock (see vizCache.render_lock) and the others wait
+    for it and then return the file it wrote.
 
     Parameters:
         pathToInputFile (str): The path to the input file containing the data.
         mappingInputFile (str): The path where the mapping files are stored.
         mln_User (str): The base path for the user's data directory.
         vizType (str): The type of visualization to generate.
+        sparsify (tuple or None): The (method, budget) of the edges drawn for '.net' layers, None
+                                  draws every edge (see load_inputs).
 
     Returns:
         str or bool: The path to the existing or newly created visualization file if successful, 
@@ -180,151 +499,110 @@ def readNCall(pathToInputFile, mappingInputFile , mln_User, vizType):
         Exception: Descriptive error message if any operation within the function fails.
     """
     try:    
-        cluster = pathToInputFile
-        orig_input_file = f'{cluster}'
-        input_file = f'{cluster}'
-        print(input_file)
-        
-        global dataset_type
-        dataset_type = determine_dataset_type(input_file)   # Determine and set the dataset type based on the input file.
-        
-        inputFile_base_name = os.path.basename(input_file).split('.')[0]
-        endPath = os.path.relpath(mln_User)
-
-        # Code to identify a username within a given path.
-        # Identify the index where "itlab" or username might reside (considering different path structures)
-        potential_username_indices = [-1, -2]  # Check both the last and second-last element
-        path_components = mln_User.split('/')
-        for index in potential_username_indices:
-            # Check if the element at the index is not empty and doesn't start with "." (hidden folder)
-            if path_components[index] and not path_components[index].startswith("."):
-                username = path_components[index]
-                print("USERNAME: %s" % username)
-                break  # Exit the loop after finding the first valid username
-        
-        global input_file_extension
-        input_file_extension = os.path.splitext(input_file)[-1] if any(input_file.endswith(ext) for ext in [".ecom", ".net", ".vcom"]) else ""
-        
-        # Define visualization type to simplified graph type mapping
-        viz_type_to_graph_type = {
-            'plotly_visualization': 'plotly',
-            'bokeh_visualization': 'bokeh',
-            'bokeh_dc_visualization': 'bokeh',
-            'community_network_visualization': 'bokeh',
-            'pyvis_visualization': 'pyvis',
-            'map_visualization': 'map',
-            'word_cloud_visualization': 'wordcloud',
-            'bubble_chart_visualization': 'bubblechart',  
-            'bar_chart_visualization': 'barchart'         
-        }
-        vizGraphType = viz_type_to_graph_type.get(vizType, 'unknown')
-        print("Visualization graph TYPE: ", vizGraphType)
-        
-        if username:
-            final_output_cluster_name = inputFile_base_name.replace(f"{username}_", '')
-            final_output_cluster_name = final_output_cluster_name.replace(f"{username}_", '')
-            
-        # checking if mapping file exists
-        # TODO: check for this mapping input file for com_net     
-        mapping_file_path = os.path.join(mappingInputFile, f"{inputFile_base_name}.map")
-        print("Mapping file PATH: ", mapping_file_path)
-        mappingFile_present = os.path.exists(mapping_file_path)
-        print("Mapping file PRESENT: ", mappingFile_present)
+        layer = resolve_layer(pathToInputFile, mappingInputFile, mln_User)
+        print("Visualization file PREFIX: ", vizFilePrefixes.get(vizType, 'unknown'))
         
         # check if we need to create viz or load generated viz
         # if True, create viz and save it
-        if createViz(mln_User, final_output_cluster_name, vizGraphType, input_file_extension, orig_input_file):
-            print("Create VISUALIZATION: TRUE")
-            if input_file.endswith('.net'):
-                allEdges = []
-                with open(os.path.relpath(input_file), "r") as f:
-                    allLines = f.readlines()
-                    clusterName = allLines[0].strip()
-                    noVerticesLayer1 = allLines[1].strip()
-                    noEdges_fromFile = allLines[2].strip()
-                    x = int(noVerticesLayer1) + int(3)
-                    f.seek(0)  # reset the file pointer to the beginning of the file
-                    for line in f.readlines()[x:]:
-                        node1, node2, weigth = line.strip().split(',')
-                        allEdges.append((node1, node2, float(weigth)))
-                    # print(allEdges[0]) # prints node1, node2, weight(1.0)
-            elif input_file.endswith('.ecom'):
-                # dictionary to maintain the data
-                data = {}    
-                import networkx as nx
-                G = nx.Graph()
-                # read input file ---------------------------------------------------------------------------------------------------------------------
-                with open(os.path.relpath(input_file), 'r') as f:
-                    lines = f.readlines()
-                # extract ecom info from input file and store in dictionary
-                for i, line in enumerate(lines):
-                    if line.startswith('# Edge Community File for Layer'):
-                        data['Layer'] = lines[i+1].strip()
-                    elif line.startswith('# Number of Vertices'):
-                        data['NumVertices'] = int(lines[i+1].strip())
-                    elif line.startswith('# Number of Non-Singleton Communities'):
-                        data['NumCommunities'] = int(lines[i+1].strip())
-                    elif line.startswith('# Number of Community Edges'):
-                        data['NumCommunitiesEdges'] = int(lines[i+1].strip())
-                    elif line.startswith('# Edge Community Allocation'):
-                        data['Communities'] = {}
-                        for j in range(i+1, len(lines)):
-                            if not lines[j].startswith('#'):
-                                v1id, v2id, commID = map(int, lines[j].strip().split(','))
-                                G.add_node(v1id, community=commID)
-                                G.add_node(v2id, community=commID)
-                                G.add_edge(v1id, v2id)
-                                if commID not in data['Communities']:
-                                    data['Communities'][commID] = []
-                                data['Communities'][commID].append((v1id, v2id))
-                # print(data['Communities']) #{'Layer': 'L2', 'NumVertices': 6, 'NumCommunities': 4, 'Communities': {1: [1, 2, 3], 2: [4], 3: [5], 4: [6]}}
-            elif input_file.endswith('.vcom'):
-                # dictionary to maintain the data
-                data = {}    
-                import networkx as nx
-                G = nx.Graph()
-                # read input file ---------------------------------------------------------------------------------------------------------------------
-                with open(os.path.relpath(input_file), 'r') as f:
-                    lines = f.readlines()
-                    for i, line in enumerate(lines):
-                        if line.startswith('# Vertex Community File for Layer'):
-                            data['Layer'] = lines[i+1].strip()
-                        elif line.startswith('# Number of Vertices'):
-                            data['NumVertices'] = int(lines[i+1].strip())
-                        elif line.startswith('# Number of Total Communities'):
-                            data['NumCommunities'] = int(lines[i+1].strip())
-                        elif line.startswith('# Vertex Community Allocation'):
-                            data['Communities'] = {}
-                            for j in range(i+1, len(lines)):
-                                if not lines[j].startswith('#'):
-                                    vid, commID = map(int, lines[j].strip().split(','))
-                                    if commID in data['Communities']:
-                                        data['Communities'][commID].append(vid)
-                                    else:
-                                        data['Communities'][commID] = [vid]
-            
-            # create mapper
-            mapper = create_mapper(mapping_file_path, mappingFile_present)
-                
-            vizFunctionToCall = vizDictionary[vizType.lower()]
-            
-            print(f"Calling {vizFunctionToCall}")
-            if input_file.endswith('.net'):
-                return(vizFunctionToCall(allEdges, mapper, mln_User, endPath, noEdges_fromFile, noVerticesLayer1, mappingFile_present, clusterName))
-            if input_file.endswith('.ecom') or input_file.endswith('.vcom'):
-                return(vizFunctionToCall(data, mapper, mln_User, endPath, mappingFile_present, G, input_file, final_output_cluster_name))
+        return_path_to_viz = os.path.join(mln_User, "visualization", viz_file_name(vizType, layer['final_output_cluster_name'], layer['input_file_extension']))
+        if createViz(mln_User, layer['final_output_cluster_name'], vizType, layer['input_file_extension'], layer['input_file'], layer['mapping_file_path'], sparsify):
+            # only one request renders a file at a time, the others wait and then reuse its result
+            with render_lock(return_path_to_viz, cache_dir_for(mln_User)):
+                if createViz(mln_User, layer['final_output_cluster_name'], vizType, layer['input_file_extension'], layer['input_file'], layer['mapping_file_path'], sparsify):
+                    print("Create VISUALIZATION: TRUE")
+                    # fingerprint the inputs before rendering, so a file replaced meanwhile is detected on the next request
+                    manifest = layer_manifest(layer, vizType, sparsify)
+                    inputs = load_inputs(layer, mln_User, sparsify)
+                    return render_view(layer, inputs, mln_User, vizType, manifest)
+            print("VIZ RENDERED BY A CONCURRENT REQUEST: ", return_path_to_viz)
+            return return_path_to_viz
         else:
             print("Create viz: FALSE")
-            replacer = ""
-            if input_file_extension == '.net':
-                replacer = "Network"
-            if input_file_extension == '.ecom':
-                replacer = "ecom"
-            if input_file_extension == '.vcom':
-                replacer ="vcom"
-            return_path_to_viz = os.path.join(mln_User, "visualization", f"{vizGraphType}_{final_output_cluster_name}_{replacer}.html")
             print("VIZ ALREADY EXISTS: ", return_path_to_viz)
             return return_path_to_viz
     except Exception as e:
         print(e)
-        return False
\ No newline at end of file
+        return False
+
+def readNCallCommunity(pathToInputFile, mappingInputFile, mln_User, vizType, community, sparsify=DEFAULT_SPARSIFY):
+    """
+    Returns the page of one community of a huge layer, rendering it on demand.
+
+    The community overview (see vizOverview) links every super-node to the page of its
+    community, a normal 'vizType' view of the community's subgraph (never another overview,
+    however large the community). With file links the overview renders the pages of all its
+    communities (see render_overview), with server links a page is rendered the first time it is
+    requested. Either way it is cached like any other visualization (see createViz).
+
+    Parameters:
+        pathToInputFile (str): The path to the '.net' or '.ecom' input file.
+        mappingInputFile (str): The path where the mapping files are stored.
+        mln_User (str): The base path for the user's data directory.
+        vizType (str): The network visualization type of the overview.
+        community (int): The community id shown in the overview.
+        sparsify (tuple or None): The (method, budget) of the drawn edges of '.net' layers (see load_inputs).
+
+    Returns:
+        str or bool: The path to the community's page, False if the community does not exist or
+                     an error occurs.
+    """
+    try:
+        layer = resolve_layer(pathToInputFile, mappingInputFile, mln_User)
+        # the layer is only loaded if the page has to be rendered
+        return render_community_page(layer, lambda: load_inputs(layer, mln_User, sparsify), mln_User, vizType, community, sparsify=sparsify)
+    except Exception as e:
+        print(e)
+        return False
+
+def renderViews(pathToInputFile, mappingInputFile, mln_User, vizTypes, sparsify=DEFAULT_SPARSIFY):
+    """
+    Renders several visualization types of one layer, sharing all intermediate results.
+
+    The layer is parsed and the mapper is loaded once, and for '.net' layers a single
+    LayerContext is shared by all views, so the networkx graph, degrees, communities and layouts
+    are built once instead of once per view. Views whose existing output is still up to date
+    (see createViz) are not rendered again, and nothing is loaded if all of them are.
+
+    Parameters:
+        pathToInputFile (str): The path to the input file containing the data.
+        mappingInputFile (str): The path where the mapping files are stored.
+        mln_User (str): The base path for the user's data directory.
+        vizTypes (list): The visualization types to generate (keys of vizDictionary).
+        sparsify (tuple or None): The (method, budget) of the drawn edges of '.net' layers (see load_inputs).
+
+    Returns:
+        dict: Maps each visualization type to a dict with 'path' (the output path, or False if
+              rendering failed), 'seconds' (time spent on the view, including the loading of the
+              shared inputs for the first rendered view) and 'cached' (True if the existing output
+              was reused).
+    """
+    import time
+    results = {}
+    try:
+        layer = resolve_layer(pathToInputFile, mappingInputFile, mln_User)
+    except Exception as e:
+        print(e)
+        return {vizType: {'path': False, 'seconds': 0.0, 'cached': False} for vizType in vizTypes}
+
+    inputs = None
+    for vizType in vizTypes:
+        start = time.perf_counter()
+        cached = False
+        try:
+            path = os.path.join(mln_User, "visualization", viz_file_name(vizType, layer['final_output_cluster_name'], layer['input_file_extension']))
+            cached = True
+            if createViz(mln_User, layer['final_output_cluster_name'], vizType, layer['input_file_extension'], layer['input_file'], layer['mapping_file_path'], sparsify):
+                # the view is reused if a concurrent request rendered it while this one waited (see readNCall)
+                with render_lock(path, cache_dir_for(mln_User)):
+                    if createViz(mln_User, layer['final_output_cluster_name'], vizType, layer['input_file_extension'], layer['input_file'], layer['mapping_file_path'], sparsify):
+                        cached = False
+                        manifest = layer_manifest(layer, vizType, sparsify)
+                        if inputs is None:
+                            inputs = load_inputs(layer, mln_User, sparsify)
+                        path = render_view(layer, inputs, mln_User, vizType, manifest)
+        except Exception as e:
+            print(f"ERROR occured for {vizType}: {e}")
+            path = False
+        results[vizType] = {'path': path, 'seconds': time.perf_counter() - start, 'cached': cached}
+        print(f"{vizType}: {results[vizType]}")
+    return results
@@ -0,0 +1,107 @@
+import numpy as np
+import networkx as nx
+
+"""
+    Community detection of the network visualizations.
+
+    Three networkx algorithms can be selected:
+    - 'greedy_modularity': Clauset-Newman-Moore greedy modularity maximization, the algorithm the
+      bokeh view always used. It gives good partitions but scales badly, so 'auto' only picks it
+      for small graphs;
+    - 'louvain': Louvain modularity optimization, close to greedy modularity in quality and
+      near-linear in the number of edges, 'auto' picks it for medium graphs;
+    - 'label_propagation': asynchronous label propagation, the fastest but least stable one,
+      'auto' picks it for huge graphs.
+
+    Louvain and label propagation are randomized, they always run with a fixed seed so the same
+    graph gets the same partition (and the same colors) on every render.
+"""
+
+# Largest graph (in nodes) for which 'auto' uses greedy modularity.
+GREEDY_MODULARITY_MAX_NODES = 2000
+# Largest graph for which 'auto' uses Louvain, bigger graphs use label propagation.
+LOUVAIN_MAX_NODES = 50000
+
+# Names of the selectable algorithms.
+COMMUNITY_ALGORITHMS = ('greedy_modularity', 'louvain', 'label_propagation')
+
+def choose_algorithm(num_nodes, algorithm="auto"):
+    """
+    Resolves the community detection algorithm for a graph of the given size.
+
+    Parameters:
+        num_nodes (int): The number of nodes of the graph.
+        algorithm (str): 'auto' or one of COMMUNITY_ALGORITHMS.
+
+    Returns:
+        str: One of COMMUNITY_ALGORITHMS.
+
+    Raises:
+        ValueError: If the algorithm is unknown.
+    """
+    if algorithm == "auto":
+        if num_nodes <= GREEDY_MODULARITY_MAX_NODES:
+            return 'greedy_modularity'
+        return 'louvain' if num_nodes <= LOUVAIN_MAX_NODES else 'label_propagation'
+    if algorithm not in COMMUNITY_ALGORITHMS:
+        raise ValueError(f"Unknown community detection algorithm: {algorithm}")
+    return algorithm
+
+def detect_communities(G, algorithm, seed):
+    """
+    Runs a community detection algorithm on a graph.
+
+    Like the greedy modularity call it replaces, the edge weights are not used.
+
+    Parameters:
+        G (networkx.Graph): The graph.
+        algorithm (str): One of COMMUNITY_ALGORITHMS.
+        seed (int): The random seed of the randomized algorithms.
+
+    Returns:
+        list: The communities as node sets, largest first. Greedy modularity keeps the order of
+              networkx (also largest first), so the community ids and colors of the small graphs
+              stay those the bokeh view always showed.
+    """
+    if G.number_of_nodes() == 0:
+        return []
+    if algorithm == 'greedy_modularity':
+        return [set(community) for community in nx.community.greedy_modularity_communities(G)]
+    if algorithm == 'louvain':
+        communities = nx.community.louvain_communities(G, weight=None, seed=seed)
+    elif algorithm == 'label_propagation':
+        communities = nx.community.asyn_lpa_communities(G, weight=None, seed=seed)
+    else:
+        raise ValueError(f"Unknown community detection algorithm: {algorithm}")
+    # largest first, ties broken by the smallest node so the order does not depend on the algorithm's
+    return sorted((set(community) for community in communities), key=lambda community: (-len(community), min(community)))
+
+def communities_to_labels(communities, nodes):
+    """
+    Converts a list of node sets into a community label per node.
+
+    Parameters:
+        communities (list): The communities as node sets.
+        nodes (numpy.ndarray): The node ids, every node must belong to one community.
+
+    Returns:
+        numpy.ndarray: The int32 index into 'communities' of each node of 'nodes'.
+    """
+    community_of = {node: index for index, community in enumerate(communities) for node in community}
+    return np.array([community_of[node] for node in nodes.tolist()], dtype=np.int32)
+
+def labels_to_communities(labels, nodes):
+    """
+    Converts a community label per node back into a list of node sets (the inverse of communities_to_labels).
+
+    Parameters:
+        labels (numpy.ndarray): The community index of each node.
+        nodes (numpy.ndarray): The node ids.
+
+    Returns:
+        list: The communities as node sets, in label order.
+    """
+    communities = [set() for _ in range(int(labels.max()) + 1 if len(labels) else 0)]
+    for node, label in zip(nodes.tolist(), labels.tolist()):
+        communities[label].add(node)
+    return communities
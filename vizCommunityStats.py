@@ -0,0 +1,174 @@
+import numpy as np
+from vizCache import community_stats_key, load_community_stats, save_community_stats
+
+"""
+    Per-community statistics of '.ecom' and '.vcom' layers, shared by the bar chart, the word
+    cloud and the bubble chart.
+
+    The statistics of all communities are computed in one pass with NumPy (sorting and
+    bincount) over the flat arrays of the parsed layer: (vertex, community) for '.vcom' layers
+    and (v1, v2, community) for '.ecom' layers. vizCaller.load_inputs stores them in the cache
+    folder and hands them to the charts as data['CommunityStats'], a dict of arrays with one
+    entry per community, in order of first appearance in the file:
+    - 'community': the community id;
+    - 'size': the number of entries of the community in the file, its vertices ('.vcom') or
+      edges ('.ecom');
+    - 'nodes': the number of distinct vertices of the community;
+    - 'edges': the number of edges of the community (0 for '.vcom' layers, which have none);
+    - 'average_degree': 2 * edges / nodes;
+    - 'density': 2 * edges / (nodes * (nodes - 1)).
+"""
+
+# Names of the arrays of the statistics, see the module documentation.
+STAT_NAMES = ('community', 'size', 'nodes', 'edges', 'average_degree', 'density')
+
+def community_index(community):
+    """Returns the community ids in order of first appearance and the position of every entry's community among them."""
+    if not len(community):
+        return community.astype(np.int64), np.zeros(0, dtype=np.int64)
+    # sort based, np.unique without return_inverse is far slower on large arrays
+    order = np.argsort(community, kind='stable')
+    ordered = community[order]
+    new_run = np.concatenate([[True], ordered[1:] != ordered[:-1]])
+    starts = np.flatnonzero(new_run)
+    # the sort is stable, so the first entry of every run is the community's first appearance
+    appearance = np.argsort(order[starts])
+    rank = np.empty(len(starts), dtype=np.int64)
+    rank[appearance] = np.arange(len(starts))
+    index = np.empty(len(community), dtype=np.int64)
+    index[order] = rank[np.cumsum(new_run) - 1]
+    return ordered[starts][appearance], index
+
+def _distinct_counts(index, vertices, count):
+    """Counts the distinct vertices of every community, given the community position and vertex of every entry."""
+    if not len(vertices):
+        return np.zeros(count, dtype=np.int64)
+    vertices = vertices.astype(np.int64) - int(vertices.min())
+    base = int(vertices.max()) + 1
+    if count * base < 2**63:
+        # one int64 key per (community, vertex) pair, sorted in a single pass
+        keys = np.sort(index * base + vertices)
+        distinct = np.concatenate([[True], keys[1:] != keys[:-1]])
+        return np.bincount(keys[distinct] // base, minlength=count)
+    order = np.lexsort((vertices, index))
+    index, vertices = index[order], vertices[order]
+    distinct = np.ones(len(order), dtype=bool)
+    distinct[1:] = (index[1:] != index[:-1]) | (vertices[1:] != vertices[:-1])
+    return np.bincount(index[distinct], minlength=count)
+
+def _stats(ids, size, nodes, edges):
+    """Completes the statistics with the average degree and the density."""
+    nodes_f, edges_f = nodes.astype(np.float64), edges.astype(np.float64)
+    # same conventions as the word cloud legend always used: no division by zero for single-node communities
+    average_degree = 2 * edges_f / np.where(nodes > 0, nodes_f, 1)
+    density = 2 * edges_f / np.where(nodes > 1, nodes_f * (nodes_f - 1), 1)
+    return {
+        'community': np.asarray(ids, dtype=np.int64),
+        'size': size.astype(np.int64),
+        'nodes': nodes.astype(np.int64),
+        'edges': edges.astype(np.int64),
+        'average_degree': average_degree,
+        'density': density,
+    }
+
+def vertex_community_stats(vertex, community):
+    """
+    Computes the statistics of a '.vcom' layer.
+
+    Parameters:
+        vertex (numpy.ndarray): The vertex id of every line of the allocation.
+        community (numpy.ndarray): The community id of every line.
+
+    Returns:
+        dict: The statistics (see the module documentation).
+    """
+    vertex, community = np.asarray(vertex), np.asarray(community)
+    ids, index = community_index(community)
+    size = np.bincount(index, minlength=len(ids))
+    nodes = _distinct_counts(index, vertex, len(ids))
+    return _stats(ids, size, nodes, np.zeros(len(ids), dtype=np.int64))
+
+def edge_community_stats(src, dst, community):
+    """
+    Computes the statistics of a '.ecom' layer.
+
+    Parameters:
+        src (numpy.ndarray): The first vertex id of every edge of the allocation.
+        dst (numpy.ndarray): The second vertex id of every edge.
+        community (numpy.ndarray): The community id of every edge.
+
+    Returns:
+        dict: The statistics (see the module documentation).
+    """
+    src, dst, community = np.asarray(src), np.asarray(dst), np.asarray(community)
+    ids, index = community_index(community)
+    size = np.bincount(index, minlength=len(ids))
+    # every edge contributes both endpoints to its community
+    nodes = _distinct_counts(np.concatenate([index, index]), np.concatenate([src, dst]), len(ids))
+    return _stats(ids, size, nodes, size)
+
+def community_stats(extension, arrays):
+    """
+    Computes the statistics of a parsed layer.
+
+    Parameters:
+        extension (str): '.ecom' or '.vcom'.
+        arrays (dict): The arrays of the parsed layer (see vizParser.parse_layer_file).
+
+    Returns:
+        dict: The statistics (see the module documentation).
+    """
+    if extension == '.ecom':
+        return edge_community_stats(arrays['src'], arrays['dst'], arrays['community'])
+    if extension == '.vcom':
+        return vertex_community_stats(arrays['vertex'], arrays['community'])
+    raise ValueError(f"Community statistics need a '.ecom' or '.vcom' layer, not '{extension}'")
+
+def cached_community_stats(extension, arrays, input_file, cache_dir):
+    """
+    Returns the statistics of a parsed layer, loading them from the cache folder when they are stored.
+
+    Parameters:
+        extension (str): '.ecom' or '.vcom'.
+        arrays (dict): The arrays of the parsed layer.
+        input_file (str): The path to the layer file, the statistics are keyed like its parsed arrays.
+        cache_dir (str or None): The cache folder (see vizCache.cache_dir_for), None to skip the cache.
+
+    Returns:
+        dict: The statistics (see the module documentation).
+    """
+    if cache_dir is None:
+        return community_stats(extension, arrays)
+    key = community_stats_key(input_file)
+    stored = load_community_stats(cache_dir, key, STAT_NAMES)
+    if stored is not None:
+        return dict(zip(STAT_NAMES, stored))
+    stats = community_stats(extension, arrays)
+    save_community_stats(cache_dir, key, stats)
+    return stats
+
+def stats_of(data, extension):
+    """
+    Returns the statistics of a layer's 'data' dictionary.
+
+    These are data['CommunityStats'] as stored by vizCaller.load_inputs, or, for a chart called
+    on its own, statistics computed from the flattened data['Communities'].
+
+    Parameters:
+        data (dict): The 'data' dictionary of the layer.
+        extension (str): '.ecom' or '.vcom' (with or without the dot).
+
+    Returns:
+        dict: The statistics (see the module documentation).
+    """
+    if 'CommunityStats' in data:
+        return data['CommunityStats']
+    extension = extension if extension.startswith('.') else f".{extension}"
+    communities = data['Communities']
+    lengths = [len(members) for members in communities.values()]
+    community = np.repeat(np.array(list(communities.keys()), dtype=np.int64), lengths)
+    members = [member for values in communities.values() for member in values]
+    if extension == '.ecom':
+        pairs = np.array(members, dtype=np.int64).reshape(-1, 2)
+        return edge_community_stats(pairs[:, 0], pairs[:, 1], community)
+    return community_stats(extension, {'vertex': np.array(members, dtype=np.int64), 'community': community})
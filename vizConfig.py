@@ -0,0 +1,12 @@
+"""
+    Settings shared by the render server and the visualization modules.
+
+    The renderers only need to know where the render server listens to build links to it, so
+    its address lives here instead of in renderServer, which they must not import.
+"""
+
+# Default address of the render server (see renderServer), it only listens on the local machine.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Base URL of the render server at its default address.
+RENDER_SERVER_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
@@ -0,0 +1,449 @@
+import numpy as np
+import networkx as nx
+from collections.abc import Mapping
+from vizParser import iter_edges
+from vizCache import array_digest, layout_key, load_layout, save_layout, community_key, load_communities, save_communities
+from vizLayout import DEFAULT_ITERATIONS, choose_layout, compute_layout
+from vizCommunity import choose_algorithm, detect_communities, communities_to_labels, labels_to_communities
+from vizCommunityStats import community_index, cached_community_stats
+from vizGraph import CSRGraph
+from vizSparsify import sparsify_edges
+
+# Seed of the spring layout, fixed so that a layer is always laid out the same way.
+LAYOUT_SEED = 42
+# Seed of the randomized community detection algorithms, fixed for the same reason.
+COMMUNITY_SEED = 42
+
+class LayerContext:
+    """
+    Shared, lazily computed state of one '.net' layer.
+
+    The '.net' renderers (plotly, bokeh, bokeh_dc, pyvis and map) all start from the same parsed
+    edge arrays and mapper and then build the same intermediate results: a sparse graph (for the
+    degrees and neighbor lists), a networkx graph (only for the algorithms that need one),
+    communities and a layout. A LayerContext computes each of these on first use and
+    memoizes it, so rendering several views of a layer from one context (see
+    vizCaller.renderViews) builds every intermediate result only once.
+
+    The drawing views may draw only part of the edges of a dense layer (see sparsify). The
+    context of the drawn edges keeps the context of the whole layer as 'full' and takes the
+    communities, degrees and counts from it, so they describe the layer, not the drawing.
+
+    Renderers must treat the returned objects as read-only, since other views share them.
+    """
+
+    def __init__(self, allEdges, noVerticesLayer1, mapper=None, dataset_type="unknown", cache_dir=None, full=None):
+        """
+        Parameters:
+            allEdges (EdgeArrays): The parsed edge arrays of the layer.
+            noVerticesLayer1 (str or int): The number of vertices from the '.net' header.
+            mapper (dict, optional): The node id to label mapping (see vizCaller.create_mapper).
+            dataset_type (str): The dataset type (see vizUTILS.determine_dataset_type).
+            cache_dir (str, optional): The cache folder (see vizCache.cache_dir_for) used to persist
+                                       layouts and communities. Without it results are only kept in memory.
+            full (LayerContext, optional): The context of the whole layer, when 'allEdges' only
+                                           holds the edges kept by vizSparsify (see sparsify).
+        """
+        self.allEdges = allEdges
+        self.noVerticesLayer1 = int(noVerticesLayer1)
+        self.mapper = mapper if mapper is not None else {}
+        self.dataset_type = dataset_type
+        self.cache_dir = cache_dir
+        self.full = full
+        self._memo = {}
+
+    def _cached(self, key, compute):
+        """Returns the memoized value for 'key', computing it with 'compute()' on first use."""
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def graph(self, include_isolates=True):
+        """
+        Returns the weighted networkx graph of the layer.
+
+        Parameters:
+            include_isolates (bool): If True the graph holds the nodes 0..noVerticesLayer1-1 (in
+                                     that order) before the edge endpoints, so vertices without
+                                     edges are kept. If False it only holds edge endpoints, in
+                                     order of first appearance, unless the layer has no edges.
+
+        Returns:
+            networkx.Graph: The shared graph, it must not be modified.
+        """
+        def build():
+            G = nx.Graph()
+            if include_isolates or len(self.allEdges.src) == 0:
+                G.add_nodes_from(range(self.noVerticesLayer1))
+            G.add_weighted_edges_from(iter_edges(self.allEdges))
+            return G
+        return self._cached(('graph', include_isolates), build)
+
+    def csr_graph(self):
+        """
+        Returns the sparse graph of graph(): its nodes in node_index() order and its edges (see vizGraph).
+
+        Degrees, centralities and neighbor lists are computed on it without building the
+        networkx graph.
+        """
+        return self._cached(('csr_graph',), lambda: CSRGraph(self.node_index()[0], *self.edge_index()))
+
+    def endpoints(self):
+        """Returns a boolean mask over node_index() of the nodes of graph(include_isolates=False)."""
+        def build():
+            degree = self.csr_graph().degree()
+            # without edges graph(include_isolates=False) keeps every node
+            return degree > 0 if len(self.edge_index()[0]) else np.ones(len(degree), dtype=bool)
+        return self._cached(('endpoints',), build)
+
+    def degrees(self, include_isolates=True):
+        """Returns a dict mapping each node of graph(include_isolates) of the whole layer to its degree, computed on csr_graph()."""
+        if self.full is not None:
+            return self.full.degrees(include_isolates)
+        def build():
+            nodes, degree = self.node_index()[0], self.csr_graph().degree()
+            if not include_isolates:
+                keep = self.endpoints()
+                nodes, degree = nodes[keep], degree[keep]
+            return dict(zip(nodes.tolist(), degree.tolist()))
+        return self._cached(('degrees', include_isolates), build)
+
+    def communities(self, algorithm="auto", seed=COMMUNITY_SEED):
+        """
+        Returns the communities of graph() of the whole layer, as a list of node sets (largest first).
+
+        The partition is memoized and (when the context has a cache folder) stored on disk keyed
+        by the graph contents, the algorithm and the seed, so another view or a later render of
+        the layer reuses it instead of running the detection again.
+
+        Parameters:
+            algorithm (str): 'auto' to choose by size, or a vizCommunity.COMMUNITY_ALGORITHMS name.
+            seed (int): The random seed of the randomized algorithms.
+
+        Returns:
+            list: The shared list of communities, it must not be modified.
+        """
+        if self.full is not None:
+            return self.full.communities(algorithm, seed)
+        algorithm = choose_algorithm(len(self.node_index()[0]), algorithm)
+        return self._cached(('communities', algorithm, seed), lambda: self._detect_communities(algorithm, seed))
+
+    def _detect_communities(self, algorithm, seed):
+        """Loads or computes the communities of graph() with the given algorithm."""
+        nodes = self.node_index()[0]
+        key = community_key(self.graph_digest(), algorithm, {}, seed)
+        if self.cache_dir is not None:
+            stored = load_communities(self.cache_dir, key)
+            if stored is not None and np.array_equal(stored[0], nodes):
+                return labels_to_communities(stored[1], nodes)
+        communities = detect_communities(self.graph(), algorithm, seed)
+        if self.cache_dir is not None:
+            save_communities(self.cache_dir, key, nodes, communities_to_labels(communities, nodes))
+        return communities
+
+    def counts(self, include_isolates=True):
+        """
+        Returns the true size of graph(include_isolates): its number of nodes and edges before sparsification.
+
+        Views drawing a sparsified layer (see vizSparsify) use it to show the size of the layer
+        rather than the size of what is drawn.
+
+        Returns:
+            tuple: (number of nodes, number of edges)
+        """
+        if self.full is not None:
+            return self.full.counts(include_isolates)
+        def build():
+            nodes, rows, cols = self.node_index()
+            if include_isolates or len(rows) == 0:
+                num_nodes = len(nodes)
+            else:
+                num_nodes = len(np.unique(np.concatenate([rows, cols])))
+            return num_nodes, len(self.edge_index()[0])
+        return self._cached(('counts', include_isolates), build)
+
+    def sparsified(self):
+        """Returns True if the context only holds part of the layer's edges (see sparsify)."""
+        return self.full is not None
+
+    def sparsify(self, method, budget):
+        """
+        Returns the context of the edges a drawing view draws (see vizSparsify.sparsify_edges).
+
+        The communities, degrees and counts of the returned context are those of this one.
+
+        Parameters:
+            method (str or None): One of vizSparsify.SPARSIFY_METHODS, None keeps every edge.
+            budget (int or None): The maximum number of edges drawn, None for no limit.
+
+        Returns:
+            LayerContext: The shared context of the drawn edges, this context itself if every edge is drawn.
+        """
+        def build():
+            allEdges = sparsify_edges(self.allEdges, method, budget)
+            if allEdges is self.allEdges:
+                return self
+            return LayerContext(allEdges, self.noVerticesLayer1, self.mapper, self.dataset_type, self.cache_dir, self)
+        return self._cached(('sparsify', method, budget), build)
+
+    def node_degrees(self):
+        """Returns the degree in the whole layer of every node of node_index(), as an array."""
+        return self._cached(('node_degrees',), lambda: self._layer_values(lambda context: context.csr_graph().degree()))
+
+    def node_neighbor_counts(self):
+        """Returns the number of neighbors in the whole layer of every node of node_index(), as an array."""
+        return self._cached(('node_neighbor_counts',), lambda: self._layer_values(lambda context: context.csr_graph().neighbor_counts()))
+
+    def _layer_values(self, compute):
+        """Returns compute(context of the whole layer), a value per node, in node_index() order."""
+        if self.full is None:
+            return compute(self)
+        full_nodes = self.full.node_index()[0]
+        sorter = np.argsort(full_nodes)
+        # every drawn node is a node of the whole layer, sparsification only drops edges
+        return compute(self.full)[sorter[np.searchsorted(full_nodes, self.node_index()[0], sorter=sorter)]]
+
+    def graph_digest(self):
+        """Returns a digest of the contents of graph(): the vertex count, the edges and their weights."""
+        return self._cached(('graph_digest',), lambda: array_digest(list(self.allEdges), extra=f"net|{self.noVerticesLayer1}"))
+
+    def node_index(self):
+        """
+        Returns the nodes of graph() as arrays, for the array based algorithms.
+
+        Returns:
+            tuple: (nodes, rows, cols) where 'nodes' holds the node ids in the order of graph().nodes()
+                   and 'rows'/'cols' hold the positions of each edge's endpoints in 'nodes'.
+        """
+        def build():
+            src, dst = np.asarray(self.allEdges.src), np.asarray(self.allEdges.dst)
+            # same order as graph(): 0..noVerticesLayer1-1 first, then endpoints in order of appearance
+            ids = np.concatenate([np.arange(self.noVerticesLayer1), np.column_stack([src, dst]).ravel()])
+            unique_ids, first_seen = np.unique(ids, return_index=True)
+            nodes = unique_ids[np.argsort(first_seen)]
+            sorter = np.argsort(nodes)
+            rows = sorter[np.searchsorted(nodes, src, sorter=sorter)]
+            cols = sorter[np.searchsorted(nodes, dst, sorter=sorter)]
+            return nodes, rows, cols
+        return self._cached(('node_index',), build)
+
+    def edge_index(self):
+        """
+        Returns the edges of graph() as arrays, for the vectorized renderers.
+
+        Like graph(), an undirected pair of nodes holds a single edge: for repeated pairs (in
+        either direction) the weight of the last occurrence in the file is kept.
+
+        Returns:
+            tuple: (rows, cols, weights) where 'rows'/'cols' are positions in node_index()[0]
+                   and the edges are kept in file order.
+        """
+        def build():
+            rows, cols = self.node_index()[1:]
+            weights = np.asarray(self.allEdges.weight)
+            low, high = np.minimum(rows, cols), np.maximum(rows, cols)
+            # sort by pair and file position, the last entry of every pair wins
+            order = np.lexsort((np.arange(len(low)), high, low))
+            last = np.ones(len(order), dtype=bool)
+            last[:-1] = (low[order][1:] != low[order][:-1]) | (high[order][1:] != high[order][:-1])
+            keep = np.sort(order[last])
+            return rows[keep], cols[keep], weights[keep]
+        return self._cached(('edge_index',), build)
+
+    def layout(self, preferred="spring", scale=1, center=None, algorithm="auto", iterations=None, seed=LAYOUT_SEED):
+        """
+        Returns node positions of graph().
+
+        The algorithm is chosen by graph size (see vizLayout.choose_layout): small graphs get the
+        renderer's 'preferred' networkx layout, larger ones the scalable approximations. The layout
+        is always computed on the full graph at unit scale, memoized and (when the context has a
+        cache folder) stored on disk keyed by the graph contents, the algorithm, the iteration
+        count and the seed. Every renderer asking for the same layout therefore gets the same
+        positions, only rescaled, and a later render of the layer skips the layout entirely.
+
+        Parameters:
+            preferred (str): The algorithm used for small graphs, 'spring' or 'kamada_kawai'.
+            scale (float): Scale factor of the positions, as in the networkx layouts.
+            center (tuple, optional): Center of the layout, defaults to (0, 0).
+            algorithm (str): 'auto' to choose by size, or a fixed vizLayout algorithm name.
+            iterations (int, optional): The iteration count, see vizLayout.DEFAULT_ITERATIONS.
+            seed (int): The random seed of the layout.
+
+        Returns:
+            dict: Mapping of node to an (x, y) position array.
+        """
+        positions = self.positions(preferred, scale, center, algorithm, iterations, seed)
+        return dict(zip(self.node_index()[0].tolist(), positions))
+
+    def positions(self, preferred="spring", scale=1, center=None, algorithm="auto", iterations=None, seed=LAYOUT_SEED):
+        """
+        Returns the positions of layout() as an array, for the array based renderers.
+
+        Returns:
+            numpy.ndarray: An (n, 2) array, row i holds the position of node_index()[0][i].
+        """
+        nodes = self.node_index()[0]
+        if algorithm == "auto":
+            algorithm = choose_layout(len(nodes), preferred)
+        if iterations is None:
+            iterations = DEFAULT_ITERATIONS.get(algorithm)
+        positions = self._cached(('layout', algorithm, iterations, seed), lambda: self._unit_layout(algorithm, iterations, seed))
+        positions = positions * scale
+        if center is not None:
+            positions = positions + np.asarray(center, dtype=float)
+        return positions
+
+    def _unit_layout(self, algorithm, iterations, seed):
+        """Loads or computes the unit scale layout of graph(), returning the positions in node_index() order."""
+        nodes, rows, cols = self.node_index()
+        key = layout_key(self.graph_digest(), algorithm, {'iterations': iterations}, seed)
+        if self.cache_dir is not None:
+            stored = load_layout(self.cache_dir, key)
+            if stored is not None and np.array_equal(stored[0], nodes):
+                return stored[1]
+        positions = compute_layout(algorithm, len(nodes), rows, cols, self.allEdges.weight, seed, iterations, graph_factory=self.graph)
+        if self.cache_dir is not None:
+            save_layout(self.cache_dir, key, nodes, positions)
+        return positions
+
+class CommunityLayer(Mapping):
+    """
+    Compact, lazily expanded state of one '.ecom' or '.vcom' layer.
+
+    The community allocation is kept in CSR form: 'community_ids' holds the community ids in
+    order of first appearance, and the members of the i-th community are
+    members[offsets[i]:offsets[i+1]], in file order (vertex ids for '.vcom' layers, (v1, v2)
+    rows for '.ecom' layers). The networkx graph is only built when a renderer asks for it
+    (see graph), so the charts never pay for it.
+
+    A CommunityLayer is the 'data' dictionary of the community renderers: it maps the header
+    values ('Layer', 'NumVertices', 'NumCommunities', ...) as parsed, 'CommunityStats' to the
+    per-community statistics (see vizCommunityStats) and 'Communities' to the allocation as a
+    dict of lists, which is expanded on every access and only meant for code written against
+    the old dict.
+    """
+
+    __slots__ = ('header', 'extension', 'community_ids', 'offsets', 'members', 'input_file', 'cache_dir',
+                 '_arrays', '_graph', '_graph_factory', '_stats')
+
+    def __init__(self, header, extension, arrays, input_file=None, cache_dir=None, graph_factory=None):
+        """
+        Parameters:
+            header (dict): The header of the parsed layer.
+            extension (str): '.ecom' or '.vcom'.
+            arrays (dict): The arrays of the parsed layer (see vizParser.parse_layer_file), they
+                           are kept (memory-mapped when they come from the layer cache) to
+                           build the graph in file order.
+            input_file (str, optional): The path to the layer file, keys the cached statistics.
+            cache_dir (str, optional): The cache folder (see vizCache.cache_dir_for).
+            graph_factory (callable, optional): Builds the graph instead of the layer's arrays,
+                                                e.g. for the subgraph of one community.
+        """
+        self.header = dict(header)
+        self.extension = extension
+        self.input_file = input_file
+        self.cache_dir = cache_dir
+        self._arrays = arrays
+        self._graph = None
+        self._graph_factory = graph_factory
+        self._stats = None
+        community = np.asarray(arrays['community'])
+        self.community_ids, index = community_index(community)
+        order = np.argsort(index, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(index, minlength=len(self.community_ids)))]).astype(np.int64)
+        if extension == '.ecom':
+            self.members = np.column_stack([np.asarray(arrays['src'])[order], np.asarray(arrays['dst'])[order]])
+        else:
+            self.members = np.asarray(arrays['vertex'])[order]
+
+    def __getitem__(self, key):
+        if key in self.header:
+            return self.header[key]
+        if key == 'CommunityStats':
+            return self.stats()
+        if key == 'Communities':
+            return self.communities()
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.header
+        yield 'Communities'
+        yield 'CommunityStats'
+
+    def __len__(self):
+        return len(self.header) + 2
+
+    def members_of(self, position):
+        """Returns the members of the community at 'position' in community_ids (a view of 'members')."""
+        return self.members[self.offsets[position]:self.offsets[position + 1]]
+
+    def communities(self):
+        """Expands the allocation into the dict of lists the layer used to be loaded as: {commID: [vid, ...]} or {commID: [(v1id, v2id), ...]}."""
+        members = self.members.tolist()
+        if self.extension == '.ecom':
+            members = [tuple(pair) for pair in members]
+        bounds = self.offsets.tolist()
+        return {community: members[bounds[i]:bounds[i + 1]] for i, community in enumerate(self.community_ids.tolist())}
+
+    def stats(self):
+        """Returns the per-community statistics (see vizCommunityStats.cached_community_stats), computed once."""
+        if self._stats is None:
+            self._stats = cached_community_stats(self.extension, self._arrays, self.input_file, self.cache_dir)
+        return self._stats
+
+    def num_nodes(self):
+        """Returns the number of nodes of graph() without building it."""
+        if self.extension != '.ecom':
+            return 0
+        return len(np.unique(self.members)) if self._graph_factory is None else self.graph().number_of_nodes()
+
+    def graph(self):
+        """
+        Returns the networkx graph of the layer, built on first use.
+
+        For '.ecom' layers it holds every allocated edge, its nodes in order of first appearance
+        in the file, and the 'community' attribute of every node is the community of the last
+        edge allocated to it. '.vcom' layers have no edges, their graph is empty.
+
+        Returns:
+            networkx.Graph: The shared graph, it must not be modified.
+        """
+        if self._graph is None:
+            if self._graph_factory is not None:
+                self._graph = self._graph_factory()
+            else:
+                self._graph = self._build_graph()
+        return self._graph
+
+    def _build_graph(self):
+        G = nx.Graph()
+        if self.extension != '.ecom':
+            return G
+        src, dst = np.asarray(self._arrays['src']), np.asarray(self._arrays['dst'])
+        community = np.asarray(self._arrays['community'])
+        # endpoints in file order (v1, v2, v1, v2, ...), the node order of the graph
+        endpoints = np.column_stack([src, dst]).ravel()
+        _, first_seen = np.unique(endpoints, return_index=True)
+        nodes = endpoints[np.sort(first_seen)]
+        # the last allocated edge of a node sets its community
+        _, last_seen = np.unique(endpoints[::-1], return_index=True)
+        sorter = np.argsort(nodes)
+        node_community = np.empty(len(nodes), dtype=np.int64)
+        node_community[sorter] = np.repeat(community, 2)[::-1][last_seen]
+        G.add_nodes_from((node, {'community': commID}) for node, commID in zip(nodes.tolist(), node_community.tolist()))
+        G.add_edges_from(zip(src.tolist(), dst.tolist()))
+        return G
+
+    def subset(self, nodes, **header):
+        """
+        Returns the layer restricted to 'nodes': its graph is the subgraph of graph() induced by
+        them and 'header' replaces header values (e.g. 'Layer'). The allocation is kept.
+        """
+        # shares the allocation arrays and statistics instead of rebuilding them
+        layer = object.__new__(CommunityLayer)
+        for name in CommunityLayer.__slots__:
+            setattr(layer, name, getattr(self, name))
+        layer.header = dict(self.header, **header)
+        layer._graph = None
+        layer._graph_factory = lambda: self.graph().subgraph(nodes).copy()
+        return layer
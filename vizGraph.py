@@ -0,0 +1,85 @@
+import numpy as np
+import scipy.sparse as sp
+
+"""
+    Sparse (CSR) graph core of the '.net' renderers.
+
+    Degrees, weighted degrees, degree centrality and neighbor lists are computed as vectorized
+    operations on a scipy.sparse CSR adjacency matrix built directly from the parsed edge
+    arrays, instead of from a networkx graph. The values follow the networkx conventions, so
+    the views show the same numbers as before: a self-loop adds 2 to the degree of its node
+    (and twice its weight to the weighted degree) but lists the node only once among its
+    neighbors. networkx is only needed for the algorithms it implements (community detection,
+    the spring and Kamada-Kawai layouts), see LayerContext.graph.
+"""
+
+class CSRGraph:
+    """
+    Read-only undirected graph whose nodes are the positions 0..n-1 of a node id array.
+
+    The symmetric adjacency matrix holds every edge in both directions (self-loops once, on
+    the diagonal) with its weight, so row i lists the neighbors of the i-th node.
+    """
+
+    __slots__ = ('nodes', 'adjacency', '_self_loops', '_loop_weights')
+
+    def __init__(self, nodes, rows, cols, weights=None):
+        """
+        Parameters:
+            nodes (numpy.ndarray): The node ids, the graph's node i is nodes[i].
+            rows (numpy.ndarray): The position of each edge's first endpoint in 'nodes'.
+            cols (numpy.ndarray): The position of each edge's second endpoint in 'nodes'.
+                                  Every undirected pair must occur once (see LayerContext.edge_index).
+            weights (numpy.ndarray, optional): The weight of each edge, 1 by default.
+        """
+        n = len(nodes)
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        weights = np.ones(len(rows)) if weights is None else np.asarray(weights, dtype=np.float64)
+        loop = rows == cols
+        self.nodes = nodes
+        self.adjacency = sp.csr_array(
+            (np.concatenate([weights, weights[~loop]]), (np.concatenate([rows, cols[~loop]]), np.concatenate([cols, rows[~loop]]))),
+            shape=(n, n))
+        self.adjacency.sort_indices()
+        self._self_loops = np.bincount(rows[loop], minlength=n)
+        self._loop_weights = np.bincount(rows[loop], weights=weights[loop], minlength=n)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def neighbor_counts(self):
+        """Returns the number of distinct neighbors of every node (a node with a self-loop is its own neighbor)."""
+        return np.diff(self.adjacency.indptr)
+
+    def degree(self):
+        """Returns the degree of every node, as networkx.Graph.degree."""
+        return self.neighbor_counts() + self._self_loops
+
+    def weighted_degree(self):
+        """Returns the sum of the weights of the edges of every node, as networkx.Graph.degree(weight='weight')."""
+        return np.asarray(self.adjacency.sum(axis=1)).ravel() + self._loop_weights
+
+    def degree_centrality(self):
+        """Returns the degree centrality of every node, its degree divided by n - 1, as networkx.degree_centrality."""
+        n = len(self.nodes)
+        return self.degree() * (1.0 / (n - 1) if n > 1 else 1.0)
+
+    def neighbors(self, position, limit=None):
+        """
+        Returns the positions of the neighbors of the node at 'position', in increasing order.
+
+        Parameters:
+            position (int): The position of the node.
+            limit (int, optional): Return at most this many neighbors.
+
+        Returns:
+            numpy.ndarray: A view of the CSR column indices.
+        """
+        start, end = self.adjacency.indptr[position], self.adjacency.indptr[position + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.adjacency.indices[start:end]
+
+    def neighbor_lists(self, limit=None):
+        """Returns the neighbor positions of every node as a list of arrays, at most 'limit' per node (see neighbors)."""
+        return [self.neighbors(position, limit) for position in range(len(self.nodes))]
@@ -0,0 +1,225 @@
+import numpy as np
+import scipy.sparse as sp
+
+"""
+    Layout engine of the network visualizations.
+
+    The algorithm is picked by graph size (see choose_layout):
+    - small graphs keep the networkx layouts the renderers always used (Kamada-Kawai for plotly,
+      Fruchterman-Reingold 'spring' for the others), both need O(n^2) memory or time per iteration;
+    - medium and large graphs use 'grid_force', a Barnes-Hut style approximation of the spring
+      layout: repulsion is exact between nodes of the same grid cell and approximated by the
+      cell centroids otherwise, attraction runs over the sparse edge list. It starts from the
+      spectral layout below, so few iterations are needed;
+    - huge graphs use 'spectral' only: degree-normalized eigenvectors of the sparse adjacency
+      matrix computed by power iteration, O(edges) per iteration.
+"""
+
+# Largest graph (in nodes) laid out with networkx' Kamada-Kawai layout when a renderer prefers it.
+KAMADA_KAWAI_MAX_NODES = 1000
+# Largest graph laid out with networkx' exact spring layout.
+SPRING_MAX_NODES = 3000
+# Largest graph laid out with the approximated force-directed layout, bigger graphs only get the spectral layout.
+GRID_FORCE_MAX_NODES = 200000
+
+# Default iteration counts of each algorithm, all of them can be overridden per call.
+DEFAULT_ITERATIONS = {
+    'kamada_kawai': None,  # networkx iterates until convergence
+    'spring': 50,
+    'grid_force': 40,
+    'spectral': 150,
+}
+
+def choose_layout(num_nodes, preferred="spring"):
+    """
+    Picks the layout algorithm for a graph of the given size.
+
+    Parameters:
+        num_nodes (int): The number of nodes of the graph.
+        preferred (str): The algorithm the renderer uses for small graphs, 'spring' or 'kamada_kawai'.
+
+    Returns:
+        str: 'kamada_kawai', 'spring', 'grid_force' or 'spectral'.
+    """
+    if preferred == 'kamada_kawai' and num_nodes <= KAMADA_KAWAI_MAX_NODES:
+        return 'kamada_kawai'
+    if num_nodes <= SPRING_MAX_NODES:
+        return 'spring'
+    if num_nodes <= GRID_FORCE_MAX_NODES:
+        return 'grid_force'
+    return 'spectral'
+
+def compute_layout(algorithm, num_nodes, rows, cols, weights, seed, iterations=None, graph_factory=None):
+    """
+    Computes a layout with unit scale (positions in [-1, 1], centered on the origin).
+
+    Parameters:
+        algorithm (str): 'kamada_kawai', 'spring', 'grid_force' or 'spectral'.
+        num_nodes (int): The number of nodes, nodes are identified by their index 0..num_nodes-1.
+        rows, cols (numpy.ndarray): Node indices of the edge endpoints.
+        weights (numpy.ndarray): The edge weights.
+        seed (int): The random seed.
+        iterations (int, optional): The number of iterations, see DEFAULT_ITERATIONS.
+        graph_factory (callable, optional): Returns the networkx graph whose node order matches
+                                            the node indices, needed by the networkx algorithms.
+
+    Returns:
+        numpy.ndarray: A (num_nodes, 2) array of positions.
+    """
+    if iterations is None:
+        iterations = DEFAULT_ITERATIONS.get(algorithm)
+    if num_nodes == 0:
+        return np.zeros((0, 2))
+    if algorithm in ('spring', 'kamada_kawai'):
+        import networkx as nx
+        G = graph_factory()
+        if algorithm == 'spring':
+            pos = nx.spring_layout(G, seed=seed, iterations=iterations)
+        else:
+            pos = nx.kamada_kawai_layout(G)
+        return np.array([pos[node] for node in G.nodes()], dtype=float).reshape(-1, 2)
+    adjacency = _adjacency(num_nodes, rows, cols, weights)
+    if algorithm == 'spectral':
+        return _rescale(spectral_layout(adjacency, seed, iterations))
+    if algorithm == 'grid_force':
+        initial = spectral_layout(adjacency, seed, DEFAULT_ITERATIONS['spectral'])
+        return _rescale(grid_force_layout(adjacency, initial, seed, iterations))
+    raise ValueError(f"Unknown layout algorithm: {algorithm}")
+
+def spectral_layout(adjacency, seed, iterations):
+    """
+    Computes a 2D spectral layout from a sparse symmetric adjacency matrix.
+
+    The two leading non-trivial degree-normalized eigenvectors are obtained by power iteration
+    on 1/2 (I + D^-1 A) with D-orthogonalization (Koren, "Drawing graphs by eigenvectors"), so the
+    cost is O(edges) per iteration and no dense matrix is ever built. Isolated nodes are spread
+    by a small random jitter instead of all sitting on the origin.
+
+    Parameters:
+        adjacency (scipy.sparse.csr_array): The symmetric weighted adjacency matrix.
+        seed (int): The random seed of the starting vectors.
+        iterations (int): The number of power iterations.
+
+    Returns:
+        numpy.ndarray: A (n, 2) array of positions (not rescaled).
+    """
+    n = adjacency.shape[0]
+    rng = np.random.default_rng(seed)
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    degree[degree == 0] = 1.0
+    # the trivial eigenvector of D^-1 A is the constant vector
+    vectors = [np.ones(n) / np.sqrt(degree.sum())]
+    for _ in range(2):
+        x = rng.standard_normal(n)
+        for _ in range(iterations):
+            for u in vectors:  # D-orthogonalize against the previous eigenvectors
+                x -= (x @ (degree * u)) * u
+            x = 0.5 * (x + (adjacency @ x) / degree)
+            norm = np.sqrt(x @ (degree * x))
+            if norm == 0:
+                break
+            x /= norm
+        vectors.append(x)
+    positions = np.column_stack(vectors[1:])
+    spread = np.abs(positions).max() or 1.0
+    return positions + rng.normal(scale=spread * 1e-3, size=positions.shape)
+
+def grid_force_layout(adjacency, initial, seed, iterations, nodes_per_cell=16, max_cells=1024, chunk_size=4096):
+    """
+    Refines a layout with a Fruchterman-Reingold force simulation in O(n * cells + edges) per iteration.
+
+    The layout area is divided into a grid. Nodes of the same cell repel each other exactly, for
+    every other cell the repulsion is computed from the cell's centroid weighted by the number of
+    nodes in it (the Barnes-Hut idea with a single level). Attraction is computed over the edges.
+
+    Parameters:
+        adjacency (scipy.sparse.csr_array): The symmetric weighted adjacency matrix.
+        initial (numpy.ndarray): The (n, 2) starting positions.
+        seed (int): The random seed (used to separate nodes sharing a position).
+        iterations (int): The number of iterations.
+        nodes_per_cell (int): The targeted average number of nodes per grid cell.
+        max_cells (int): The upper bound on the number of grid cells.
+        chunk_size (int): The number of nodes processed at once, bounds the memory use.
+
+    Returns:
+        numpy.ndarray: A (n, 2) array of positions (not rescaled).
+    """
+    n = initial.shape[0]
+    rng = np.random.default_rng(seed)
+    pos = _rescale(initial) * 0.5 + 0.5  # unit square
+    pos += rng.uniform(-1e-4, 1e-4, size=pos.shape)
+    k = np.sqrt(1.0 / n)  # optimal distance between nodes
+    k2 = k * k
+    coo = adjacency.tocoo()
+    rows, cols, weights = coo.row, coo.col, coo.data
+    side = int(max(1, min(np.sqrt(max_cells), np.sqrt(n / nodes_per_cell))))
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        displacement = np.zeros_like(pos)
+
+        # grid cells, their populations and centroids
+        low = pos.min(axis=0)
+        span = np.maximum(pos.max(axis=0) - low, 1e-9)
+        cell_xy = np.minimum((((pos - low) / span) * side).astype(np.int64), side - 1)
+        cell = cell_xy[:, 0] * side + cell_xy[:, 1]
+        counts = np.bincount(cell, minlength=side * side).astype(float)
+        occupied = np.flatnonzero(counts)
+        centroids = np.column_stack([
+            np.bincount(cell, weights=pos[:, 0], minlength=side * side)[occupied],
+            np.bincount(cell, weights=pos[:, 1], minlength=side * side)[occupied],
+        ]) / counts[occupied, None]
+        masses = counts[occupied]
+        own_cell = np.searchsorted(occupied, cell)
+
+        # far field: repulsion from every other cell's centroid (in float32, it is the bulk of the work)
+        centroid_x, centroid_y = centroids[:, 0].astype(np.float32), centroids[:, 1].astype(np.float32)
+        masses = (k2 * masses).astype(np.float32)
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            dx = pos[start:stop, 0, None].astype(np.float32) - centroid_x
+            dy = pos[start:stop, 1, None].astype(np.float32) - centroid_y
+            force = masses / np.maximum(dx * dx + dy * dy, np.float32(1e-12))
+            force[np.arange(stop - start), own_cell[start:stop]] = 0.0
+            displacement[start:stop, 0] += np.einsum('ij,ij->i', dx, force)
+            displacement[start:stop, 1] += np.einsum('ij,ij->i', dy, force)
+
+        # near field: exact repulsion between nodes of the same cell
+        order = np.argsort(cell, kind='stable')
+        sorted_cell = cell[order]
+        for offset in range(1, int(min(counts.max(), 4 * nodes_per_cell))):
+            same = np.flatnonzero(sorted_cell[:-offset] == sorted_cell[offset:])
+            if same.size == 0:
+                break
+            a, b = order[same], order[same + offset]
+            delta = pos[a] - pos[b]
+            force = (k2 / np.maximum((delta * delta).sum(axis=1), 1e-12))[:, None] * delta
+            for axis in range(2):
+                displacement[:, axis] += np.bincount(a, weights=force[:, axis], minlength=n) - np.bincount(b, weights=force[:, axis], minlength=n)
+
+        # attraction along the edges (every undirected edge appears in both directions)
+        delta = pos[rows] - pos[cols]
+        distance = np.sqrt((delta * delta).sum(axis=1))
+        attraction = (weights * distance / k)[:, None] * delta
+        displacement[:, 0] -= np.bincount(rows, weights=attraction[:, 0], minlength=n)
+        displacement[:, 1] -= np.bincount(rows, weights=attraction[:, 1], minlength=n)
+
+        # move every node at most 'temperature' along its displacement
+        length = np.maximum(np.sqrt((displacement * displacement).sum(axis=1)), 1e-12)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    return pos
+
+def _adjacency(num_nodes, rows, cols, weights):
+    """Builds the symmetric sparse adjacency matrix of an edge list, without self-loops."""
+    keep = rows != cols
+    rows, cols, weights = rows[keep], cols[keep], np.abs(np.asarray(weights, dtype=float)[keep])
+    adjacency = sp.coo_array((weights, (rows, cols)), shape=(num_nodes, num_nodes)).tocsr()
+    return (adjacency + adjacency.T).tocsr()
+
+def _rescale(positions):
+    """Centers positions on the origin and scales them into [-1, 1], like networkx' rescale_layout."""
+    positions = positions - positions.mean(axis=0)
+    extent = np.abs(positions).max()
+    return positions / extent if extent > 0 else positions
@@ -0,0 +1,578 @@
+import os
+import csv
+import sqlite3
+import pathlib
+from contextlib import closing
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+from vizUTILS import create_urls
+
+"""
+    Columnar node mappings ('.map' files).
+
+    A '.map' file has a header line followed by one "node id,label" line per node. The label is
+    free text (movie titles, author lists, ...) or, for geographic layers, "lat,long,label". Rarer
+    layouts hold the longitude and latitude in two columns, or "x,lon,lat" in the second column
+    of a longer row (see vizCaller.create_mapper).
+
+    parse_mapping_file reads a file with pandas' C parser into flat arrays: the node ids, the
+    labels as one UTF-8 buffer with offsets and typed latitude/longitude columns. vizCache stores
+    these arrays (see vizCache.load_mapping) and NodeMapping serves them, both as the read-only
+    dict of node id strings the renderers always received and through vectorized lookups by
+    integer node id.
+
+    For very large files, of which a view only draws a small part, the 'sqlite' backend imports
+    the file once into an indexed SQLite database (see build_mapping_database and
+    vizCache.load_mapping_database). SqliteNodeMapping offers the same interface and fetches the
+    labels of the drawn nodes in batches, so its memory use does not grow with the file.
+"""
+
+# Version of the arrays produced by parse_mapping_file, bump it when they change so cached mappings are rebuilt.
+MAPPING_VERSION = 2
+# Version of the database layout written by build_mapping_database.
+MAPPING_DATABASE_VERSION = 1
+
+# Mapping backends: 'arrays' loads the whole file (NodeMapping), 'sqlite' queries an indexed database (SqliteNodeMapping).
+MAPPING_BACKENDS = ('arrays', 'sqlite')
+# Backend used by vizCaller.create_mapper, 'auto' picks 'sqlite' for files of at least SQLITE_MIN_FILE_SIZE bytes.
+DEFAULT_BACKEND = 'auto'
+SQLITE_MIN_FILE_SIZE = 256 * 1024 * 1024
+# Number of node ids per query of SqliteNodeMapping (below the 999 parameters older SQLite builds allow).
+SQLITE_BATCH_SIZE = 500
+# Number of rows inserted per statement by build_mapping_database.
+SQLITE_IMPORT_BATCH_SIZE = 50000
+
+def choose_backend(mapping_file_path, backend="auto"):
+    """
+    Resolves the mapping backend of a '.map' file.
+
+    Parameters:
+        mapping_file_path (str): The path to the '.map' file.
+        backend (str): 'auto' or one of MAPPING_BACKENDS.
+
+    Returns:
+        str: One of MAPPING_BACKENDS.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "auto":
+        return 'sqlite' if os.path.getsize(mapping_file_path) >= SQLITE_MIN_FILE_SIZE else 'arrays'
+    if backend not in MAPPING_BACKENDS:
+        raise ValueError(f"Unknown mapping backend: {backend}")
+    return backend
+
+def parse_mapping_file(mapping_file_path):
+    """
+    Parses a '.map' file into a header and flat arrays.
+
+    Parameters:
+        mapping_file_path (str): The path to the '.map' file.
+
+    Returns:
+        tuple: (header, arrays) where 'header' holds 'kind' ('labels' when the values are label
+               strings, 'coordinates' when they are (longitude, latitude) tuples) and 'arrays'
+               holds 'key_bytes'/'key_offsets' (the node id strings), 'node_id' (int64 ids, -1
+               for non numeric ids), 'label_bytes'/'label_offsets' (the label strings, empty for
+               'coordinates'), 'latitude' and 'longitude' (NaN where unknown).
+    """
+    try:
+        table = pd.read_csv(mapping_file_path, header=None, skiprows=1, dtype=str, keep_default_na=False, skipinitialspace=False)
+    except pd.errors.EmptyDataError:
+        table = pd.DataFrame(columns=[0, 1])
+    except pd.errors.ParserError:
+        # rows with different numbers of columns, pad them to the widest one
+        with open(mapping_file_path, "r", newline='') as csvfile:
+            rows = list(csv.reader(csvfile))[1:]
+        width = max((len(row) for row in rows), default=2)
+        table = pd.DataFrame([row + [''] * (width - len(row)) for row in rows if len(row) > 1], columns=range(width), dtype=str)
+    else:
+        if table.shape[1] > 1 and (table[table.shape[1] - 1] == '').any():
+            # a line holding only a node id reads like one with an empty last field, the dict parser skipped it
+            table = table[_row_widths(mapping_file_path) > 1].reset_index(drop=True)
+
+    num_columns = table.shape[1]
+    if num_columns > 3:
+        # only rows whose second column holds "x,longitude,latitude" are mapped
+        table = table[table[1].str.count(',') == 2]
+    # a node listed twice keeps its last line, like the dict it replaces
+    keys = pd.Series([key.strip() for key in table[0].tolist()], dtype=object)
+    unique = ~keys.duplicated(keep='last').to_numpy()
+    table, keys = table[unique].reset_index(drop=True), keys[unique].reset_index(drop=True)
+    if num_columns == 2:
+        # "id,label": the label may itself be "lat,long,label" (geographic layers)
+        kind = 'labels'
+        labels = pd.Series([label.strip() for label in table[1].tolist()], dtype=object)
+        latitude, longitude = _label_coordinates(labels)
+    elif num_columns == 3:
+        # "id,longitude,latitude"
+        kind = 'coordinates'
+        labels = pd.Series([''] * len(table), dtype=object)
+        longitude = pd.to_numeric(table[1].str.strip())
+        latitude = pd.to_numeric(table[2].str.strip())
+    else:
+        # longer rows holding "x,longitude,latitude" in the second column
+        kind = 'coordinates'
+        labels = pd.Series([''] * len(table), dtype=object)
+        parts = table[1].str.split(',', expand=True).reindex(columns=[0, 1, 2])
+        longitude = pd.to_numeric(parts[1])
+        latitude = pd.to_numeric(parts[2])
+
+    key_bytes, key_offsets = _pack_strings(keys.tolist())
+    label_bytes, label_offsets = _pack_strings(labels.tolist())
+    arrays = {
+        'key_bytes': key_bytes,
+        'key_offsets': key_offsets,
+        'node_id': _node_ids(keys),
+        'label_bytes': label_bytes,
+        'label_offsets': label_offsets,
+        'latitude': latitude.to_numpy(dtype=float),
+        'longitude': longitude.to_numpy(dtype=float),
+    }
+    return {'kind': kind}, arrays
+
+def _pack_strings(strings):
+    """Packs strings into one UTF-8 byte array and the offsets of each string (len(strings) + 1 entries)."""
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    joined = "\0".join(strings)
+    if joined.count("\0") == max(len(strings) - 1, 0):
+        # encode everything at once and find the string boundaries from the separators
+        buffer = np.frombuffer(joined.encode('utf-8'), dtype=np.uint8)
+        separators = np.flatnonzero(buffer == 0)
+        offsets[1:-1] = separators - np.arange(len(separators))
+        offsets[-1] = len(buffer) - len(separators)
+        return buffer[buffer != 0], offsets
+    # strings holding NUL characters themselves
+    encoded = [value.encode('utf-8') for value in strings]
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+# First characters of a label that may start with "lat,long".
+_NUMBER_START = frozenset('-+.0123456789')
+
+def _row_widths(mapping_file_path):
+    """Returns the number of fields of every line after the header, without the blank lines pandas skips."""
+    with open(mapping_file_path, "r", newline='') as csvfile:
+        rows = list(csv.reader(csvfile))[1:]
+    return np.array([len(row) for row in rows if len(row) > 1 or (row and row[0].strip())], dtype=np.int64)
+
+def _label_coordinates(labels):
+    """Reads the "lat,long" prefix of label strings into two float Series, NaN where the label has none."""
+    latitude = pd.Series(np.nan, index=labels.index)
+    longitude = pd.Series(np.nan, index=labels.index)
+    # only labels starting like a number are split (free text labels such as author lists are skipped)
+    candidates = labels[[label[:1] in _NUMBER_START for label in labels.tolist()]]
+    if len(candidates):
+        parts = candidates.str.split(',', n=2, expand=True).reindex(columns=[0, 1])
+        latitude[candidates.index] = pd.to_numeric(parts[0], errors='coerce')
+        longitude[candidates.index] = pd.to_numeric(parts[1], errors='coerce')
+    return latitude, longitude
+
+def _node_ids(keys):
+    """Converts node id strings to int64 ids, -1 for keys that are not the canonical form of an integer (e.g. '007')."""
+    numeric = pd.to_numeric(keys, errors='coerce').to_numpy(dtype=float)
+    ids = np.where(np.isfinite(numeric), numeric, -1).astype(np.int64)
+    # '007' or '7.0' parse as numbers too, but would not match str(node) in the dict this replaces
+    canonical = ids.astype(str) == np.asarray(keys.tolist(), dtype=str)
+    return np.where(canonical, ids, -1)
+
+def _empty_arrays():
+    """Returns the arrays of an empty mapping."""
+    empty_bytes, empty_offsets = _pack_strings([])
+    return {'key_bytes': empty_bytes, 'key_offsets': empty_offsets, 'node_id': np.zeros(0, dtype=np.int64),
+            'label_bytes': empty_bytes, 'label_offsets': empty_offsets,
+            'latitude': np.zeros(0), 'longitude': np.zeros(0)}
+
+class NodeMapping(Mapping):
+    """
+    Read-only mapping of node id strings to labels, backed by the arrays of parse_mapping_file.
+
+    It behaves like the dict create_mapper used to return (mapper.get(str(node)) still works),
+    and adds vectorized lookups by integer node id for the renderers: labels(), positions() and
+    the typed 'latitude' and 'longitude' columns.
+    """
+
+    def __init__(self, header=None, arrays=None):
+        """
+        Parameters:
+            header (dict, optional): The header returned by parse_mapping_file, None for an empty mapping.
+            arrays (dict, optional): The arrays returned by parse_mapping_file (possibly memory-mapped).
+        """
+        if header is None:
+            header, arrays = {'kind': 'labels'}, _empty_arrays()
+        self.kind = header['kind']
+        self._arrays = arrays
+        self.node_id = np.asarray(arrays['node_id'])
+        self.latitude = np.asarray(arrays['latitude'])
+        self.longitude = np.asarray(arrays['longitude'])
+        self._sorter = np.argsort(self.node_id, kind='stable')
+        self._index = None
+        self._buffers = {}
+        self._url_columns = {}
+
+    @classmethod
+    def from_dict(cls, mapper):
+        """Builds a NodeMapping from a plain dict of node id strings to label strings."""
+        keys = pd.Series([str(key) for key in mapper], dtype=object)
+        labels = pd.Series([str(value) for value in mapper.values()], dtype=object)
+        key_bytes, key_offsets = _pack_strings(keys.tolist())
+        label_bytes, label_offsets = _pack_strings(labels.tolist())
+        latitude, longitude = _label_coordinates(labels) if len(labels) else (pd.Series([], dtype=float), pd.Series([], dtype=float))
+        return cls({'kind': 'labels'}, {'key_bytes': key_bytes, 'key_offsets': key_offsets, 'node_id': _node_ids(keys),
+                                        'label_bytes': label_bytes, 'label_offsets': label_offsets,
+                                        'latitude': latitude.to_numpy(dtype=float), 'longitude': longitude.to_numpy(dtype=float)})
+
+    def _string(self, name, row):
+        if name not in self._buffers:
+            # one bytes copy of the buffer, slicing it is much cheaper than slicing the (memory-mapped) array
+            self._buffers[name] = (bytes(self._arrays[f'{name}_bytes']), self._arrays[f'{name}_offsets'].tolist())
+        buffer, offsets = self._buffers[name]
+        return buffer[offsets[row]:offsets[row + 1]].decode('utf-8')
+
+    def keys_at(self, rows):
+        """Returns the node id strings of the given rows."""
+        return [self._string('key', row) for row in np.asarray(rows).tolist()]
+
+    def values_at(self, rows):
+        """Returns the mapped values (see value) of the given rows."""
+        return [self.value(row) for row in np.asarray(rows).tolist()]
+
+    def value(self, row):
+        """Returns the mapped value of a row: the label string, or a (longitude, latitude) tuple for 'coordinates'."""
+        if self.kind == 'coordinates':
+            return (float(self.longitude[row]), float(self.latitude[row]))
+        return self._string('label', row)
+
+    def positions(self, nodes):
+        """
+        Finds the rows of integer node ids.
+
+        Parameters:
+            nodes (array-like): Integer node ids.
+
+        Returns:
+            numpy.ndarray: The row of each node, -1 for nodes without a mapping.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if len(self.node_id) == 0:
+            return np.full(len(nodes), -1, dtype=np.int64)
+        found = np.searchsorted(self.node_id, nodes, sorter=self._sorter)
+        found = np.minimum(found, len(self.node_id) - 1)
+        rows = self._sorter[found]
+        return np.where((self.node_id[rows] == nodes) & (nodes >= 0), rows, -1)
+
+    def located(self):
+        """Returns (rows, latitude, longitude) of the rows that have coordinates, in row order."""
+        rows = np.flatnonzero(~np.isnan(self.latitude) & ~np.isnan(self.longitude))
+        return rows, self.latitude[rows], self.longitude[rows]
+
+    def labels(self, nodes, default="{}"):
+        """
+        Looks up the labels of integer node ids.
+
+        Parameters:
+            nodes (array-like): Integer node ids.
+            default (str): Format string of the label of an unmapped node, formatted with the node id.
+
+        Returns:
+            list: The label (see value) of each node.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return [self.value(row) if row >= 0 else default.format(node) for node, row in zip(nodes.tolist(), self.positions(nodes).tolist())]
+
+    def urls(self, nodes, dataset_type, default="{}"):
+        """
+        Looks up the tap tool URLs of integer node ids (see vizUTILS.create_urls).
+
+        The URLs of the rows that are not known yet are built in one pass and kept with the
+        mapping, so later views of the layer only index them.
+
+        Parameters:
+            nodes (array-like): Integer node ids.
+            dataset_type (str): The dataset type (see vizUTILS.determine_dataset_type).
+            default (str): Format string of the label of an unmapped node (see labels).
+
+        Returns:
+            list: The URL (or None) of each node.
+        """
+        if dataset_type not in self._url_columns:
+            # the URL of every row and whether it was built yet, the extra last entry is hit by the -1 of unmapped nodes
+            self._url_columns[dataset_type] = (np.full(len(self) + 1, None, dtype=object), np.zeros(len(self) + 1, dtype=bool))
+        column, built = self._url_columns[dataset_type]
+        nodes = np.asarray(nodes, dtype=np.int64)
+        rows = self.positions(nodes)
+        missing = np.unique(rows[(rows >= 0) & ~built[rows]])
+        if len(missing):
+            column[missing] = create_urls(self.values_at(missing), dataset_type)
+            built[missing] = True
+        urls = column[rows]
+        unmapped = np.flatnonzero(rows < 0)
+        if len(unmapped):
+            urls[unmapped] = create_urls([default.format(node) for node in nodes[unmapped].tolist()], dataset_type)
+        return urls.tolist()
+
+    # Mapping interface, keyed by node id strings -------------------------------------------------
+
+    def _key_index(self):
+        if self._index is None:
+            self._index = {self._string('key', row): row for row in range(len(self))}
+        return self._index
+
+    def __getitem__(self, key):
+        key = str(key)
+        # numeric ids go through the arrays, other keys through a lazily built index
+        if key.lstrip('-').isdigit() and str(int(key)) == key:
+            row = int(self.positions([int(key)])[0])
+        else:
+            row = self._key_index().get(key)
+        if row is None or row < 0:
+            raise KeyError(key)
+        return self.value(row)
+
+    def __iter__(self):
+        return (self._string('key', row) for row in range(len(self)))
+
+    def __len__(self):
+        return len(self.node_id)
+
+def build_mapping_database(mapping_file_path, database_path):
+    """
+    Imports a '.map' file into an indexed SQLite database, streaming it row by row.
+
+    The rows follow the rules of create_mapper line by line: "id,label" rows keep their label (and
+    the "lat,long" it may start with), "id,longitude,latitude" rows and longer rows holding
+    "x,longitude,latitude" in their second column keep their coordinates. A node listed twice
+    keeps its last line.
+
+    Parameters:
+        mapping_file_path (str): The path to the '.map' file.
+        database_path (str): The path of the database to create, it must not exist yet.
+    """
+    connection = sqlite3.connect(database_path)
+    try:
+        # a new file that is only renamed into place once complete, it needs no journal
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+        connection.execute("CREATE TABLE mapping (key TEXT PRIMARY KEY, row INTEGER, node_id INTEGER, label TEXT, latitude REAL, longitude REAL)")
+        kind = None
+        batch = []
+        with open(mapping_file_path, "r", newline='') as csvfile:
+            reader = csv.reader(csvfile)
+            next(reader, None)  # skip the header
+            for row_number, row in enumerate(reader):
+                if len(row) == 2:
+                    label = row[1].strip()
+                    latitude, longitude = _split_coordinates(label)
+                elif len(row) == 3:
+                    label, longitude, latitude = None, _to_float(row[1]), _to_float(row[2])
+                elif len(row) > 3 and row[1].count(',') == 2:
+                    parts = row[1].split(',')
+                    label, longitude, latitude = None, _to_float(parts[1]), _to_float(parts[2])
+                else:
+                    continue
+                if kind is None:
+                    kind = 'labels' if label is not None else 'coordinates'
+                key = row[0].strip()
+                batch.append((key, row_number, _node_id(key), label, latitude, longitude))
+                if len(batch) == SQLITE_IMPORT_BATCH_SIZE:
+                    connection.executemany("INSERT OR REPLACE INTO mapping VALUES (?, ?, ?, ?, ?, ?)", batch)
+                    batch = []
+        connection.executemany("INSERT OR REPLACE INTO mapping VALUES (?, ?, ?, ?, ?, ?)", batch)
+        connection.execute("CREATE INDEX mapping_node_id ON mapping (node_id)")
+        connection.execute("CREATE INDEX mapping_row ON mapping (row)")
+        connection.executemany("INSERT INTO meta VALUES (?, ?)", [('kind', kind or 'labels'), ('version', str(MAPPING_DATABASE_VERSION))])
+        connection.commit()
+    finally:
+        connection.close()
+
+def _split_coordinates(label):
+    """Reads the "lat,long" prefix of a label (see _label_coordinates), None where the label has none."""
+    if label[:1] not in _NUMBER_START:
+        return None, None
+    parts = label.split(',', 2)
+    return _to_float(parts[0]), _to_float(parts[1]) if len(parts) > 1 else None
+
+def _to_float(text):
+    """Converts a string to a float, None if it is not a number."""
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return None if np.isnan(value) else value
+
+def _node_id(key):
+    """Returns the integer node id of a key (see _node_ids), None for keys that are not the canonical form of an integer."""
+    if key.lstrip('-').isdigit() and str(int(key)) == key:
+        return int(key)
+    return None
+
+class SqliteNodeMapping(Mapping):
+    """
+    Read-only mapping of node id strings to labels, backed by a database of build_mapping_database.
+
+    It offers the interface of NodeMapping, but nothing is loaded up front: labels() and
+    positions() query the drawn node ids in batches of SQLITE_BATCH_SIZE through the node id index.
+    Rows are the line numbers of the file, so they are ordered but not contiguous.
+
+    Every query opens its own read-only connection and closes it when done, so a mapping can be
+    shared by the threads of a render server and never keeps the database file open.
+    """
+
+    def __init__(self, database_path):
+        """
+        Parameters:
+            database_path (str): The path of the database (see vizCache.load_mapping_database).
+        """
+        self.database_path = database_path
+        self.kind = self._fetch("SELECT value FROM meta WHERE name = 'kind'")[0][0]
+        self._urls = {}
+
+    def _connect(self):
+        """Opens a read-only connection to the database (the database is shared by every render of the layer), closed on leaving the 'with' block."""
+        return closing(sqlite3.connect(pathlib.Path(self.database_path).absolute().as_uri() + "?mode=ro", uri=True))
+
+    def _fetch(self, sql, parameters=()):
+        """Runs one query on its own connection and returns all result rows."""
+        with self._connect() as connection:
+            return connection.execute(sql, parameters).fetchall()
+
+    def _query(self, columns, where, values):
+        """Runs 'SELECT columns FROM mapping WHERE where IN (values)' in batches and returns all result rows."""
+        results = []
+        values = list(values)
+        with self._connect() as connection:
+            for start in range(0, len(values), SQLITE_BATCH_SIZE):
+                batch = values[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                results.extend(connection.execute(f"SELECT {columns} FROM mapping WHERE {where} IN ({placeholders})", batch))
+        return results
+
+    @staticmethod
+    def _value(label, latitude, longitude):
+        if label is None:
+            return (longitude, latitude)
+        return label
+
+    def _lookup(self, nodes, columns):
+        """Fetches 'columns' for the distinct non-negative ids of 'nodes', keyed by node id."""
+        wanted = np.unique(nodes[nodes >= 0]).tolist()
+        return {found[0]: found[1:] for found in self._query(f"node_id, {columns}", "node_id", wanted)}
+
+    def positions(self, nodes):
+        """
+        Finds the rows of integer node ids.
+
+        Parameters:
+            nodes (array-like): Integer node ids.
+
+        Returns:
+            numpy.ndarray: The row of each node, -1 for nodes without a mapping.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        found = self._lookup(nodes, "row")
+        return np.array([found[node][0] if node in found else -1 for node in nodes.tolist()], dtype=np.int64)
+
+    def labels(self, nodes, default="{}"):
+        """
+        Looks up the labels of integer node ids.
+
+        Parameters:
+            nodes (array-like): Integer node ids.
+            default (str): Format string of the label of an unmapped node, formatted with the node id.
+
+        Returns:
+            list: The label (see NodeMapping.value) of each node.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        found = self._lookup(nodes, "label, latitude, longitude")
+        return [self._value(*found[node]) if node in found else default.format(node) for node in nodes.tolist()]
+
+    def urls(self, nodes, dataset_type, default="{}"):
+        """
+        Looks up the tap tool URLs of integer node ids (see NodeMapping.urls).
+
+        Only the URLs of the requested nodes are built, they are kept by node id for later views.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        known = self._urls.setdefault((dataset_type, default), {})
+        missing = np.unique(nodes[[node not in known for node in nodes.tolist()]]) if len(nodes) else nodes
+        known.update(zip(missing.tolist(), create_urls(self.labels(missing, default), dataset_type)))
+        return [known[node] for node in nodes.tolist()]
+
+    def located(self):
+        """Returns (rows, latitude, longitude) of the rows that have coordinates, in row order."""
+        located = self._fetch(
+            "SELECT row, latitude, longitude FROM mapping WHERE latitude IS NOT NULL AND longitude IS NOT NULL ORDER BY row")
+        if not located:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+        rows, latitude, longitude = zip(*located)
+        return np.array(rows, dtype=np.int64), np.array(latitude, dtype=float), np.array(longitude, dtype=float)
+
+    def _at(self, rows, columns):
+        """Fetches 'columns' of the given rows, in the order of 'rows'."""
+        rows = np.asarray(rows, dtype=np.int64)
+        found = {result[0]: result[1:] for result in self._query(f"row, {columns}", "row", np.unique(rows).tolist())}
+        return [found[row] for row in rows.tolist()]
+
+    def keys_at(self, rows):
+        """Returns the node id strings of the given rows."""
+        return [key for key, in self._at(rows, "key")]
+
+    def values_at(self, rows):
+        """Returns the mapped values (see NodeMapping.value) of the given rows."""
+        return [self._value(*value) for value in self._at(rows, "label, latitude, longitude")]
+
+    # Mapping interface, keyed by node id strings -------------------------------------------------
+
+    def __getitem__(self, key):
+        found = self._fetch("SELECT label, latitude, longitude FROM mapping WHERE key = ?", (str(key),))
+        if not found:
+            raise KeyError(key)
+        return self._value(*found[0])
+
+    def __iter__(self):
+        # the connection stays open while the keys are iterated
+        with self._connect() as connection:
+            for key, in connection.execute("SELECT key FROM mapping ORDER BY row"):
+                yield key
+
+    def __len__(self):
+        return self._fetch("SELECT COUNT(*) FROM mapping")[0][0]
+
+# The mapping classes served by create_mapper.
+MAPPING_TYPES = (NodeMapping, SqliteNodeMapping)
+
+def node_labels(mapper, nodes, default="{}"):
+    """
+    Returns the labels of integer node ids from a NodeMapping or a plain dict of node id strings.
+
+    Parameters:
+        mapper (NodeMapping, SqliteNodeMapping or dict): The node mapping.
+        nodes (iterable): Integer node ids.
+        default (str): Format string of the label of an unmapped node, formatted with the node id.
+
+    Returns:
+        list: The label of each node.
+    """
+    if isinstance(mapper, MAPPING_TYPES):
+        return mapper.labels(nodes if isinstance(nodes, np.ndarray) else np.fromiter(nodes, dtype=np.int64), default)
+    return [mapper.get(str(node), default.format(node)) for node in nodes]
+
+def node_urls(mapper, nodes, dataset_type, default="{}"):
+    """
+    Returns the tap tool URLs of integer node ids from a NodeMapping, a SqliteNodeMapping or a plain dict.
+
+    Parameters:
+        mapper (NodeMapping, SqliteNodeMapping or dict): The node mapping.
+        nodes (iterable): Integer node ids.
+        dataset_type (str): The dataset type (see vizUTILS.determine_dataset_type).
+        default (str): Format string of the label of an unmapped node, formatted with the node id.
+
+    Returns:
+        list: The URL (or None) of each node, see vizUTILS.create_urls.
+    """
+    if isinstance(mapper, MAPPING_TYPES):
+        return mapper.urls(nodes if isinstance(nodes, np.ndarray) else np.fromiter(nodes, dtype=np.int64), dataset_type, default)
+    return create_urls(node_labels(mapper, nodes, default), dataset_type)
@@ -0,0 +1,249 @@
+import os
+import numpy as np
+from bokeh.io import save
+from bokeh.models import Range1d, ColumnDataSource, TapTool, OpenURL, HoverTool, Legend, LegendItem
+from bokeh.plotting import figure
+# CUSTOM IMPORTS
+from vizParser import EdgeArrays
+from vizLayout import choose_layout, compute_layout
+from vizContext import LayerContext, LAYOUT_SEED
+from vizCommunity import communities_to_labels
+from vizCache import atomic_output
+from vizStatic import bokeh_resources
+from vizBokeh import community_colors
+from vizConfig import RENDER_SERVER_URL
+from urllib.parse import urlencode
+
+"""
+    Level-of-detail mode of the network visualizations for huge layers.
+
+    A browser cannot draw a network of tens of thousands of nodes, so for layers with at least
+    OVERVIEW_MIN_NODES nodes the network views render an overview instead: every community is
+    contracted into one super-node, sized by its member count, and two super-nodes are linked by
+    an edge weighted by the number of edges between their communities. The communities of a
+    '.net' layer are detected (see LayerContext.communities), those of an '.ecom' layer are read
+    from the file.
+
+    Clicking a super-node opens the page of that community: the normal view of the community's
+    subgraph, never an overview itself, named like the view of a cluster '<cluster>_c<id>' (see
+    vizCaller.community_cluster_name). In the default 'file' link mode (see community_page_url)
+    the pages are rendered with the overview (see vizCaller.render_overview) and the super-nodes
+    link to their files next to the overview, so the overview works as a plain static page. In
+    the opt-in 'server' link mode the pages are not rendered up front, the super-nodes link to
+    the render server's /community request instead, which renders the page on demand and
+    redirects to it, so the render server must run on RENDER_SERVER_URL (see vizConfig).
+"""
+
+# Smallest layer (in nodes) rendered as a community overview by the network views.
+OVERVIEW_MIN_NODES = 20000
+# The visualization types that switch to the overview for huge layers.
+OVERVIEW_VIZ_TYPES = (
+    "plotly_visualization",
+    "bokeh_visualization",
+    "bokeh_dc_visualization",
+    "pyvis_visualization",
+    "community_network_visualization",
+)
+
+# Names of the link modes of the super-nodes, see community_page_url.
+COMMUNITY_LINK_MODES = ('file', 'server')
+# Link mode of the super-nodes, 'server' links need a running render server.
+COMMUNITY_LINK_MODE = 'file'
+
+def use_overview(vizType, num_nodes):
+    """Returns True if 'vizType' renders a layer of 'num_nodes' nodes as a community overview."""
+    return vizType in OVERVIEW_VIZ_TYPES and num_nodes >= OVERVIEW_MIN_NODES
+
+def layer_partition(input_file_extension, inputs):
+    """
+    Returns the nodes, edges and communities of a loaded '.net' or '.ecom' layer as arrays.
+
+    Parameters:
+        input_file_extension (str): '.net' or '.ecom'.
+        inputs (dict): The shared inputs returned by vizCaller.load_inputs.
+
+    Returns:
+        tuple: (nodes, rows, cols, labels, community_ids) where 'nodes' holds the node ids,
+               'rows'/'cols' the positions of the edge endpoints in 'nodes' (one entry per
+               distinct edge), 'labels' the index of each node's community and 'community_ids'
+               the id of every community ('.ecom' ids from the file, detected communities are
+               numbered from 0, largest first).
+    """
+    if input_file_extension == '.net':
+        context = inputs['context']
+        nodes = context.node_index()[0]
+        rows, cols, _ = context.edge_index()
+        labels = communities_to_labels(context.communities(), nodes)
+        return nodes, rows, cols, labels, np.arange(int(labels.max()) + 1 if len(labels) else 0)
+    from communityNetworkViz import node_communities
+    G = inputs['data'].graph()
+    nodes = np.fromiter(G.nodes(), dtype=np.int64, count=G.number_of_nodes())
+    node_position = {node: i for i, node in enumerate(nodes.tolist())}
+    rows = np.fromiter((node_position[u] for u, _ in G.edges()), dtype=np.int64, count=G.number_of_edges())
+    cols = np.fromiter((node_position[v] for _, v in G.edges()), dtype=np.int64, count=G.number_of_edges())
+    community_ids, labels = np.unique(node_communities(G), return_inverse=True)
+    return nodes, rows, cols, labels, community_ids
+
+def contract_communities(rows, cols, labels, num_communities):
+    """
+    Contracts every community into a super-node.
+
+    Parameters:
+        rows, cols (numpy.ndarray): The node positions of the edge endpoints.
+        labels (numpy.ndarray): The community index of every node.
+        num_communities (int): The number of communities.
+
+    Returns:
+        dict: 'members' (node count per community), 'internal' (edge count inside each community)
+              and 'source', 'target', 'count' (one entry per linked pair of communities, with the
+              number of edges between them).
+    """
+    a, b = labels[rows], labels[cols]
+    inside = a == b
+    low, high = np.minimum(a, b)[~inside], np.maximum(a, b)[~inside]
+    pairs, count = np.unique(low.astype(np.int64) * num_communities + high, return_counts=True)
+    return {
+        'members': np.bincount(labels, minlength=num_communities),
+        'internal': np.bincount(a[inside], minlength=num_communities),
+        'source': pairs // num_communities,
+        'target': pairs % num_communities,
+        'count': count,
+    }
+
+def community_page_url(page_name, pathToInputFile, mappingInputFile, mln_User, vizType, community, mode=None):
+    """
+    Returns the link of a super-node to the page of its community.
+
+    Parameters:
+        page_name (str): The file name of the community's page (see vizCaller.viz_file_name).
+        pathToInputFile, mappingInputFile, mln_User, vizType: The arguments of the overview's readNCall.
+        community (int): The community id.
+        mode (str, optional): One of COMMUNITY_LINK_MODES, defaults to COMMUNITY_LINK_MODE.
+
+    Returns:
+        str: The page's file name relative to the overview ('file'), or the render server URL
+             rendering and opening the page ('server').
+    """
+    mode = COMMUNITY_LINK_MODE if mode is None else mode
+    if mode not in COMMUNITY_LINK_MODES:
+        raise ValueError(f"Unknown community link mode '{mode}', expected one of {COMMUNITY_LINK_MODES}")
+    if mode == 'file':
+        return page_name
+    query = urlencode({'input': pathToInputFile, 'mapping': mappingInputFile, 'user': mln_User, 'viz': vizType,
+                       'community': community, 'open': 1})
+    return f"{RENDER_SERVER_URL}/community?{query}"
+
+def community_subset(input_file_extension, inputs, community_id, partition=None):
+    """
+    Builds the inputs of one community's page: the layer's inputs restricted to the community.
+
+    For '.net' layers the edges with both endpoints in the community are kept (members without
+    such an edge are not drawn), for '.ecom' layers the subgraph induced by the members.
+
+    Parameters:
+        input_file_extension (str): '.net' or '.ecom'.
+        inputs (dict): The shared inputs returned by vizCaller.load_inputs.
+        community_id (int): The community id (see layer_partition).
+        partition (tuple, optional): The result of layer_partition for these inputs, computed if not given.
+
+    Returns:
+        dict or None: The inputs of the community in the form of vizCaller.load_inputs, or None
+                      if the layer has no such community.
+    """
+    nodes, _, _, labels, community_ids = layer_partition(input_file_extension, inputs) if partition is None else partition
+    index = int(np.searchsorted(community_ids, community_id))
+    if index == len(community_ids) or community_ids[index] != community_id:
+        return None
+    member = labels == index
+    subset = dict(inputs)
+    if input_file_extension == '.net':
+        context = inputs['context']
+        all_rows, all_cols = context.node_index()[1:]
+        keep = member[all_rows] & member[all_cols]
+        allEdges = EdgeArrays(*(np.asarray(values)[keep] for values in inputs['allEdges']))
+        subset['allEdges'] = allEdges
+        subset['noVerticesLayer1'] = "0"  # only edge endpoints, not the layer's vertex range
+        subset['noEdges_fromFile'] = str(len(allEdges.src))
+        subset['context'] = LayerContext(allEdges, 0, context.mapper, context.dataset_type, context.cache_dir)
+    else:
+        subset['data'] = inputs['data'].subset(nodes[member].tolist(), Layer=f"{inputs['data']['Layer']} community {community_id}", NumCommunities=1)
+    return subset
+
+def visualization(nodes, rows, cols, labels, community_ids, endPath, mln_User, file_name, page_urls, title):
+    """
+    Renders the community overview of a layer as a Bokeh graph of super-nodes.
+
+    Parameters:
+        nodes, rows, cols, labels, community_ids: The layer partition (see layer_partition).
+        endPath (str): The base directory path where the visualization directory exists.
+        mln_User (str): The base path for the user's data directory.
+        file_name (str): The name of the HTML file to write in the 'visualization' directory.
+        page_urls (list): The link of each community's page (see community_page_url), opened when its super-node is clicked.
+        title (str): The title of the figure.
+
+    Returns:
+        str: The path of the written file, relative to mln_User.
+    """
+    num_communities = len(community_ids)
+    contracted = contract_communities(rows, cols, labels, num_communities)
+    members = contracted['members']
+
+    # Layout of the contracted graph, chosen by its size like the layout of the full networks
+    def contracted_graph():
+        import networkx as nx
+        C = nx.Graph()
+        C.add_nodes_from(range(num_communities))
+        C.add_weighted_edges_from(zip(contracted['source'].tolist(), contracted['target'].tolist(), contracted['count'].tolist()))
+        return C
+    positions = compute_layout(choose_layout(num_communities), num_communities, contracted['source'], contracted['target'],
+                               np.log1p(contracted['count']), LAYOUT_SEED, graph_factory=contracted_graph) * 10
+
+    # Super-node sizes grow with the square root of the member count (area ~ members), edge widths with the log of the edge count
+    size = 8 + 52 * np.sqrt(members / max(members.max(), 1)) if num_communities else np.zeros(0)
+    width = 0.5 + 4 * np.log1p(contracted['count']) / max(np.log1p(contracted['count'].max()), 1) if len(contracted['count']) else np.zeros(0)
+
+    plot = figure(
+        title=title,
+        x_range=Range1d(-11, 11), y_range=Range1d(-11, 11),
+        sizing_mode="stretch_both", # autoresize figure
+        tools="pan,wheel_zoom,box_zoom,reset,save",
+        active_scroll="wheel_zoom",
+    )
+    plot.title.text_font_size = '16pt'
+
+    edge_source = ColumnDataSource({
+        'xs': np.column_stack([positions[contracted['source'], 0], positions[contracted['target'], 0]]).tolist(),
+        'ys': np.column_stack([positions[contracted['source'], 1], positions[contracted['target'], 1]]).tolist(),
+        'width': width,
+    })
+    plot.multi_line('xs', 'ys', source=edge_source, line_width='width', line_color='#333333', line_alpha=0.4)
+
+    node_source = ColumnDataSource({
+        'x': positions[:, 0],
+        'y': positions[:, 1],
+        'community': community_ids,
+        'members': members,
+        'internal': contracted['internal'],
+        'size': size,
+        'color': community_colors(num_communities),  # the colors of the communities in the other views
+        'url': page_urls,
+    })
+    node_renderer = plot.scatter('x', 'y', source=node_source, size='size', fill_color='color', line_color='white', line_width=1)
+    plot.add_tools(HoverTool(renderers=[node_renderer], tooltips=[
+        ("Community", "@community"),
+        ("Nodes", "@members"),
+        ("Edges inside", "@internal"),
+    ]))
+    # opens the page of the clicked community (see vizCaller.readNCallCommunity)
+    plot.add_tools(TapTool(renderers=[node_renderer], callback=OpenURL(url="@url", same_tab=True)))
+
+    legend = Legend(items=[
+        LegendItem(label=f"{len(nodes)} nodes and {len(rows)} edges in {num_communities} communities", renderers=[node_renderer]),
+        LegendItem(label="Click a community to open its network", renderers=[node_renderer]),
+    ], location="top_left")
+    plot.add_layout(legend)
+
+    save_path = os.path.join(endPath, "visualization", file_name)
+    with atomic_output(save_path) as tmp_path:
+        save(plot, tmp_path, title=title, resources=bokeh_resources(os.path.dirname(save_path)))
+    return os.path.join(mln_User, "visualization", file_name)
@@ -0,0 +1,157 @@
+import warnings
+from collections import namedtuple
+import numpy as np
+
+# Compact edge list of a '.net' layer: three parallel arrays (int32 source ids, int32 target ids, float32 weights).
+EdgeArrays = namedtuple('EdgeArrays', ['src', 'dst', 'weight'])
+
+# Version of the on-disk representation produced by this module. Bump it whenever the parsing
+# rules or the returned arrays change so that cached layers (see vizCache) are rebuilt.
+PARSER_VERSION = 1
+
+# Row layout of an edge line in a '.net' file: "node1,node2,weight"
+EDGE_ROW_DTYPE = np.dtype([('src', np.int32), ('dst', np.int32), ('weight', np.float32)])
+# Row layout of an allocation line in a '.ecom' file: "v1id,v2id,commID"
+ECOM_ROW_DTYPE = np.dtype([('src', np.int32), ('dst', np.int32), ('community', np.int32)])
+# Row layout of an allocation line in a '.vcom' file: "vid,commID"
+VCOM_ROW_DTYPE = np.dtype([('vertex', np.int32), ('community', np.int32)])
+
+# Header markers of the community files, mapped to the key and type of the value on the following line.
+ECOM_HEADER_FIELDS = {
+    '# Edge Community File for Layer': ('Layer', str),
+    '# Number of Vertices': ('NumVertices', int),
+    '# Number of Non-Singleton Communities': ('NumCommunities', int),
+    '# Number of Community Edges': ('NumCommunitiesEdges', int),
+}
+VCOM_HEADER_FIELDS = {
+    '# Vertex Community File for Layer': ('Layer', str),
+    '# Number of Vertices': ('NumVertices', int),
+    '# Number of Total Communities': ('NumCommunities', int),
+}
+
+def parse_net_file(path_to_net_file):
+    """
+    Parses a '.net' layer file in a single streaming pass.
+
+    The '.net' format starts with three header lines (cluster name, number of vertices and
+    number of edges), followed by one line per vertex and finally one "node1,node2,weight"
+    line per edge. The header is read line by line, the vertex block is skipped and the edge
+    block is handed to NumPy's C tokenizer, so no per-edge Python objects are created and the
+    file is never held in memory as a list of lines.
+
+    Parameters:
+        path_to_net_file (str): The path to the '.net' file.
+
+    Returns:
+        tuple: (clusterName, noVerticesLayer1, noEdges_fromFile, allEdges) where the first three
+               values are the stripped header strings and 'allEdges' is an EdgeArrays instance.
+    """
+    with open(path_to_net_file, "r") as f:
+        clusterName = f.readline().strip()
+        noVerticesLayer1 = f.readline().strip()
+        noEdges_fromFile = f.readline().strip()
+        rows = _load_rows(f, EDGE_ROW_DTYPE, skiprows=int(noVerticesLayer1))
+    allEdges = EdgeArrays(*_split_rows(rows))
+    return clusterName, noVerticesLayer1, noEdges_fromFile, allEdges
+
+def parse_ecom_file(path_to_ecom_file):
+    """
+    Parses an '.ecom' (edge community) file in a single streaming pass.
+
+    Parameters:
+        path_to_ecom_file (str): The path to the '.ecom' file.
+
+    Returns:
+        tuple: (header, arrays) where 'header' holds the 'Layer', 'NumVertices', 'NumCommunities'
+               and 'NumCommunitiesEdges' values found in the file and 'arrays' maps 'src', 'dst'
+               and 'community' to int32 arrays with one entry per allocated edge.
+    """
+    header, rows = _parse_community_file(path_to_ecom_file, ECOM_HEADER_FIELDS, '# Edge Community Allocation', ECOM_ROW_DTYPE)
+    return header, dict(zip(ECOM_ROW_DTYPE.names, _split_rows(rows)))
+
+def parse_vcom_file(path_to_vcom_file):
+    """
+    Parses a '.vcom' (vertex community) file in a single streaming pass.
+
+    Parameters:
+        path_to_vcom_file (str): The path to the '.vcom' file.
+
+    Returns:
+        tuple: (header, arrays) where 'header' holds the 'Layer', 'NumVertices' and 'NumCommunities'
+               values found in the file and 'arrays' maps 'vertex' and 'community' to int32 arrays
+               with one entry per allocated vertex.
+    """
+    header, rows = _parse_community_file(path_to_vcom_file, VCOM_HEADER_FIELDS, '# Vertex Community Allocation', VCOM_ROW_DTYPE)
+    return header, dict(zip(VCOM_ROW_DTYPE.names, _split_rows(rows)))
+
+def parse_layer_file(path_to_input_file):
+    """
+    Parses any supported layer file ('.net', '.ecom' or '.vcom') into a header and flat arrays.
+
+    This is the uniform form stored by the layer cache: the header only contains JSON friendly
+    values and every array is one-dimensional.
+
+    Parameters:
+        path_to_input_file (str): The path to the layer file.
+
+    Returns:
+        tuple: (header, arrays) as described for parse_ecom_file and parse_vcom_file. For '.net'
+               files the header holds 'clusterName', 'noVerticesLayer1' and 'noEdges_fromFile'
+               and the arrays are 'src', 'dst' and 'weight'.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    if path_to_input_file.endswith('.net'):
+        clusterName, noVerticesLayer1, noEdges_fromFile, allEdges = parse_net_file(path_to_input_file)
+        header = {'clusterName': clusterName, 'noVerticesLayer1': noVerticesLayer1, 'noEdges_fromFile': noEdges_fromFile}
+        return header, dict(allEdges._asdict())
+    if path_to_input_file.endswith('.ecom'):
+        return parse_ecom_file(path_to_input_file)
+    if path_to_input_file.endswith('.vcom'):
+        return parse_vcom_file(path_to_input_file)
+    raise ValueError(f"Unsupported layer file: {path_to_input_file}")
+
+def _parse_community_file(path, header_fields, allocation_marker, row_dtype):
+    """
+    Reads the '# ...' header sections of a community file and the allocation block that follows them.
+
+    Returns:
+        tuple: (header dict, structured array of allocation rows)
+    """
+    header = {}
+    rows = np.zeros(0, dtype=row_dtype)
+    with open(path, 'r') as f:
+        for line in iter(f.readline, ''):
+            if line.startswith(allocation_marker):
+                # every remaining non-comment line belongs to the allocation
+                rows = _load_rows(f, row_dtype, comments='#')
+                break
+            for marker, (key, cast) in header_fields.items():
+                if line.startswith(marker):
+                    header[key] = cast(f.readline().strip())
+                    break
+    return header, rows
+
+def _load_rows(f, row_dtype, skiprows=0, comments=None):
+    """Loads the remaining comma separated lines of an open file into a structured array."""
+    with warnings.catch_warnings():
+        # An empty block is valid (e.g. a layer without edges), do not warn about it.
+        warnings.simplefilter("ignore", UserWarning)
+        return np.loadtxt(f, delimiter=',', dtype=row_dtype, skiprows=skiprows, comments=comments, ndmin=1)
+
+def _split_rows(rows):
+    """Splits a structured array into one contiguous array per field."""
+    return [np.ascontiguousarray(rows[name]) for name in rows.dtype.names]
+
+def iter_edges(allEdges):
+    """
+    Iterates over an EdgeArrays instance as (node1, node2, weight) tuples of Python scalars.
+
+    Parameters:
+        allEdges (EdgeArrays): The parsed edge arrays.
+
+    Returns:
+        iterator: An iterator of (int, int, float) tuples, one per edge.
+    """
+    return zip(allEdges.src.tolist(), allEdges.dst.tolist(), allEdges.weight.tolist())
@@ -0,0 +1,127 @@
+import numpy as np
+from vizParser import EdgeArrays
+
+"""
+    Edge sparsification of '.net' layers before they are rendered.
+
+    Dense layers produce HTML files of hundreds of MB in which most edges add nothing visible.
+    sparsify_edges drops edges up to an edge budget, ranking them with one of these methods:
+    - 'top_k': an edge is as important as its best rank among the edges of its two endpoints
+      (heaviest first), so every node keeps its k heaviest edges before any node keeps more;
+    - 'cutoff': the heaviest edges, optionally dropping every edge lighter than a weight cutoff;
+    - 'disparity': the backbone of the disparity filter (Serrano, Boguna and Vespignani,
+      "Extracting the multiscale backbone of complex weighted networks"), the edges whose weight
+      is least explained by the strength of their endpoints, optionally only those below a
+      significance level alpha;
+    - 'sample': a uniform random sample (seeded).
+
+    Only the edges drawn by the '.net' views are sparsified (see LayerContext.sparsify): the
+    communities, degrees, community overviews and community pages use all edges, and the views
+    show the true size of the layer (see LayerContext.counts).
+"""
+
+# Names of the sparsification methods.
+SPARSIFY_METHODS = ('top_k', 'cutoff', 'disparity', 'sample')
+# Default method of sparsify_edges.
+DEFAULT_METHOD = 'disparity'
+# Largest number of edges rendered by the '.net' views, layers with more edges are sparsified.
+EDGE_BUDGET = 100000
+# (method, budget) applied to the drawing '.net' views by vizCaller, None draws all edges.
+DEFAULT_SPARSIFY = (DEFAULT_METHOD, EDGE_BUDGET)
+# Seed of the 'sample' method.
+SAMPLE_SEED = 42
+
+def sparsify_edges(allEdges, method=DEFAULT_METHOD, budget=EDGE_BUDGET, k=None, cutoff=None, alpha=None, seed=SAMPLE_SEED):
+    """
+    Drops the least important edges of a layer.
+
+    Parameters:
+        allEdges (EdgeArrays): The parsed edge arrays.
+        method (str or None): One of SPARSIFY_METHODS, None keeps every edge.
+        budget (int or None): The maximum number of edges kept, None for no limit.
+        k (int, optional): 'top_k' only keeps edges among the k heaviest of one of their endpoints.
+        cutoff (float, optional): 'cutoff' only keeps edges with at least this weight.
+        alpha (float, optional): 'disparity' only keeps edges with a significance below alpha.
+        seed (int): The random seed of 'sample'.
+
+    Returns:
+        EdgeArrays: The kept edges in file order, 'allEdges' itself when nothing is dropped.
+
+    Raises:
+        ValueError: If the method is unknown.
+    """
+    if method is None:
+        return allEdges
+    if method not in SPARSIFY_METHODS:
+        raise ValueError(f"Unknown sparsification method: {method}")
+    src, dst = np.asarray(allEdges.src), np.asarray(allEdges.dst)
+    weight = np.abs(np.asarray(allEdges.weight, dtype=float))
+    num_edges = len(src)
+
+    # importance of every edge (higher is kept first) and the edges passing the method's threshold
+    keep = np.ones(num_edges, dtype=bool)
+    if method == 'top_k':
+        rank = endpoint_rank(src, dst, weight)
+        importance = -rank
+        if k is not None:
+            keep = rank < k
+    elif method == 'cutoff':
+        importance = weight
+        if cutoff is not None:
+            keep = weight >= cutoff
+    elif method == 'disparity':
+        significance = disparity_significance(src, dst, weight)
+        importance = -significance
+        if alpha is not None:
+            keep = significance < alpha
+    else:
+        importance = np.random.default_rng(seed).random(num_edges)
+
+    # enforce the budget on the edges that passed, most important first (ties: heavier first, then file order)
+    if budget is not None and keep.sum() > budget:
+        candidates = np.flatnonzero(keep)
+        order = np.lexsort((candidates, -weight[candidates], -importance[candidates]))
+        keep = np.zeros(num_edges, dtype=bool)
+        keep[candidates[order[:budget]]] = True
+    if keep.all():
+        return allEdges
+    return EdgeArrays(*(np.asarray(values)[keep] for values in allEdges))
+
+def endpoint_rank(src, dst, weight):
+    """
+    Ranks every edge among the edges of each of its endpoints, heaviest first.
+
+    Returns:
+        numpy.ndarray: The best (smallest) of the two ranks of each edge, 0 for the heaviest edge of a node.
+    """
+    num_edges = len(src)
+    ends = np.concatenate([src, dst])
+    # group the edge ends by node, heaviest first within a node
+    order = np.lexsort((-np.concatenate([weight, weight]), ends))
+    sorted_ends = ends[order]
+    group_start = np.flatnonzero(np.r_[True, sorted_ends[1:] != sorted_ends[:-1]])
+    group_size = np.diff(np.r_[group_start, len(ends)])
+    rank = np.empty(len(ends), dtype=np.int64)
+    rank[order] = np.arange(len(ends)) - np.repeat(group_start, group_size)
+    return np.minimum(rank[:num_edges], rank[num_edges:])
+
+def disparity_significance(src, dst, weight):
+    """
+    Computes the disparity filter significance of every edge.
+
+    For an edge of node i, with degree k and strength s, the significance is (1 - w / s) ** (k - 1):
+    the probability that a uniformly random split of s over k edges gives one edge at least w.
+    An edge keeps the smaller (more significant) value of its two endpoints. The only edge of a
+    degree one node is always significant (0), so sparsification never disconnects leaves.
+
+    Returns:
+        numpy.ndarray: The significance of each edge, lower is more significant.
+    """
+    num_edges = len(src)
+    ends = np.concatenate([src, dst])
+    _, node = np.unique(ends, return_inverse=True)
+    degree = np.bincount(node)
+    strength = np.bincount(node, weights=np.concatenate([weight, weight]))
+    share = np.divide(np.concatenate([weight, weight]), strength[node], out=np.zeros(len(ends)), where=strength[node] > 0)
+    significance = np.where(degree[node] > 1, (1.0 - share) ** (degree[node] - 1), 0.0)
+    return np.minimum(significance[:num_edges], significance[num_edges:])
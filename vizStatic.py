@@ -0,0 +1,184 @@
+import os
+import re
+import gzip
+import shutil
+from vizCache import atomic_output, COMPRESSED_EXTENSIONS
+
+# brotli is optional, without it only the '.gz' siblings are written.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+"""
+    Shared JavaScript bundles and precompressed copies of the visualization files.
+
+    Saved with resources='inline', every Bokeh view embeds the whole BokehJS bundle, every
+    plotly view the whole plotly.js bundle and every pyvis view the vis-network bundle, up to
+    several MB per file. In the 'shared' resource mode the bundles are instead written once into
+    the 'static' folder of the visualization folder, named after the library version, and the
+    views reference them with a relative URL. The bundles are not loaded from a CDN, so the
+    views keep working offline and when opened from disk (pyvis' page template still links the
+    bootstrap stylesheet from a CDN, it only styles the frame around the network).
+
+    Every visualization file and every bundle also gets '.gz' (and, with the brotli package,
+    '.br') siblings, which a web server can send as they are to clients accepting that encoding.
+"""
+
+# Names of the resource modes: 'inline' embeds the bundles in every file, 'shared' references the static folder.
+RESOURCE_MODES = ('inline', 'shared')
+# Resource mode used by the renderers.
+RESOURCE_MODE = 'shared'
+# Name of the folder, inside the 'visualization' folder, holding the shared bundles.
+STATIC_DIR_NAME = "static"
+# The vis-network CDN tags of pyvis' 'remote' page template, the version and file name are captured.
+VIS_NETWORK_TAG = re.compile(r'<(link|script)\b[^>]*"https://[^"]*/vis-network/([\w.]+)/dist/(?:dist/)?(vis-network\.min\.(?:css|js))"[^>]*>')
+# Whether the visualization files and bundles get compressed siblings.
+PRECOMPRESS = True
+
+def _check_mode(mode):
+    """Returns 'mode' (RESOURCE_MODE if None), raising ValueError if it is not one of RESOURCE_MODES."""
+    mode = RESOURCE_MODE if mode is None else mode
+    if mode not in RESOURCE_MODES:
+        raise ValueError(f"Unknown resource mode '{mode}', expected one of {RESOURCE_MODES}")
+    return mode
+
+def bokeh_resources(visualization_dir, mode=None):
+    """
+    Returns the 'resources' argument of bokeh.io.save for a file in 'visualization_dir'.
+
+    In the 'shared' mode the BokehJS bundles of the installed Bokeh version are copied to
+    'static/bokeh-<version>/static/js' the first time, and the returned Resources reference
+    them relatively (Bokeh only links the bundles a document uses, e.g. the widgets bundle).
+
+    Parameters:
+        visualization_dir (str): The folder the view is saved in.
+        mode (str, optional): One of RESOURCE_MODES, defaults to RESOURCE_MODE.
+
+    Returns:
+        str or bokeh.resources.Resources: 'inline', or Resources pointing to the shared bundles.
+    """
+    if _check_mode(mode) == 'inline':
+        return 'inline'
+    import bokeh
+    from bokeh.resources import Resources
+    from bokeh.util.paths import bokehjsdir
+    root_url = f"{STATIC_DIR_NAME}/bokeh-{bokeh.__version__}/"
+    resources = Resources(mode='server', root_url=root_url)
+    for url in resources.js_files:
+        # the urls are '<root_url>static/js/<bundle>', the bundles ship in '<bokehjsdir>/js'
+        _install_file(os.path.join(bokehjsdir(), "js", os.path.basename(url)), os.path.join(visualization_dir, *url.split("/")))
+    return resources
+
+def plotly_js(visualization_dir, mode=None):
+    """
+    Returns the 'include_plotlyjs' argument of plotly's write_html for a file in 'visualization_dir'.
+
+    In the 'shared' mode the plotly.js bundle of the installed plotly version is written to
+    'static/plotly-<version>.min.js' the first time and its relative URL is returned.
+
+    Parameters:
+        visualization_dir (str): The folder the view is saved in.
+        mode (str, optional): One of RESOURCE_MODES, defaults to RESOURCE_MODE.
+
+    Returns:
+        bool or str: True (embed the bundle), or the relative URL of the shared bundle.
+    """
+    if _check_mode(mode) == 'inline':
+        return True
+    import plotly
+    from plotly.offline import get_plotlyjs
+    url = f"{STATIC_DIR_NAME}/plotly-{plotly.__version__}.min.js"
+    target = os.path.join(visualization_dir, *url.split("/"))
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with atomic_output(target) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+        precompress(target)
+    return url
+
+def pyvis_html(network, visualization_dir, mode=None):
+    """
+    Returns the HTML page of a pyvis network for a file in 'visualization_dir'.
+
+    In the 'inline' mode the page embeds the vis-network bundle (pyvis' 'in_line' resources).
+    In the 'shared' mode it is generated with pyvis' 'remote' resources and the CDN links of
+    vis-network are replaced by links to the bundle and stylesheet shipped with pyvis, copied to
+    'static/vis-network-<version>/' the first time.
+
+    Parameters:
+        network (pyvis.network.Network): The network, its 'cdn_resources' is set here.
+        visualization_dir (str): The folder the view is saved in.
+        mode (str, optional): One of RESOURCE_MODES, defaults to RESOURCE_MODE.
+
+    Returns:
+        str: The HTML page.
+    """
+    if _check_mode(mode) == 'inline':
+        network.cdn_resources = "in_line"
+        return network.generate_html(notebook=False)
+    import pyvis
+    network.cdn_resources = "remote"
+    html = network.generate_html(notebook=False)
+    sources = {}
+    for tag, version, name in VIS_NETWORK_TAG.findall(html):
+        folder = os.path.join(os.path.dirname(pyvis.__file__), "templates", "lib", f"vis-{version}")
+        # pyvis ships the minified script but not the minified stylesheet
+        candidates = [os.path.join(folder, file_name) for file_name in (name, name.replace(".min.", "."))]
+        sources[name] = next((path for path in candidates if os.path.isfile(path)), None)
+    if not sources or None in sources.values():
+        # pyvis changed its template or does not ship this version, embed the bundle instead
+        return pyvis_html(network, visualization_dir, 'inline')
+
+    def local_tag(match):
+        tag, version, name = match.groups()
+        url = f"{STATIC_DIR_NAME}/vis-network-{version}/{os.path.basename(sources[name])}"
+        _install_file(sources[name], os.path.join(visualization_dir, *url.split("/")))
+        return f'<link rel="stylesheet" href="{url}" />' if tag == "link" else f'<script src="{url}">'
+    return VIS_NETWORK_TAG.sub(local_tag, html)
+
+def _install_file(source, target):
+    """Copies a bundle to 'target' (with its compressed siblings) unless it is already there."""
+    if os.path.exists(target):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with atomic_output(target) as tmp_path:
+        shutil.copyfile(source, tmp_path)
+    precompress(target)
+
+def precompress(path, enabled=None):
+    """
+    Writes the compressed siblings of a file, 'path.gz' and (with brotli) 'path.br'.
+
+    The siblings are written atomically after the file itself, at the highest compression
+    level and without a timestamp, so the same file always gives the same bytes. Writing a file
+    through vizCache.atomic_output already removed its previous siblings, so until the new ones
+    are written a web server sends the new file uncompressed, never an outdated copy. Siblings
+    that are not written (compression disabled, brotli missing) are removed as well.
+
+    Parameters:
+        path (str): The path of the file.
+        enabled (bool, optional): Whether to write the siblings, defaults to PRECOMPRESS.
+
+    Returns:
+        list: The paths of the written siblings.
+    """
+    enabled = PRECOMPRESS if enabled is None else enabled
+    compressors = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors['.br'] = lambda data: brotli.compress(data, quality=11)
+    data = None
+    written = []
+    for extension in COMPRESSED_EXTENSIONS:
+        sibling = path + extension
+        if not enabled or extension not in compressors:
+            if os.path.exists(sibling):
+                os.remove(sibling)
+            continue
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        with atomic_output(sibling) as tmp_path, open(tmp_path, "wb") as f:
+            f.write(compressors[extension](data))
+        written.append(sibling)
+    return written
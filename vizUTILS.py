@@ -1,5 +1,15 @@
-import urllib.parse
+from functools import lru_cache
 
+# Keywords of the input file path and the dataset type they select, checked in this order.
+DATASET_KEYWORDS = (
+    ('Airlines', 'airport'),
+    ('IMDb', 'movies'),
+    ('USCounty', 'USCounty'),
+    ('DBLP', 'DBLP'),
+    ('Accident', 'Accident'),
+)
+
+@lru_cache(maxsize=None)
 def determine_dataset_type(path_to_input_file):
     """
     Determines the dataset type based on keywords found in the file path.
@@ -17,16 +27,10 @@ def determine_dataset_type(path_to_input_file):
     Returns:
         str: A string representing the dataset type ('airport', 'movies', 'USCounty', 'DBLP', 'Accident', or 'unknown').
     """
-    if 'Airlines' in path_to_input_file:
-        return 'airport'
-    elif 'IMDb' in path_to_input_file:
-        return 'movies'
-    elif 'USCounty' in path_to_input_file:
-        return 'USCounty'
-    elif 'DBLP' in path_to_input_file:
-        return 'DBLP'
-    elif 'Accident' in path_to_input_file:
-        return 'Accident'
+    # the result of a path never changes, so it is memoized (see lru_cache)
+    for keyword, dataset_type in DATASET_KEYWORDS:
+        if keyword in path_to_input_file:
+            return dataset_type
     return 'unknown'
 
 def create_url(node_label, dataset_type):
@@ -44,32 +48,73 @@ def create_url(node_label, dataset_type):
         dataset_type (str): The type of dataset ('airport', 'movies', 'USCounty', 'DBLP', 'Accident') which determines the URL format.
 
     Returns:
-        str or None: The URL as a string if applicable, or None if the dataset type is 'unknown' or node_label is "0".
+        str or None: The URL as a string if applicable, or None if the dataset type is 'unknown', node_label is "0"
+                     or it lacks the field the URL is built from.
+
+    The URL formats live in URL_FORMATTERS, shared with create_urls (use it for a whole column of labels).
+    """
+    return create_urls([node_label], dataset_type)[0]
+
+def create_urls(node_labels, dataset_type):
+    """
+    Creates the URLs of a whole column of node labels (see create_url).
+
+    The formatter of the dataset type is resolved once (see URL_FORMATTERS) and applied to the
+    column in one pass, instead of one create_url call (and if-chain) per node.
+
+    Parameters:
+        node_labels (list): The labels of the nodes.
+        dataset_type (str): The type of dataset which determines the URL format.
+
+    Returns:
+        list: The URL of each label, None where the dataset type has no URLs, the label is "0"
+              or the label lacks the field the URL is built from.
     """
-    if dataset_type == 'airport':
-        if node_label != "0":
-            airport_code = node_label.split(',')[2]  # Assumes 'node_label' format is "id,lat,long,airportCode"
-            return f"https://www.google.com/maps/search/?api=1&query={urllib.parse.quote_plus(airport_code)}+airport"
-#            return f"https://www.google.com/maps/search/?api=1&query={node_label}"
-    elif dataset_type == 'movies':
-        if node_label != "0":
-            # Extracting the movie title from the mapper output
-            title = node_label.split(',')[1]  # Assumes 'node_label' format is "id,title"
-            movie_search_query = urllib.parse.quote_plus(f"{title} IMDb")
-            return f"https://www.google.com/search?q={movie_search_query}"
-    elif dataset_type == 'USCounty':
-        if node_label != "0":
-            return f"https://www.google.com/search?q={urllib.parse.quote_plus(node_label)}+county"
-    elif dataset_type == 'DBLP':
-        if node_label != "0":
-            # Extracting the author list from the mapper output
-            author_list = node_label.split(',', 1)[1]  # Assumes 'node_label' format is "id,author_list"
-            #author_search_query = urllib.parse.quote_plus(f"{author_list}")
-            return f"https://www.google.com/search?q={author_list}"
-    elif dataset_type == 'Accident':
-        if node_label != "0":
-#            return f"https://www.google.com/maps/search/?api=1&query={node_label}"
-            # Extracting the latitude and longitude values either "lat,long" or "lat,long,attr_val"
-            location = ','.join(node_label.split(',')[:2])
-            return f"https://www.google.com/maps/search/?api=1&query={location}"            
-    return None  # For 'unknown' or any other type, do not create a URL
+    formatter = URL_FORMATTERS.get(dataset_type)
+    if formatter is None:
+        return [None] * len(node_labels)
+    query, template = formatter
+    format_url = template.format
+    # coordinate tuples and "0" have no URL
+    queries = [query(label) if type(label) is str and label != "0" else None for label in node_labels]
+    return [format_url(text) if text is not None else None for text in queries]
+
+# quote_plus of every byte, as a str.translate table over the latin-1 decoding of UTF-8 bytes.
+_QUOTE_TABLE = {byte: chr(byte) if chr(byte) in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~"
+                else '+' if byte == ord(' ') else f"%{byte:02X}" for byte in range(256)}
+
+def _quote(text):
+    """urllib.parse.quote_plus with a single str.translate call."""
+    return text.encode('utf-8').decode('latin-1').translate(_QUOTE_TABLE)
+
+def _airport_query(label):
+    # Assumes the label format is "lat,long,airportCode"
+    parts = label.split(',')
+    return _quote(parts[2]) if len(parts) > 2 else None
+
+def _movie_query(label):
+    # Extracting the movie title from the mapper output, assumes the label format is "id,title"
+    parts = label.split(',')
+    return _quote(f"{parts[1]} IMDb") if len(parts) > 1 else None
+
+def _county_query(label):
+    return _quote(label)
+
+def _author_query(label):
+    # Extracting the author list from the mapper output, assumes the label format is "id,author_list"
+    parts = label.split(',', 1)
+    return parts[1] if len(parts) > 1 else None
+
+def _accident_query(label):
+    # Extracting the latitude and longitude values either "lat,long" or "lat,long,attr_val"
+    return ','.join(label.split(',')[:2])
+
+# The URL formatter of every dataset type: a function turning a label into the query string of
+# its URL (None for none) and the URL template the query is formatted into.
+URL_FORMATTERS = {
+    'airport': (_airport_query, "https://www.google.com/maps/search/?api=1&query={}+airport"),
+    'movies': (_movie_query, "https://www.google.com/search?q={}"),
+    'USCounty': (_county_query, "https://www.google.com/search?q={}+county"),
+    'DBLP': (_author_query, "https://www.google.com/search?q={}"),
+    'Accident': (_accident_query, "https://www.google.com/maps/search/?api=1&query={}"),
+}
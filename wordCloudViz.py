@@ -1,29 +1,23 @@
 import matplotlib.pyplot as plt
 import os
+import numpy as np
 from wordcloud import WordCloud
 from io import BytesIO
+from vizCache import atomic_output
+from vizCommunityStats import stats_of
 import base64
 
 def visualization(data, mapper, mln_User, endPath, mappingFile_present, G, input_file_extension, final_output_cluster_name):
     try: 
-        communityData = data['Communities']
-        
         input_file_extension = input_file_extension.split('.')[1]
         # Determine if the data comes from a vertex community (vcom) or an edge community (ecom)
         nodes_OR_edges = "nodes" if input_file_extension == "vcom" else "edges"
         
-        uniqueNodesInEachCommunity = {}
-        if input_file_extension == "ecom":
-                    # Calculating unique nodes in each community for edge community files
-                    for communityID, edges in communityData.items():
-                        nodes = set()
-                        for edge in edges:
-                            nodes.add(edge[0])
-                            nodes.add(edge[1])
-                        uniqueNodesInEachCommunity[communityID] = len(nodes)
+        # size, unique nodes, edges, average degree and density of every community (see vizCommunityStats)
+        stats = stats_of(data, input_file_extension)
 
         # count the number of vertices in each community --------------------------------------------------------------------------------------
-        verticesInEachCommunity = {'C'+str(key): len(value) if isinstance(value, list) else value for key, value in communityData.items()}  
+        verticesInEachCommunity = {'C'+str(key): value for key, value in zip(stats['community'].tolist(), stats['size'].tolist())}
             # print(len(verticesInEachCommunity)) #{'C1': 3, 'C2': 1, 'C3': 1, 'C4': 1}
         # calculate the number of communities to display in the word cloud --------------------------------------------------------------------
         coms_to_display = min(10, len(verticesInEachCommunity))
@@ -61,13 +55,11 @@ def visualization(data, mapper, mln_User, endPath, mappingFile_present, G, input
             # join to legent text to print the following C1(communityID): 100(number of nodes) nodes, 200(number of edges) edges
             community_legend_text = []
 
-            for communityID, nodes_count in sorted(uniqueNodesInEachCommunity.items(), key=lambda item: item[1], reverse=True)[:coms_to_display]:
-                edges_count = verticesInEachCommunity.get('C'+str(communityID))
-
-                # calculate the avergae density of each community if nodes is more than 0 else the value is 0
-                average_degree = (2 * edges_count) / (nodes_count if nodes_count > 0 else 1)
-                density = (2 * edges_count) / (nodes_count * (nodes_count - 1) if nodes_count > 1 else 1)
-
+            # communities with the most nodes first
+            order = np.argsort(-stats['nodes'], kind='stable')[:coms_to_display]
+            for communityID, nodes_count, edges_count, average_degree, density in zip(
+                    stats['community'][order].tolist(), stats['nodes'][order].tolist(), stats['edges'][order].tolist(),
+                    stats['average_degree'][order].tolist(), stats['density'][order].tolist()):
                 community_legend_text.append(f"C{communityID}: {nodes_count} nodes, {edges_count} edges, {average_degree:.2f} average degree, {density:.2f} density")
             legend_text += "\n".join(community_legend_text)
 
@@ -100,7 +92,7 @@ def visualization(data, mapper, mln_User, endPath, mappingFile_present, G, input
         """
         # html_content = f'<img src=\'data:image/png;base64,{encoded}'
         html_path = os.path.join(endPath,"visualization",f"wordcloud_{final_output_cluster_name}_{input_file_extension}.html")
-        with open(html_path, "w") as f:
+        with atomic_output(html_path) as tmp_path, open(tmp_path, "w") as f:
             f.write(html_content)
         return html_path
     except Exception as e: